@@ -0,0 +1,269 @@
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+from BatchForecasting import BatchForecaster
+from FeatureStore import FutureFeatureBuilder
+from SalesIngestion import period_delta
+from MultiSeriesForecasting import _limit_worker_threads
+from Instrumentation import Instrumentation
+from ForecastSetup import apply_config, development_windows
+
+MODEL_NAMES = ('lstm', 'xgb', 'ensemble')
+
+
+def forecast_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, Dict]:
+    """RMSE, MAE, R² and MAPE of (n_cutoffs, horizon) forecasts, overall and per horizon step.
+
+    Everything is computed with array reductions over all cutoffs at once.
+    MAPE skips days whose actual value is zero.
+    """
+    actual = np.asarray(actual, dtype=np.float64)
+    errors = np.asarray(predicted, dtype=np.float64) - actual
+    nonzero = actual != 0
+    ape = np.where(nonzero, np.abs(errors) / np.where(nonzero, np.abs(actual), 1.0), np.nan)
+
+    def summarise(axis):
+        sse = np.sum(errors ** 2, axis=axis)
+        sst = np.sum((actual - actual.mean(axis=axis, keepdims=axis is not None)) ** 2, axis=axis)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'rmse': np.sqrt(np.mean(errors ** 2, axis=axis)),
+                'mae': np.mean(np.abs(errors), axis=axis),
+                'r2': np.where(sst > 0, 1 - sse / np.where(sst > 0, sst, 1.0), np.nan),
+                'mape': np.nanmean(ape, axis=axis) * 100
+            }
+
+    overall = {name: float(value) for name, value in summarise(None).items()}
+    by_horizon = {name: value.tolist() for name, value in summarise(0).items()}
+    return {'overall': overall, 'by_horizon': by_horizon}
+
+
+class BacktestResult:
+    """Forecasts and actuals in sales units for every cutoff of a backtest.
+
+    `actual` and each entry of `forecasts` are (n_cutoffs, horizon) arrays;
+    row i starts on `cutoff_dates[i]`, the first forecast day of that cutoff.
+    `freq` is the length of a step ('H', 'D' or 'W').
+    """
+
+    def __init__(self, cutoff_dates: Sequence, actual: np.ndarray, forecasts: Dict[str, np.ndarray],
+                 freq: str = 'D'):
+        self.cutoff_dates = pd.DatetimeIndex(cutoff_dates)
+        self.freq = freq
+        self.actual = np.asarray(actual, dtype=np.float64)
+        self.forecasts = {name: np.asarray(values, dtype=np.float64) for name, values in forecasts.items()}
+
+    @property
+    def horizon(self) -> int:
+        return self.actual.shape[1]
+
+    def metrics(self) -> Dict[str, Dict]:
+        """forecast_metrics for every model."""
+        return {name: forecast_metrics(self.actual, values) for name, values in self.forecasts.items()}
+
+    def residuals(self, model: str = 'ensemble') -> np.ndarray:
+        """(n_cutoffs, horizon) actual minus forecast for one model."""
+        return self.actual - self.forecasts[model]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long-format table with one row per cutoff and horizon step."""
+        n_cutoffs, horizon = self.actual.shape
+        steps = np.arange(1, horizon + 1)
+        frame = pd.DataFrame({
+            'cutoff': np.repeat(self.cutoff_dates, horizon),
+            'step': np.tile(steps, n_cutoffs),
+            'date': (np.repeat(self.cutoff_dates, horizon)
+                     + np.tile(steps - 1, n_cutoffs) * period_delta(self.freq)),
+            'actual': self.actual.ravel()
+        })
+        for name, values in self.forecasts.items():
+            frame[f'{name}_forecast'] = values.ravel()
+        return frame
+
+    @classmethod
+    def concat(cls, results: List['BacktestResult']) -> 'BacktestResult':
+        """Combine the results of several folds, ordered by cutoff."""
+        results = [result for result in results if len(result.cutoff_dates)]
+        dates = np.concatenate([result.cutoff_dates.values for result in results])
+        order = np.argsort(dates, kind='stable')
+        actual = np.concatenate([result.actual for result in results])[order]
+        forecasts = {name: np.concatenate([result.forecasts[name] for result in results])[order]
+                     for name in results[0].forecasts}
+        return cls(dates[order], actual, forecasts, results[0].freq)
+
+
+class Backtester:
+    """Rolling-origin backtest of a trained SimpleSalesForecastSystem or SalesInsightPipeline.
+
+    Every cutoff is a forecast origin: the models forecast `horizon` days from
+    the window that ends the day before it, using the system's own
+    forecasting strategy and feedback mode. The trained models are reused as
+    they are, and all cutoffs are forecast as one batch, so a backtest over
+    hundreds of cutoffs costs about as much as forecasting that many series.
+    Multivariate pipelines are forecast one cutoff at a time, since each
+    cutoff has its own forecast dates.
+    """
+
+    def __init__(self, system, horizon: Optional[int] = None, step: int = 1):
+        self.system = system
+        self.horizon = horizon or system.forecast_horizon
+        self.step = step
+        if system.forecast_strategy == 'direct' and self.horizon != system.forecast_horizon:
+            raise ValueError(f"Direct models forecast exactly {system.forecast_horizon} days, "
+                             f"got horizon={self.horizon}")
+        self.feature_columns = getattr(system, 'feature_columns', None)
+
+    def _context_length(self) -> int:
+        return getattr(self.system, 'context_length', self.system.lookback)
+
+    def held_out_start(self, scaled_data: np.ndarray) -> int:
+        """Index of the first day that no training window was fitted on (the start of the test split)."""
+        X, y = self.system.create_sequences(scaled_data)
+        X_dev, _ = development_windows(self.system, X, y)
+        return len(X_dev) + self.system.lookback + self.system.target_horizon - 1
+
+    def cutoffs(self, n_days: int, first_cutoff: int) -> np.ndarray:
+        """Every `step`-th day from `first_cutoff` that leaves a full horizon of actuals."""
+        first_cutoff = max(first_cutoff, self.system.lookback)
+        return np.arange(first_cutoff, n_days - self.horizon + 1, self.step)
+
+    def _forecaster(self) -> BatchForecaster:
+        system = self.system
+        return BatchForecaster(system.models['lstm'], system.models['xgb'], system.lookback, self.horizon,
+                               n_features=getattr(system, 'n_features', 1))
+
+    def forecast_at(self, scaled_data: np.ndarray, cutoffs: np.ndarray,
+                    dates: Optional[pd.DatetimeIndex] = None) -> Dict[str, np.ndarray]:
+        """Scaled (n_cutoffs, horizon) forecasts of every model from each cutoff."""
+        system = self.system
+        forecaster = self._forecaster()
+        cutoffs = np.asarray(cutoffs)
+        if not self.feature_columns:
+            # One row per cutoff: the `lookback` scaled totals before it
+            windows = scaled_data[cutoffs[:, np.newaxis] - np.arange(system.lookback, 0, -1), 0]
+            if system.forecast_strategy == 'direct':
+                return forecaster.forecast_direct(windows)
+            return forecaster.forecast(windows, feedback=system.FORECAST_FEEDBACK)
+
+        forecasts = {name: np.empty((len(cutoffs), self.horizon), dtype=np.float32) for name in MODEL_NAMES}
+        for i, cutoff in enumerate(cutoffs):
+            context = scaled_data[max(0, cutoff - self._context_length()):cutoff]
+            windows, history, _ = system._context_batch(context)
+            features = FutureFeatureBuilder(system.feature_columns, dates[cutoff:cutoff + self.horizon],
+                                            system.feature_scaler.min_, system.feature_scaler.scale_,
+                                            system._identify_holidays)
+            if system.forecast_strategy == 'direct':
+                cutoff_forecasts = forecaster.forecast_direct(windows, features.exogenous(0))
+            else:
+                cutoff_forecasts = forecaster.forecast(windows, feedback=system.FORECAST_FEEDBACK,
+                                                       features=features, history=history)
+            for name in MODEL_NAMES:
+                forecasts[name][i] = cutoff_forecasts[name][0]
+        return forecasts
+
+    def evaluate(self, scaled_data: np.ndarray, cutoffs: Optional[Sequence[int]] = None,
+                 first_cutoff: Optional[int] = None) -> BacktestResult:
+        """Backtest the trained models from every cutoff (day indices into `scaled_data`).
+
+        By default the cutoffs start at the system's held-out test period, so
+        no forecast is scored on days the models were fitted on.
+        """
+        system = self.system
+        if cutoffs is None:
+            start = first_cutoff if first_cutoff is not None else self.held_out_start(scaled_data)
+            cutoffs = self.cutoffs(len(scaled_data), start)
+        cutoffs = np.asarray(cutoffs, dtype=np.int64)
+        if not len(cutoffs):
+            raise ValueError(f"No cutoff leaves {self.horizon} days of actuals after the training period; "
+                             f"use a shorter horizon, more data or walk_forward_backtest")
+
+        dates = pd.DatetimeIndex(system.daily_sales['date'])
+        forecasts = self.forecast_at(scaled_data, cutoffs, dates)
+
+        # Actuals and forecasts back in sales units, all cutoffs in one inverse transform each
+        def unscale(values):
+            values = np.asarray(values, dtype=np.float64)
+            return system.scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+
+        actual = scaled_data[cutoffs[:, np.newaxis] + np.arange(self.horizon), 0]
+        return BacktestResult(dates[cutoffs], unscale(actual),
+                              {name: unscale(values) for name, values in forecasts.items()},
+                              getattr(system, 'freq', 'D'))
+
+
+def _fit_fold_scalers(system, scaled_data: np.ndarray, n_periods: int) -> np.ndarray:
+    """Refit the system's scalers on the first `n_periods` periods only and rescale the whole series.
+
+    prepare_data fits them on every period, which would let a fold's
+    training data see the range of values that come after it.
+    """
+    scaler = getattr(system, 'feature_scaler', None) or system.scaler
+    raw = scaler.inverse_transform(scaled_data)
+    if scaler is not system.scaler:
+        scaler.fit(raw[:n_periods])
+    # 'total' is the first column and is scaled by system.scaler alone as well
+    system.scaler.fit(raw[:n_periods, :1])
+    scaled_data = scaler.transform(raw)
+    if hasattr(system, 'scaled_data'):
+        system.scaled_data = scaled_data
+    return scaled_data
+
+
+def _backtest_fold(system_factory: Callable, system_kwargs: Dict, config: Optional[Dict], data: pd.DataFrame,
+                   cutoffs: np.ndarray, horizon: Optional[int], validation_fraction: float) -> BacktestResult:
+    """Fit a fresh system on the days before a fold's first cutoff and backtest the fold (runs in a worker)."""
+    system = system_factory(**{'verbose': False, **system_kwargs})
+    if config:
+        apply_config(system, config)
+    _, scaled_data = system.prepare_data(data)
+    scaled_data = _fit_fold_scalers(system, scaled_data, int(cutoffs[0]))
+    X, y = system.create_sequences(scaled_data)
+
+    # Only windows whose targets end before the fold starts; the latest ones validate for early stopping
+    n_train = int(cutoffs[0]) - system.lookback - system.target_horizon + 1
+    X, y = X[:n_train], y[:n_train]
+    n_val = max(1, int(len(X) * validation_fraction))
+    if len(X) - n_val < 2:
+        raise ValueError(f"Not enough history before cutoff {cutoffs[0]} to train a fold")
+    system.fit_models(X[:-n_val], y[:-n_val], X[-n_val:], y[-n_val:])
+    return Backtester(system, horizon).evaluate(scaled_data, cutoffs)
+
+
+def walk_forward_backtest(system_factory: Callable, data: pd.DataFrame, system_kwargs: Optional[Dict] = None,
+                          config: Optional[Dict] = None, n_folds: int = 4, first_cutoff: Optional[int] = None,
+                          horizon: Optional[int] = None, step: int = 1, validation_fraction: float = 0.1,
+                          max_workers: Optional[int] = None, verbose: bool = True,
+                          instrumentation: Optional[Instrumentation] = None) -> BacktestResult:
+    """Rolling-origin backtest that refits the models for each fold, with folds run in parallel.
+
+    `data` is what the system's prepare_data accepts (processed transactions,
+    or the daily feature table). The cutoffs from `first_cutoff` (by default
+    the middle of the series) to the end are split into `n_folds` blocks; each
+    block gets models fitted only on the days before it, so later folds see
+    more history. `config` is an optional HyperparameterSearch configuration.
+    Each fold's scalers are fitted on the days before it too. Progress output
+    goes through `instrumentation`; verbose=False silences it.
+    """
+    system_kwargs = system_kwargs or {}
+    probe = system_factory(**{'verbose': False, **system_kwargs})
+    _, scaled_data = probe.prepare_data(data)
+    backtester = Backtester(probe, horizon, step)
+    cutoffs = backtester.cutoffs(len(scaled_data), first_cutoff if first_cutoff is not None else len(scaled_data) // 2)
+    folds = [fold for fold in np.array_split(cutoffs, n_folds) if len(fold)]
+    if not folds:
+        raise ValueError(f"No cutoff leaves {backtester.horizon} days of actuals")
+
+    max_workers = min(max_workers or os.cpu_count(), len(folds))
+    instrumentation = instrumentation or Instrumentation(verbose=verbose)
+    instrumentation.log(f"\nBacktesting {len(cutoffs)} cutoffs in {len(folds)} folds on {max_workers} workers...")
+    # Spawned workers avoid forking a process that has already initialised TensorFlow
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=_limit_worker_threads) as executor:
+        futures = [executor.submit(_backtest_fold, system_factory, system_kwargs, config, data, fold,
+                                   horizon, validation_fraction)
+                   for fold in folds]
+        return BacktestResult.concat([future.result() for future in futures])
@@ -0,0 +1,234 @@
+import weakref
+import numpy as np
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple, Union
+
+# 'recursive' feeds one-step predictions back into the window; 'direct' models
+# emit the whole horizon from a single forward pass
+FORECAST_STRATEGIES = ('recursive', 'direct')
+
+
+def check_forecast_strategy(strategy: str):
+    if strategy not in FORECAST_STRATEGIES:
+        raise ValueError(f"Unknown forecast strategy: {strategy}. Expected one of {FORECAST_STRATEGIES}")
+
+
+def as_sequence_batch(last_sequence: Union[np.ndarray, List[np.ndarray]], lookback: int) -> Tuple[np.ndarray, bool]:
+    """Stack one or many input windows into a (n_series, lookback) float32 batch.
+
+    Returns the batch and a flag telling whether a single window was passed in,
+    so callers can hand back a single result instead of a list.
+    """
+    if isinstance(last_sequence, (list, tuple)):
+        windows = np.stack([np.asarray(seq, dtype=np.float32).reshape(lookback) for seq in last_sequence])
+        return windows, False
+
+    sequence = np.asarray(last_sequence, dtype=np.float32)
+    if sequence.size == lookback:
+        return sequence.reshape(1, lookback).copy(), True
+    # A 2-D array (or (n, lookback, 1) tensor) is already a batch of windows
+    return sequence.reshape(-1, lookback).copy(), False
+
+
+# Traced LSTM steps per model, keyed by (lookback, n_features, training), so every
+# forecaster over the same model reuses one graph; a model's steps go with it
+_COMPILED_STEPS = weakref.WeakKeyDictionary()
+
+
+class BatchForecaster:
+    """Autoregressive LSTM/XGBoost forecaster that advances a whole batch of windows per step.
+
+    Windows are (n_series, lookback) for univariate models, or
+    (n_series, lookback, n_features) for multivariate ones.
+    """
+
+    def __init__(self, lstm_model, xgb_model, lookback: int, forecast_horizon: int, instrumentation=None,
+                 n_features: int = 1):
+        self.lstm_model = lstm_model
+        self.xgb_model = xgb_model
+        self.lookback = lookback
+        self.forecast_horizon = forecast_horizon
+        self.instrumentation = instrumentation
+        self.n_features = n_features
+        self._lstm_step = self._compile_lstm_step(lstm_model, lookback, n_features)
+        # Dropout-active forward pass for sampled paths, traced on first use
+        self._lstm_sample_step = None
+        self._sampling = False
+
+    @staticmethod
+    def _compile_lstm_step(model, lookback: int, n_features: int = 1, training: bool = False):
+        """Wrap the LSTM forward pass in a traced graph function, shared per model.
+
+        A fixed input signature with an unknown batch dimension means the graph
+        is traced once and reused for every step and every batch size.
+        With training=True dropout stays active, so every call samples.
+        """
+        steps = _COMPILED_STEPS.setdefault(model, {})
+        key = (lookback, n_features, training)
+        if key in steps:
+            return steps[key]
+
+        import tensorflow as tf
+
+        # A weak reference, so the cached step does not keep its own cache key alive
+        model_ref = weakref.ref(model)
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, lookback, n_features), dtype=tf.float32)])
+        def lstm_step(windows):
+            return model_ref()(windows, training=training)
+
+        steps[key] = lstm_step
+        return lstm_step
+
+    def _lstm_outputs(self, windows: np.ndarray) -> np.ndarray:
+        """(n_series, n_outputs) LSTM outputs for a batch of windows."""
+        if self.instrumentation:
+            self.instrumentation.count_model_call()
+        if windows.ndim == 2:
+            windows = windows[:, :, np.newaxis]
+        step = self._lstm_sample_step if self._sampling else self._lstm_step
+        preds = step(np.ascontiguousarray(windows, dtype=np.float32))
+        return preds.numpy().reshape(len(windows), -1)
+
+    def _xgb_outputs(self, windows: np.ndarray, exogenous: Optional[np.ndarray] = None) -> np.ndarray:
+        """(n_series, n_outputs) XGBoost outputs for a batch of windows.
+
+        `exogenous` holds features known in advance for the day being predicted
+        (such as its calendar features); they are appended to every flattened window.
+        """
+        if self.instrumentation:
+            self.instrumentation.count_model_call()
+        inputs = windows.reshape(len(windows), -1)
+        if exogenous is not None and len(exogenous):
+            inputs = np.hstack([inputs, np.broadcast_to(exogenous, (len(windows), len(exogenous)))])
+        return np.asarray(self.xgb_model.predict(inputs), dtype=np.float32).reshape(len(windows), -1)
+
+    def predict_lstm(self, windows: np.ndarray) -> np.ndarray:
+        """One-step LSTM prediction for every window in the batch."""
+        return self._lstm_outputs(windows)[:, 0]
+
+    def predict_xgb(self, windows: np.ndarray, exogenous: Optional[np.ndarray] = None) -> np.ndarray:
+        """One-step XGBoost prediction for every window in the batch."""
+        return self._xgb_outputs(windows, exogenous)[:, 0]
+
+    def _step_stage(self, step: int, n_series: int):
+        """Instrumentation stage for one horizon step (RSS is not sampled per step)."""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.stage('forecast_step', rows=n_series, sample_rss=False, step=step)
+
+    @staticmethod
+    def _advance(windows: np.ndarray, preds: np.ndarray):
+        """Shift every window left by one step in place and append the new predictions."""
+        windows[:, :-1] = windows[:, 1:]
+        windows[:, -1] = preds
+
+    def _feed(self, windows: np.ndarray, history: Optional[np.ndarray], preds: np.ndarray,
+              features, step: int):
+        """Roll one step of predictions into a window (and its total history in multivariate mode)."""
+        if features is None:
+            self._advance(windows, preds)
+            return
+        self._advance(history, preds)
+        self._advance(windows, features.next_row(history, step))
+
+    def forecast(self, windows: np.ndarray, feedback: str = 'separate', features=None,
+                 history: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Forecast `forecast_horizon` steps for a batch of scaled windows.
+
+        With feedback='separate' each model rolls its own predictions back into
+        its input window; with feedback='ensemble' both models share a window
+        that is advanced with the averaged prediction.
+
+        For multivariate windows pass `features`, a FeatureStore.FutureFeatureBuilder,
+        and `history`, the (n_series, k) scaled totals that end each window with
+        k >= features.history_length; the feature row of every predicted day is
+        then rebuilt from the predicted totals, and XGBoost also sees the
+        calendar features of the day it predicts.
+        """
+        if feedback not in ('separate', 'ensemble'):
+            raise ValueError(f"Unknown feedback mode: {feedback}")
+
+        n_series = len(windows)
+        lstm_windows = np.array(windows, dtype=np.float32)
+        xgb_windows = lstm_windows.copy() if feedback == 'separate' else lstm_windows
+        lstm_history = xgb_history = None
+        if features is not None:
+            lstm_history = np.array(history, dtype=np.float64)
+            xgb_history = lstm_history.copy() if feedback == 'separate' else lstm_history
+
+        lstm_forecasts = np.empty((n_series, self.forecast_horizon), dtype=np.float32)
+        xgb_forecasts = np.empty((n_series, self.forecast_horizon), dtype=np.float32)
+
+        for step in range(self.forecast_horizon):
+            with self._step_stage(step, n_series):
+                exogenous = features.exogenous(step) if features is not None else None
+                lstm_forecasts[:, step] = self.predict_lstm(lstm_windows)
+                xgb_forecasts[:, step] = self.predict_xgb(xgb_windows, exogenous)
+
+                if feedback == 'separate':
+                    self._feed(lstm_windows, lstm_history, lstm_forecasts[:, step], features, step)
+                    self._feed(xgb_windows, xgb_history, xgb_forecasts[:, step], features, step)
+                else:
+                    self._feed(lstm_windows, lstm_history, (lstm_forecasts[:, step] + xgb_forecasts[:, step]) / 2,
+                               features, step)
+
+        return {
+            'lstm': lstm_forecasts,
+            'xgb': xgb_forecasts,
+            'ensemble': (lstm_forecasts + xgb_forecasts) / 2
+        }
+
+    def forecast_direct(self, windows: np.ndarray, exogenous: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Forecast all `forecast_horizon` steps with one call per model.
+
+        For models trained with forecast_strategy='direct', which output the
+        whole horizon at once, so nothing is fed back and errors do not compound.
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        lstm_forecasts = self._lstm_outputs(windows)
+        xgb_forecasts = self._xgb_outputs(windows, exogenous)
+        if lstm_forecasts.shape[1] != self.forecast_horizon or xgb_forecasts.shape[1] != self.forecast_horizon:
+            raise ValueError(f"Direct forecasting needs models with {self.forecast_horizon} outputs, got "
+                             f"{lstm_forecasts.shape[1]} (LSTM) and {xgb_forecasts.shape[1]} (XGBoost)")
+
+        return {
+            'lstm': lstm_forecasts,
+            'xgb': xgb_forecasts,
+            'ensemble': (lstm_forecasts + xgb_forecasts) / 2
+        }
+
+    def _prepare_sampling(self):
+        """Check the LSTM can sample and trace its dropout-active forward pass."""
+        import tensorflow as tf
+
+        if not any(isinstance(layer, tf.keras.layers.Dropout) for layer in self.lstm_model.layers):
+            raise ValueError("Monte-Carlo dropout needs an LSTM model with Dropout layers")
+        if self._lstm_sample_step is None:
+            self._lstm_sample_step = self._compile_lstm_step(self.lstm_model, self.lookback, self.n_features,
+                                                             training=True)
+
+    def sample_paths(self, windows: np.ndarray, n_samples: int, strategy: str = 'recursive',
+                     feedback: str = 'separate', features=None, history: Optional[np.ndarray] = None,
+                     exogenous: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Monte-Carlo dropout forecast paths, (n_series, n_samples, forecast_horizon) per model.
+
+        Every window is repeated `n_samples` times and the copies are forecast
+        together with the LSTM's dropout active, so all paths of all series
+        cost one batched model call per step (one in total in direct mode)
+        instead of `n_samples` forecast loops. XGBoost is deterministic; its
+        paths differ only through the ensemble feedback.
+        """
+        self._prepare_sampling()
+        n_series = len(windows)
+        repeated = np.repeat(np.asarray(windows, dtype=np.float32), n_samples, axis=0)
+        self._sampling = True
+        try:
+            if strategy == 'direct':
+                paths = self.forecast_direct(repeated, exogenous)
+            else:
+                repeated_history = None if history is None else np.repeat(history, n_samples, axis=0)
+                paths = self.forecast(repeated, feedback, features, repeated_history)
+        finally:
+            self._sampling = False
+        return {name: values.reshape(n_series, n_samples, -1) for name, values in paths.items()}
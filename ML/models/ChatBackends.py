@@ -0,0 +1,118 @@
+import time
+import random
+import asyncio
+import hashlib
+from typing import Dict, Optional
+
+
+class GeminiBackend:
+    """Adapter exposing a google.generativeai GenerativeModel as a chat backend."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    async def agenerate(self, prompt: str) -> str:
+        if hasattr(self.model, 'generate_content_async'):
+            response = await self.model.generate_content_async(prompt)
+            return response.text
+        # Fall back to the blocking client on a worker thread so the event loop stays free
+        return await asyncio.to_thread(self.generate, prompt)
+
+
+class LocalStubBackend:
+    """Deterministic offline stand-in for Gemini, for tests and benchmarks.
+
+    The answer depends only on the prompt. `latency` simulates a slow model and
+    `fail_first` makes the first N calls raise, to exercise retries.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise ConnectionError(f"Simulated backend failure {self.calls}")
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        question = next((line.strip() for line in prompt.splitlines() if line.strip().startswith('User Question:')),
+                        'User Question: (none)')
+        return f"[local-stub {digest}] {question}"
+
+    def generate(self, prompt: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+def as_backend(model):
+    """Use `model` directly if it already is a chat backend, otherwise wrap it as Gemini."""
+    if hasattr(model, 'generate') and hasattr(model, 'agenerate'):
+        return model
+    return GeminiBackend(model)
+
+
+class AsyncQueryExecutor:
+    """Runs backend calls concurrently with a concurrency cap, timeouts, retries and coalescing.
+
+    Identical prompts issued while one is already in flight share that call
+    instead of hitting the backend again.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 4, timeout: float = 30.0,
+                 max_retries: int = 2, backoff: float = 0.5, max_backoff: float = 8.0):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._semaphore = None
+        self._loop = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; start fresh if called from a new loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _call_with_retries(self, prompt: str) -> str:
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff with a little jitter so retries do not arrive in lockstep
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * (1 + random.random() * 0.1))
+            try:
+                async with self._get_semaphore():
+                    return await asyncio.wait_for(self.backend.agenerate(prompt), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                last_error = TimeoutError(f"LLM call timed out after {self.timeout}s")
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def run(self, prompt: str) -> str:
+        """Answer one prompt, sharing the call with any identical prompt already in flight."""
+        task = self._inflight.get(prompt)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._call_with_retries(prompt))
+            self._inflight[prompt] = task
+            task.add_done_callback(lambda _: self._inflight.pop(prompt, None))
+        # Shield the shared task so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
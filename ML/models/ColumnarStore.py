@@ -0,0 +1,163 @@
+import os
+import pandas as pd
+from datetime import datetime
+from typing import List, Optional
+
+# pyarrow is imported inside the methods that use it, so modules importing this
+# one still load where it is not installed
+
+HISTORY_DATASET = 'history'
+FORECAST_DATASET = 'forecasts'
+FILE_FORMATS = {'parquet': 'parquet', 'arrow': 'ipc'}
+
+
+def _month_key(dates: pd.Series) -> pd.Series:
+    """'YYYY-MM' partition values, which sort the same way as the dates."""
+    return pd.to_datetime(dates).dt.strftime('%Y-%m')
+
+
+class ColumnarStore:
+    """Append-only columnar store for daily sales history and forecasts.
+
+    Each dataset is hive-partitioned by `series` and calendar `month`
+    (root/history/series=all/month=2022-03/part-<run>-0.parquet), and every
+    write adds new files instead of rewriting old ones. Reads prune
+    partitions by series and date range and memory-map the files, so
+    consumers only touch the months and series they ask for. `file_format`
+    is 'parquet' or 'arrow' (Arrow IPC, cheapest to memory-map).
+    """
+
+    def __init__(self, root: str, file_format: str = 'parquet'):
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"Unknown file format: {file_format}. Expected one of {list(FILE_FORMATS)}")
+        self.root = root
+        self.file_format = file_format
+
+    def _path(self, dataset: str) -> str:
+        return os.path.join(self.root, dataset)
+
+    def _dataset(self, dataset: str):
+        """The pyarrow dataset over every file written so far, or None if nothing was written."""
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        path = self._path(dataset)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format=FILE_FORMATS[self.file_format], partitioning=self._partitioning(),
+                          filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    @staticmethod
+    def _partitioning():
+        """Hive partitioning on string `series` and `month` keys (URI-encoded in directory names)."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        return ds.partitioning(pa.schema([('series', pa.string()), ('month', pa.string())]), flavor='hive')
+
+    def _append(self, dataset: str, frame: pd.DataFrame, run_id: str):
+        """Write a frame with `series` and `date` columns as new files in its partitions."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        frame = frame.assign(month=_month_key(frame['date']))
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        extension = 'parquet' if self.file_format == 'parquet' else 'arrow'
+        ds.write_dataset(table, self._path(dataset), format=FILE_FORMATS[self.file_format],
+                         partitioning=self._partitioning(), basename_template=f'part-{run_id}-{{i}}.{extension}',
+                         existing_data_behavior='overwrite_or_ignore')
+
+    def _filter(self, series_key: Optional[str], start, end, date_column: str = 'date'):
+        """Partition and row filter for a series and an inclusive date range."""
+        import pyarrow.dataset as ds
+
+        conditions = []
+        if series_key is not None:
+            conditions.append(ds.field('series') == series_key)
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions += [ds.field('month') >= start.strftime('%Y-%m'), ds.field(date_column) >= start]
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions += [ds.field('month') <= end.strftime('%Y-%m'), ds.field(date_column) <= end]
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    @staticmethod
+    def _new_run_id() -> str:
+        return datetime.now().strftime('%Y%m%dT%H%M%S%f')
+
+    def last_history_date(self, series_key: str = 'all') -> Optional[pd.Timestamp]:
+        """The latest stored day of a series, read from the date column of its partitions only."""
+        import pyarrow.compute as pc
+
+        dataset = self._dataset(HISTORY_DATASET)
+        if dataset is None:
+            return None
+        dates = dataset.to_table(columns=['date'], filter=self._filter(series_key, None, None))['date']
+        if len(dates) == 0:
+            return None
+        return pd.Timestamp(pc.max(dates).as_py())
+
+    def append_history(self, daily_sales: pd.DataFrame, series_key: str = 'all', value_col: str = 'total') -> int:
+        """Store the days of `daily_sales` after the series' last stored day; returns the number added.
+
+        Re-running with the full history therefore only writes the new days.
+        """
+        history = pd.DataFrame({'date': pd.to_datetime(daily_sales['date']),
+                                'total': daily_sales[value_col].astype('float64')})
+        last_date = self.last_history_date(series_key)
+        if last_date is not None:
+            history = history[history['date'] > last_date]
+        if history.empty:
+            return 0
+        self._append(HISTORY_DATASET, history.assign(series=series_key), self._new_run_id())
+        return len(history)
+
+    def append_forecasts(self, forecasts_df: pd.DataFrame, series_key: str = 'all',
+                         run_id: Optional[str] = None) -> str:
+        """Store one forecast run for a series and return its run id (sortable by creation time)."""
+        run_id = run_id or self._new_run_id()
+        frame = forecasts_df.assign(date=pd.to_datetime(forecasts_df['date']), series=series_key, run_id=run_id)
+        self._append(FORECAST_DATASET, frame, run_id)
+        return run_id
+
+    def read_history(self, series_key: Optional[str] = 'all', start=None, end=None) -> pd.DataFrame:
+        """Daily totals (`date`, `total`, and `series` when reading every series) between two dates."""
+        dataset = self._dataset(HISTORY_DATASET)
+        if dataset is None:
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'total': pd.Series(dtype='float64')})
+        columns = ['date', 'total'] if series_key is not None else ['series', 'date', 'total']
+        history = dataset.to_table(columns=columns, filter=self._filter(series_key, start, end)).to_pandas()
+        return history.sort_values(columns[:-1]).reset_index(drop=True)
+
+    def forecast_runs(self, series_key: Optional[str] = 'all') -> List[str]:
+        """Stored forecast run ids, oldest first."""
+        dataset = self._dataset(FORECAST_DATASET)
+        if dataset is None:
+            return []
+        runs = dataset.to_table(columns=['run_id'], filter=self._filter(series_key, None, None))['run_id']
+        return sorted(set(runs.to_pylist()))
+
+    def read_forecasts(self, series_key: Optional[str] = 'all', run_id: Optional[str] = 'latest',
+                       start=None, end=None) -> pd.DataFrame:
+        """Forecasts of one run (the latest by default, every run with run_id=None) between two dates."""
+        import pyarrow.dataset as ds
+
+        dataset = self._dataset(FORECAST_DATASET)
+        if dataset is None:
+            return pd.DataFrame()
+        if run_id == 'latest':
+            runs = self.forecast_runs(series_key)
+            run_id = runs[-1] if runs else None
+        expression = self._filter(series_key, start, end)
+        if run_id is not None:
+            run_filter = ds.field('run_id') == run_id
+            expression = run_filter if expression is None else expression & run_filter
+        forecasts = dataset.to_table(filter=expression).to_pandas().drop(columns='month')
+        if series_key is not None:
+            forecasts = forecasts.drop(columns='series')
+        return forecasts.sort_values([column for column in ('series', 'run_id', 'date')
+                                      if column in forecasts.columns]).reset_index(drop=True)
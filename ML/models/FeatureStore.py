@@ -0,0 +1,251 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from SalesIngestion import DailySalesAggregator, parse_timestamps
+
+CALENDAR_FEATURES = ['day', 'month', 'year', 'day_of_week', 'is_weekend', 'is_holiday', 'hour']
+
+# A multivariate feature set whose values can all be rolled forward while forecasting
+MULTIVARIATE_FEATURES = ['total', 'day_of_week', 'is_weekend', 'rolling_avg_7d', 'rolling_std_7d']
+
+_WINDOW_FEATURE = re.compile(r'^(rolling_avg|rolling_std|lag)_(\d+)d$')
+
+
+def no_holidays(dates: pd.Series) -> np.ndarray:
+    """Default holiday calendar: no day is a holiday."""
+    return np.zeros(len(dates), dtype=np.int8)
+
+
+def calendar_features(dates: pd.Series, holiday_fn: Optional[Callable] = None) -> pd.DataFrame:
+    """Calendar features for a series of dates, with the dates' index."""
+    dates = pd.Series(pd.to_datetime(dates))
+    holiday_fn = holiday_fn or no_holidays
+    day_of_week = dates.dt.dayofweek.astype(np.int8)
+    return pd.DataFrame({
+        'day': dates.dt.day.astype(np.int8),
+        'month': dates.dt.month.astype(np.int8),
+        'year': dates.dt.year.astype(np.int16),
+        'day_of_week': day_of_week,
+        'is_weekend': (day_of_week >= 5).astype(np.int8),
+        'is_holiday': np.asarray(holiday_fn(dates), dtype=np.int8),
+        'hour': dates.dt.hour.astype(np.int8)
+    }, index=dates.index)
+
+
+def window_features(columns: Sequence[str]) -> List[Tuple[int, str, int]]:
+    """(position, kind, days) for every rolling or lag column, e.g. 'lag_7d' -> 'lag', 7."""
+    specs = []
+    for i, column in enumerate(columns):
+        match = _WINDOW_FEATURE.match(column)
+        if match:
+            specs.append((i, match.group(1), int(match.group(2))))
+    return specs
+
+
+def check_forecastable(columns: Sequence[str]):
+    """Raise ValueError unless every column can be computed for future days.
+
+    The first column must be the target `total`; the others must be calendar,
+    rolling or lag features, which depend only on dates and past totals.
+    """
+    if not columns or columns[0] != 'total':
+        raise ValueError("The first feature column must be 'total'")
+    window_columns = {columns[i] for i, _, _ in window_features(columns)}
+    unknown = [c for c in columns[1:] if c not in CALENDAR_FEATURES and c not in window_columns]
+    if unknown:
+        raise ValueError(f"Features cannot be computed for future days: {unknown}")
+
+
+def history_length(columns: Sequence[str]) -> int:
+    """Number of past totals needed to compute one row of the given features."""
+    lengths = [days + 1 if kind == 'lag' else days for _, kind, days in window_features(columns)]
+    return max(lengths + [1])
+
+
+def feature_matrix(table: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """(days, features) float64 matrix of the chosen feature table columns.
+
+    Warm-up gaps are filled the way FutureFeatureBuilder pads short
+    histories: lags before the first day repeat the first total, and the
+    rolling std of a single day is 0.
+    """
+    frame = table[list(columns)].astype('float64')
+    first_total = table['total'].iloc[0]
+    for i, kind, _ in window_features(columns):
+        frame.iloc[:, i] = frame.iloc[:, i].fillna(first_total if kind == 'lag' else 0.0)
+    return frame.to_numpy()
+
+
+def is_feature_table(df: pd.DataFrame) -> bool:
+    """Whether `df` is a daily feature table rather than raw transactions."""
+    return df.index.names[0] == 'date' and 'transactions' in df.columns
+
+
+class DailyFeatureStore:
+    """Compact daily feature table built from transactions.
+
+    One row per day (per group when `group_key` is set), indexed by `date`
+    and the group columns, holding the daily total, transaction count and
+    mean ticket, rolling and lag features of the total, and calendar
+    features. Only the daily aggregates are kept, never the transactions, so
+    memory scales with days x groups rather than with the transaction count.
+
+    With freq='H' or 'W' the rows are hours or weeks; rolling and lag
+    windows then count hours or weeks (rolling_avg_7d averages 7 rows).
+    """
+
+    def __init__(self, group_key: Optional[Union[str, Sequence[str]]] = None,
+                 rolling_windows: Sequence[int] = (7,), lags: Sequence[int] = (1, 7),
+                 holiday_fn: Optional[Callable] = None, freq: str = 'D'):
+        self.group_key = group_key
+        self.rolling_windows = list(rolling_windows)
+        self.lags = list(lags)
+        self.holiday_fn = holiday_fn or no_holidays
+        self.freq = freq
+        self._aggregator = DailySalesAggregator(group_key, freq)
+        self.group_keys = self._aggregator.group_keys
+        self._table = None
+
+    def _slim(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Only the columns the aggregates need, with a parsed `datetime`."""
+        slim = df[['total'] + self.group_keys]
+        if 'datetime' in df.columns:
+            return slim.assign(datetime=df['datetime'])
+        return slim.assign(datetime=parse_timestamps(df['timestamp']))
+
+    def build(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rebuild the feature table from a full transaction frame."""
+        self._aggregator = DailySalesAggregator(self.group_key, self.freq)
+        return self.add_transactions(df)
+
+    def add_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fold more transactions (a new chunk or newly arrived days) into the table."""
+        self._aggregator.add_chunk(self._slim(df))
+        self._table = None
+        return self.table
+
+    def build_from_daily(self, daily: pd.DataFrame) -> pd.DataFrame:
+        """Rebuild an ungrouped table from saved daily totals (`date`, `total`, optionally `transactions`).
+
+        Used to restore a saved pipeline without its transactions; columns the
+        totals cannot provide (transaction count, mean) are left empty, while
+        rolling, lag and calendar features are exact.
+        """
+        if self.group_keys:
+            raise ValueError("Daily totals can only rebuild an ungrouped feature table")
+        daily = pd.DataFrame({
+            'date': pd.to_datetime(daily['date']),
+            'total': daily['total'].astype('float64'),
+            'transactions': daily['transactions'] if 'transactions' in daily.columns else np.nan
+        }).sort_values('date').reset_index(drop=True)
+        self._aggregator = DailySalesAggregator(self.group_key, self.freq)
+        self._table = self._compute(daily)
+        return self._table
+
+    @property
+    def is_built(self) -> bool:
+        return self._table is not None or self._aggregator.rows_seen > 0
+
+    @property
+    def table(self) -> pd.DataFrame:
+        """The daily feature table, derived features recomputed only after new data arrives."""
+        if self._table is None:
+            self._table = self._compute(self._aggregator.result())
+        return self._table
+
+    def _compute(self, daily: pd.DataFrame) -> pd.DataFrame:
+        daily['mean'] = daily['total'] / daily['transactions']
+
+        # Rolling and lag features run along each group's own days (one group when ungrouped)
+        totals = daily.groupby(self.group_keys or (lambda _: 0), observed=True, sort=False)['total']
+        for window in self.rolling_windows:
+            daily[f'rolling_avg_{window}d'] = totals.transform(lambda s: s.rolling(window, min_periods=1).mean())
+            daily[f'rolling_std_{window}d'] = totals.transform(lambda s: s.rolling(window, min_periods=1).std())
+        for lag in self.lags:
+            daily[f'lag_{lag}d'] = totals.shift(lag)
+
+        daily = pd.concat([daily, calendar_features(daily['date'], self.holiday_fn)], axis=1)
+        return daily.set_index(['date'] + self.group_keys)
+
+    def select(self, start=None, end=None, **group_values) -> pd.DataFrame:
+        """Rows between `start` and `end` (inclusive), optionally for one group, e.g. category='Beverages'."""
+        table = self.table
+        dates = table.index.get_level_values('date')
+        mask = np.ones(len(table), dtype=bool)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+        for key, value in group_values.items():
+            mask &= table.index.get_level_values(key) == value
+        return table[mask]
+
+    def daily_totals(self) -> pd.DataFrame:
+        """Total sales per day (per week for weekly tables) across all groups, with `date` and `total` columns."""
+        table = self.table
+        if self.freq == 'H':
+            days = table.index.get_level_values('date').normalize().rename('date')
+            return table.groupby(days)['total'].sum().reset_index()
+        if self.group_keys:
+            return table.groupby(level='date')['total'].sum().reset_index()
+        return table[['total']].reset_index()
+
+    def daily_summary(self) -> Dict:
+        """Day-level figures for the chatbot's data summary."""
+        daily = self.daily_totals()
+        peak = daily['total'].idxmax()
+        return {
+            'avg_daily_sales': float(daily['total'].mean()),
+            'date_range': f"{daily['date'].min().date()} to {daily['date'].max().date()}",
+            'peak_sales': float(daily.loc[peak, 'total']),
+            'peak_sales_date': daily.loc[peak, 'date'].date(),
+            'recent_trend': daily['total'].tail(7).round(2).tolist()
+        }
+
+
+class FutureFeatureBuilder:
+    """Builds scaled feature rows for forecast days during recursive multivariate forecasting.
+
+    Calendar features come from the forecast dates and rolling/lag features
+    from each series' observed and predicted totals, computed for the whole
+    batch of series at once. `scale_min` and `scale_scale` are the fitted
+    MinMaxScaler's `min_` and `scale_` for the feature columns.
+    """
+
+    def __init__(self, columns: Sequence[str], forecast_dates: pd.DatetimeIndex, scale_min: np.ndarray,
+                 scale_scale: np.ndarray, holiday_fn: Optional[Callable] = None):
+        check_forecastable(columns)
+        self.columns = list(columns)
+        self.scale_min = np.asarray(scale_min, dtype=np.float64)
+        self.scale_scale = np.asarray(scale_scale, dtype=np.float64)
+        self.history_length = history_length(columns)
+        self.calendar_idx = [i for i, column in enumerate(self.columns) if column in CALENDAR_FEATURES]
+        self._windows = window_features(self.columns)
+
+        # Calendar features of every forecast day, computed once and already scaled
+        calendar = calendar_features(pd.Series(forecast_dates), holiday_fn)
+        self._calendar = np.zeros((len(forecast_dates), len(self.columns)))
+        for i in self.calendar_idx:
+            self._calendar[:, i] = calendar[self.columns[i]].to_numpy()
+        self._calendar = self._calendar * self.scale_scale + self.scale_min
+
+    def exogenous(self, step: int) -> np.ndarray:
+        """Scaled calendar features of forecast day `step`, known before it is predicted."""
+        return self._calendar[step, self.calendar_idx]
+
+    def next_row(self, history: np.ndarray, step: int) -> np.ndarray:
+        """Scaled feature rows for forecast day `step`, given (n_series, k) scaled totals ending on that day."""
+        totals = (np.asarray(history, dtype=np.float64) - self.scale_min[0]) / self.scale_scale[0]
+        rows = np.empty((len(totals), len(self.columns)))
+        rows[:, 0] = totals[:, -1]
+        for i, kind, days in self._windows:
+            if kind == 'lag':
+                rows[:, i] = totals[:, -1 - days]
+            elif kind == 'rolling_avg':
+                rows[:, i] = totals[:, -days:].mean(axis=1)
+            else:
+                rows[:, i] = totals[:, -days:].std(axis=1, ddof=1) if days > 1 else 0.0
+        rows = rows * self.scale_scale + self.scale_min
+        rows[:, self.calendar_idx] = self._calendar[step, self.calendar_idx]
+        return rows
@@ -0,0 +1,410 @@
+"""Long-running forecast service over saved SalesInsightPipeline artifacts.
+
+Run from this directory, for example:
+
+    python ForecastService.py --models ./models --port 8080
+
+then POST {"series_key": "all"} to http://localhost:8080/forecast. Each series
+is read from its own artifact store, `<models>/<series_key>`.
+"""
+import os
+import re
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence
+from urllib.request import Request, urlopen
+
+
+# Series keys name a directory directly under the model root
+SERIES_KEY_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def check_series_key(series_key) -> str:
+    """Reject series keys that are not a plain directory name, such as '../x' or absolute paths."""
+    if not isinstance(series_key, str) or not SERIES_KEY_PATTERN.match(series_key) or series_key in ('.', '..'):
+        raise ValueError(f"Invalid series key: {series_key!r}. Expected letters, digits, '_', '-' or '.'")
+    return series_key
+
+
+def default_pipeline_factory():
+    """A quiet SalesInsightPipeline; forecasting never calls Gemini, so the key is not used."""
+    from SalesForecastingBot import SalesInsightPipeline
+
+    return SalesInsightPipeline(gemini_api_key=os.environ.get('GEMINI_API_KEY', 'unused'), verbose=False)
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies and reports their percentiles."""
+
+    def __init__(self, window: int = 10_000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentiles(self, points: Sequence[float] = (50, 90, 95, 99)) -> Dict[str, float]:
+        """Latency percentiles in milliseconds over the recent window."""
+        with self._lock:
+            samples = np.array(self._samples)
+        if not len(samples):
+            return {f'p{point:g}': None for point in points}
+        values = np.percentile(samples * 1000, points)
+        return {f'p{point:g}': float(value) for point, value in zip(points, values)}
+
+
+class PipelineCache:
+    """LRU cache of loaded pipelines keyed by series.
+
+    A miss loads the series' latest saved artifacts; loads of different
+    series do not block each other, and concurrent misses on the same series
+    load it only once (a failed load fails every request that waited on it). Series keys are checked with check_series_key, and the
+    default path must resolve to a directory inside `model_root`.
+    """
+
+    def __init__(self, model_root: str, pipeline_factory: Callable = default_pipeline_factory,
+                 maxsize: int = 8, path_fn: Optional[Callable[[str], str]] = None):
+        self.model_root = model_root
+        self.pipeline_factory = pipeline_factory
+        self.maxsize = maxsize
+        self.path_fn = path_fn or self._series_path
+        self._pipelines = OrderedDict()
+        self._lock = threading.Lock()
+        # Loads in flight, by series; waiters share the loader's result or its exception
+        self._loading: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _series_path(self, series_key: str) -> str:
+        root = os.path.realpath(self.model_root)
+        path = os.path.realpath(os.path.join(root, series_key))
+        if os.path.dirname(path) != root:
+            raise ValueError(f"Series key {series_key!r} does not name a directory in {self.model_root}")
+        return path
+
+    def get(self, series_key: str):
+        check_series_key(series_key)
+        with self._lock:
+            pipeline = self._pipelines.get(series_key)
+            if pipeline is not None:
+                self._pipelines.move_to_end(series_key)
+                self.hits += 1
+                return pipeline
+            loading = self._loading.get(series_key)
+            if loading is None:
+                loading = self._loading[series_key] = Future()
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            # A failed load raises here too, instead of being retried alongside a new request
+            return loading.result()
+
+        try:
+            pipeline = self.pipeline_factory()
+            pipeline.load_models(self.path_fn(series_key))
+        except BaseException as error:
+            with self._lock:
+                del self._loading[series_key]
+            loading.set_exception(error)
+            raise
+        with self._lock:
+            self.misses += 1
+            self._pipelines[series_key] = pipeline
+            while len(self._pipelines) > self.maxsize:
+                self._pipelines.popitem(last=False)
+                self.evictions += 1
+            # Later requests find the pipeline itself, so the entry is only needed while loading
+            del self._loading[series_key]
+        loading.set_result(pipeline)
+        return pipeline
+
+    def invalidate(self, series_key: Optional[str] = None):
+        """Drop one series (after it was retrained) or every series, so the next request reloads it."""
+        with self._lock:
+            if series_key is None:
+                self._pipelines.clear()
+            else:
+                self._pipelines.pop(series_key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'loaded': list(self._pipelines), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class ForecastService:
+    """Serves forecasts from cached pipelines, micro-batching concurrent requests.
+
+    Requests are queued and a single worker thread drains them: it waits up
+    to `max_wait_ms` for more requests after the first one, groups the batch
+    by series and runs one generate_forecasts call (one batched call per
+    model) for each series in it. Models are only ever used from that thread.
+    """
+
+    def __init__(self, model_root: str, pipeline_factory: Callable = default_pipeline_factory,
+                 max_loaded: int = 8, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.cache = PipelineCache(model_root, pipeline_factory, max_loaded)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.latency = LatencyTracker()
+        self.batch_sizes = deque(maxlen=10_000)
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def start(self) -> 'ForecastService':
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='forecast-batcher', daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join(timeout)
+            self._worker = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, series_key: str = 'all', recent_sales: Optional[Sequence[float]] = None) -> Future:
+        """Queue a forecast request and return a Future of its result.
+
+        `recent_sales` optionally gives the latest daily totals in sales units
+        (univariate models only); by default the forecast continues from the
+        series' saved history.
+        """
+        future = Future()
+        self.start()
+        self._queue.put((series_key, recent_sales, future, time.perf_counter()))
+        return future
+
+    def forecast(self, series_key: str = 'all', recent_sales: Optional[Sequence[float]] = None,
+                 timeout: Optional[float] = 30.0) -> Dict:
+        """Forecast one series and wait for the result."""
+        return self.submit(series_key, recent_sales).result(timeout)
+
+    def _next_batch(self) -> Optional[List]:
+        """Block for one request, then gather more until the batch is full or the wait elapses."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self.batch_sizes.append(len(batch))
+            by_series = OrderedDict()
+            for item in batch:
+                by_series.setdefault(item[0], []).append(item)
+            for series_key, items in by_series.items():
+                self._serve_series(series_key, items)
+
+    def _context(self, pipeline, recent_sales: Optional[Sequence[float]]) -> np.ndarray:
+        if recent_sales is None:
+            return pipeline.last_context()
+        if pipeline.feature_columns:
+            raise ValueError("recent_sales is only supported for univariate models")
+        recent = np.asarray(recent_sales, dtype=np.float64).reshape(-1, 1)
+        if len(recent) < pipeline.lookback:
+            raise ValueError(f"recent_sales needs at least {pipeline.lookback} days, got {len(recent)}")
+        return pipeline.scaler.transform(recent[-pipeline.lookback:])[:, 0]
+
+    def _serve_series(self, series_key: str, items: List):
+        """Answer every queued request for one series with a single batched forecast."""
+        try:
+            pipeline = self.cache.get(series_key)
+        except Exception as e:
+            for _, _, future, _ in items:
+                self._finish(future, error=e)
+            return
+
+        contexts, pending = [], []
+        for _, recent_sales, future, started in items:
+            try:
+                contexts.append(self._context(pipeline, recent_sales))
+                pending.append((future, started))
+            except Exception as e:
+                self._finish(future, started, error=e)
+        if not contexts:
+            return
+
+        try:
+            frames = pipeline.generate_forecasts(contexts)
+        except Exception as e:
+            for future, started in pending:
+                self._finish(future, started, error=e)
+            return
+        for (future, started), frame in zip(pending, frames):
+            result = {'series_key': series_key, **frame.assign(date=frame['date'].dt.strftime('%Y-%m-%d'))
+                      .to_dict(orient='list')}
+            self._finish(future, started, result)
+
+    def _finish(self, future: Future, started: Optional[float] = None, result: Optional[Dict] = None,
+                error: Optional[Exception] = None):
+        if started is not None:
+            self.latency.record(time.perf_counter() - started)
+        if error is not None:
+            self.errors += 1
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> Dict:
+        """Latency percentiles, batching and cache figures."""
+        batch_sizes = list(self.batch_sizes)
+        return {
+            'requests': self.latency.count,
+            'errors': self.errors,
+            'latency_ms': self.latency.percentiles(),
+            'batches': len(batch_sizes),
+            'mean_batch_size': float(np.mean(batch_sizes)) if batch_sizes else None,
+            'queued': self._queue.qsize(),
+            'cache': self.cache.stats()
+        }
+
+
+class InProcessClient:
+    """Client with the HTTP client's interface that calls the service directly."""
+
+    def __init__(self, service: ForecastService):
+        self.service = service
+
+    def forecast(self, series_key: str = 'all', recent_sales: Optional[Sequence[float]] = None) -> Dict:
+        return self.service.forecast(series_key, recent_sales)
+
+    def stats(self) -> Dict:
+        return self.service.stats()
+
+
+class HTTPClient:
+    """Minimal JSON client for a running forecast HTTP server."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path: str, payload: Optional[Dict] = None) -> Dict:
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = Request(self.base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def forecast(self, series_key: str = 'all', recent_sales: Optional[Sequence[float]] = None) -> Dict:
+        payload = {'series_key': series_key}
+        if recent_sales is not None:
+            payload['recent_sales'] = list(recent_sales)
+        return self._request('/forecast', payload)
+
+    def stats(self) -> Dict:
+        return self._request('/stats')
+
+
+def _make_handler(service: ForecastService):
+    class ForecastHandler(BaseHTTPRequestHandler):
+        """JSON endpoints: POST /forecast, GET /stats and GET /health."""
+
+        def _send(self, status: int, body: Dict):
+            payload = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                self._send(200, service.stats())
+            else:
+                self._send(404, {'error': f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/forecast':
+                self._send(404, {'error': f"Unknown path: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                result = service.forecast(request.get('series_key', 'all'), request.get('recent_sales'))
+            except FileNotFoundError as e:
+                self._send(404, {'error': str(e)})
+            except (ValueError, KeyError) as e:
+                self._send(400, {'error': str(e)})
+            except Exception as e:
+                self._send(500, {'error': str(e)})
+            else:
+                self._send(200, result)
+
+        def log_message(self, format, *args):
+            # Request logging would dominate the latency of small forecasts
+            pass
+
+    return ForecastHandler
+
+
+def start_http_server(service: ForecastService, host: str = '127.0.0.1', port: int = 8080) -> ThreadingHTTPServer:
+    """Serve the forecast service over HTTP on a background thread (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    service.start()
+    threading.Thread(target=server.serve_forever, name='forecast-http', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve forecasts from saved pipelines over HTTP.')
+    parser.add_argument('--models', default='./models', help='Directory holding one artifact store per series')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-loaded', type=int, default=8, help='Pipelines kept in memory')
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    service = ForecastService(args.models, max_loaded=args.max_loaded, max_batch_size=args.max_batch_size,
+                              max_wait_ms=args.max_wait_ms)
+    server = start_http_server(service, args.host, args.port)
+    print(f"Serving forecasts from {args.models} on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import numpy as np
+from typing import Dict, Tuple
+
+
+def apply_config(system, config: Dict):
+    """Apply a searched configuration to a forecasting system before it is trained."""
+    if 'lookback' in config:
+        system.lookback = config['lookback']
+    system.lstm_params.update(config.get('lstm', {}))
+    system.xgb_params.update(config.get('xgb', {}))
+
+
+def development_windows(system, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Windows before the system's chronological test split, so tuning never sees the test period."""
+    splits = system.split_data(X, y)
+    # SimpleSalesForecastSystem returns (X, y) pairs, SalesInsightPipeline six arrays
+    n_test = len(splits[2][0]) if isinstance(splits[0], tuple) else len(splits[2])
+    n_dev = len(X) - n_test
+    return X[:n_dev], y[:n_dev]
@@ -0,0 +1,348 @@
+import itertools
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from BatchForecasting import BatchForecaster
+from Instrumentation import Instrumentation
+from SalesIngestion import PANDAS_FREQUENCIES, DailySalesAggregator, parse_timestamps, period_range
+
+# 'bottom_up' sums the leaf forecasts, 'top_down' splits the total by historical
+# proportions and 'mint' projects every level onto the coherent subspace
+RECONCILIATION_METHODS = ('bottom_up', 'top_down', 'mint')
+
+# MinT error covariance estimates, all diagonal so nothing n_nodes x n_nodes is formed:
+# 'ols' identity, 'structural' leaves per node, 'variance' in-sample residual variances
+MINT_WEIGHTS = ('ols', 'structural', 'variance')
+
+
+def check_reconciliation_method(method: str):
+    if method not in RECONCILIATION_METHODS:
+        raise ValueError(f"Unknown reconciliation method: {method}. Expected one of {RECONCILIATION_METHODS}")
+
+
+def hierarchy_levels(columns: Sequence[str], grouped: bool = False) -> List[List[str]]:
+    """Aggregation levels over the given columns, from the total ([]) down to the leaves.
+
+    Nested by default (total, category, category x customer_type); with
+    grouped=True every subset of the columns is a level, so customer_type
+    totals across categories are forecast and reconciled too.
+    """
+    columns = list(columns)
+    if grouped:
+        return [list(subset) for size in range(len(columns) + 1)
+                for subset in itertools.combinations(columns, size)]
+    return [columns[:depth] for depth in range(len(columns) + 1)]
+
+
+class Hierarchy:
+    """Aggregation structure of leaf series, held as a sparse summing matrix.
+
+    `S` is a (n_nodes, n_leaves) CSR matrix with a one wherever a leaf
+    belongs to a node, so every level is `S @ leaf_values`. It has
+    n_leaves * n_levels non-zeros, so thousands of leaves stay cheap.
+    `nodes` lists every node's level and key values (None where a column
+    is aggregated over), in row order of `S`.
+    """
+
+    def __init__(self, leaves: pd.DataFrame, levels: Optional[Sequence[Sequence[str]]] = None):
+        self.columns = list(leaves.columns)
+        self.leaves = leaves.drop_duplicates().sort_values(self.columns).reset_index(drop=True)
+        self.levels = [list(level) for level in (levels if levels is not None else hierarchy_levels(self.columns))]
+        if self.columns not in self.levels:
+            self.levels.append(self.columns)
+
+        rows, node_frames, offset = [], [], 0
+        for level in self.levels:
+            if level:
+                codes = self.leaves.groupby(level, sort=True, observed=True).ngroup().to_numpy()
+                keys = self.leaves[level].drop_duplicates().sort_values(level).reset_index(drop=True)
+            else:
+                codes = np.zeros(len(self.leaves), dtype=np.int64)
+                keys = pd.DataFrame(index=range(1))
+            rows.append(offset + codes)
+            node_frames.append(keys.assign(level='/'.join(level) or 'total'))
+            offset += len(keys)
+
+        self.nodes = pd.concat(node_frames, ignore_index=True)[['level'] + self.columns]
+        self.nodes[self.columns] = self.nodes[self.columns].astype(object).where(self.nodes[self.columns].notna(), None)
+        leaf_ids = np.tile(np.arange(len(self.leaves)), len(self.levels))
+        self.S = sp.csr_matrix((np.ones(len(leaf_ids)), (np.concatenate(rows), leaf_ids)),
+                               shape=(offset, len(self.leaves)))
+
+    @classmethod
+    def from_transactions(cls, df: pd.DataFrame, columns: Sequence[str], grouped: bool = False) -> 'Hierarchy':
+        """The hierarchy of every value combination of `columns` present in the transactions."""
+        columns = list(columns)
+        leaves = df[columns].drop_duplicates()
+        leaves = leaves.astype({column: object for column in columns})
+        return cls(leaves, hierarchy_levels(columns, grouped))
+
+    @property
+    def n_nodes(self) -> int:
+        return self.S.shape[0]
+
+    @property
+    def n_leaves(self) -> int:
+        return self.S.shape[1]
+
+    @property
+    def leaf_rows(self) -> np.ndarray:
+        """Node rows of the leaves, in leaf order."""
+        return np.flatnonzero(self.nodes['level'].to_numpy() == '/'.join(self.columns))
+
+    @property
+    def total_row(self) -> Optional[int]:
+        rows = np.flatnonzero(self.nodes['level'].to_numpy() == 'total')
+        return int(rows[0]) if len(rows) else None
+
+    def aggregate(self, leaf_values: np.ndarray) -> np.ndarray:
+        """(n_nodes, ...) values of every node from (n_leaves, ...) leaf values."""
+        return np.asarray(self.S @ np.asarray(leaf_values, dtype=np.float64))
+
+    def coherence_error(self, values: np.ndarray) -> float:
+        """Largest gap between node values and the sums of their leaves (0 for coherent forecasts)."""
+        values = np.asarray(values, dtype=np.float64)
+        return float(np.abs(values - self.aggregate(values[self.leaf_rows])).max())
+
+    def leaf_series(self, df: pd.DataFrame, freq: str = 'D') -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """Period starts and (n_leaves, n_periods) sales totals; periods without sales are zeros."""
+        aggregator = DailySalesAggregator(self.columns, freq)
+        slim = df[['total'] + self.columns]
+        if 'datetime' in df.columns:
+            slim = slim.assign(datetime=df['datetime'])
+        else:
+            slim = slim.assign(datetime=parse_timestamps(df['timestamp']))
+        aggregator.add_chunk(slim)
+        totals = aggregator.result()
+
+        dates = pd.date_range(totals['date'].min(), totals['date'].max(), freq=PANDAS_FREQUENCIES[freq])
+        leaf_index = pd.MultiIndex.from_frame(self.leaves)
+        rows = leaf_index.get_indexer(pd.MultiIndex.from_frame(totals[self.columns].astype(object)))
+        if (rows < 0).any():
+            raise ValueError("Transactions contain group values that are not leaves of this hierarchy")
+        series = np.zeros((self.n_leaves, len(dates)))
+        np.add.at(series, (rows, dates.get_indexer(totals['date'])), totals['total'].to_numpy(dtype=np.float64))
+        return dates, series
+
+    def series(self, df: pd.DataFrame, freq: str = 'D') -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """Period starts and (n_nodes, n_periods) sales totals of every node."""
+        dates, leaf_series = self.leaf_series(df, freq)
+        return dates, self.aggregate(leaf_series)
+
+
+def _block_pcg(matvec: Callable[[np.ndarray], np.ndarray], B: np.ndarray, inverse_diagonal: np.ndarray,
+               tol: float = 1e-10, maxiter: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """Jacobi-preconditioned conjugate gradient for A X = B, every column of B solved together.
+
+    `matvec` applies the symmetric positive definite A to a block of
+    vectors, so each iteration is a couple of sparse products for all
+    columns instead of one solve per column.
+    """
+    X = np.zeros_like(B)
+    R = B.copy()
+    Z = inverse_diagonal[:, np.newaxis] * R
+    P = Z.copy()
+    rz = np.einsum('ij,ij->j', R, Z)
+    targets = tol * np.maximum(np.linalg.norm(B, axis=0), np.finfo(np.float64).tiny)
+    maxiter = maxiter or 10 * B.shape[0]
+    for iteration in range(1, maxiter + 1):
+        AP = matvec(P)
+        curvature = np.einsum('ij,ij->j', P, AP)
+        alpha = np.divide(rz, curvature, out=np.zeros_like(rz), where=curvature > 0)
+        X += alpha * P
+        R -= alpha * AP
+        if np.all(np.linalg.norm(R, axis=0) <= targets):
+            return X, iteration
+        Z = inverse_diagonal[:, np.newaxis] * R
+        rz_next = np.einsum('ij,ij->j', R, Z)
+        beta = np.divide(rz_next, rz, out=np.zeros_like(rz), where=rz > 0)
+        P = Z + beta * P
+        rz = rz_next
+    return X, maxiter
+
+
+class HierarchicalReconciler:
+    """Makes forecasts of every node of a Hierarchy add up, with sparse matrix products only.
+
+    bottom_up: S @ leaf forecasts. top_down: the total forecast split by
+    each leaf's share of historical sales, then aggregated. mint: the
+    minimum-trace projection S (S' W^-1 S)^-1 S' W^-1 y with a diagonal W;
+    the n_leaves x n_leaves system is never formed but solved by
+    preconditioned conjugate gradient on S' W^-1 S applied as products.
+    """
+
+    def __init__(self, hierarchy: Hierarchy, method: str = 'mint', weights: str = 'variance',
+                 tol: float = 1e-10, maxiter: Optional[int] = None):
+        check_reconciliation_method(method)
+        if weights not in MINT_WEIGHTS:
+            raise ValueError(f"Unknown MinT weights: {weights}. Expected one of {MINT_WEIGHTS}")
+        self.hierarchy = hierarchy
+        self.method = method
+        self.weights = weights
+        self.tol = tol
+        self.maxiter = maxiter
+        self.proportions = None
+        self.variances = None
+        self.iterations = 0
+
+    def fit(self, history: Optional[np.ndarray] = None, residuals: Optional[np.ndarray] = None) -> 'HierarchicalReconciler':
+        """Estimate top-down proportions from (n_nodes, n_periods) `history` and MinT
+        variances from (n_nodes, n_residuals) in-sample `residuals`."""
+        hierarchy = self.hierarchy
+        if history is not None:
+            leaf_means = np.asarray(history, dtype=np.float64)[hierarchy.leaf_rows].mean(axis=1)
+            self.proportions = leaf_means / leaf_means.sum() if leaf_means.sum() else \
+                np.full(hierarchy.n_leaves, 1.0 / hierarchy.n_leaves)
+        if residuals is not None:
+            variances = np.nanvar(np.asarray(residuals, dtype=np.float64), axis=1)
+            # Nodes with no residual spread would get infinite weight
+            floor = max(float(np.nanmean(variances)), 1.0) * 1e-6
+            self.variances = np.maximum(np.nan_to_num(variances, nan=floor), floor)
+        return self
+
+    def _inverse_weights(self) -> np.ndarray:
+        if self.weights == 'ols':
+            return np.ones(self.hierarchy.n_nodes)
+        if self.weights == 'structural':
+            return 1.0 / np.asarray(self.hierarchy.S.sum(axis=1)).ravel()
+        if self.variances is None:
+            raise ValueError("MinT variance weights need in-sample residuals; call fit(residuals=...) first")
+        return 1.0 / self.variances
+
+    def reconcile(self, base: np.ndarray) -> np.ndarray:
+        """Coherent (n_nodes, horizon) forecasts from base forecasts of every node."""
+        hierarchy = self.hierarchy
+        base = np.asarray(base, dtype=np.float64)
+        if base.shape[0] != hierarchy.n_nodes:
+            raise ValueError(f"Expected forecasts for {hierarchy.n_nodes} nodes, got {base.shape[0]}")
+
+        if self.method == 'bottom_up':
+            return hierarchy.aggregate(base[hierarchy.leaf_rows])
+        if self.method == 'top_down':
+            if hierarchy.total_row is None or self.proportions is None:
+                raise ValueError("Top-down reconciliation needs a total level and fitted proportions")
+            return hierarchy.aggregate(np.outer(self.proportions, base[hierarchy.total_row]))
+
+        S, inverse_weights = hierarchy.S, self._inverse_weights()
+        St_winv = (S.T @ sp.diags(inverse_weights)).tocsr()
+
+        def matvec(V):
+            return St_winv @ (S @ V)
+
+        # Jacobi preconditioner: the diagonal of S' W^-1 S sums the inverse weights of each leaf's nodes
+        diagonal = np.asarray(S.multiply(inverse_weights[:, np.newaxis]).sum(axis=0)).ravel()
+        leaves, self.iterations = _block_pcg(matvec, St_winv @ base.reshape(len(base), -1), 1.0 / diagonal,
+                                             self.tol, self.maxiter)
+        return hierarchy.aggregate(leaves).reshape(base.shape)
+
+
+class HierarchicalForecaster:
+    """Forecasts every node of a category/customer_type hierarchy in one batch and reconciles them.
+
+    One model pair from `system_factory` (a SimpleSalesForecastSystem or a
+    univariate SalesInsightPipeline) is fitted on the windows of all node
+    series at once, each series min-max scaled on its own, so thousands of
+    nodes cost one training run and one batched forecast instead of a model
+    per series. The base forecasts are then reconciled with
+    HierarchicalReconciler; MinT variance weights come from each node's
+    one-step errors on its validation windows.
+    """
+
+    def __init__(self, system_factory: Callable, columns: Sequence[str] = ('category', 'customer_type'),
+                 system_kwargs: Optional[Dict] = None, grouped: bool = False, method: str = 'mint',
+                 weights: str = 'variance', validation_fraction: float = 0.1, verbose: bool = True,
+                 instrumentation: Optional[Instrumentation] = None):
+        check_reconciliation_method(method)
+        self.system_factory = system_factory
+        self.columns = list(columns)
+        self.system_kwargs = system_kwargs or {}
+        self.grouped = grouped
+        self.method = method
+        self.weights = weights
+        self.validation_fraction = validation_fraction
+        self.system = None
+        self.hierarchy = None
+        self.reconciler = None
+        self.freq = 'D'
+        self.dates = self.history = None
+        # Progress output goes through the instrumentation; verbose=False silences it
+        self.instrumentation = instrumentation or Instrumentation(verbose=verbose)
+
+    def _log(self, *args):
+        self.instrumentation.log(*args)
+
+    def _windows(self, scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(n_nodes, n_windows, lookback) inputs and (n_nodes, n_windows, target_horizon) targets."""
+        system = self.system
+        width = system.lookback + system.target_horizon
+        if scaled.shape[1] < width + 1:
+            raise ValueError(f"Need at least {width + 1} periods of history, got {scaled.shape[1]}")
+        windows = sliding_window_view(scaled, width, axis=1)
+        return windows[..., :system.lookback], windows[..., system.lookback:]
+
+    def _one_step(self, forecaster: BatchForecaster, windows: np.ndarray) -> np.ndarray:
+        """One-step-ahead ensemble predictions for a batch of scaled windows."""
+        if self.system.forecast_strategy == 'direct':
+            return forecaster.forecast_direct(windows)['ensemble'][:, 0]
+        return (forecaster.predict_lstm(windows) + forecaster.predict_xgb(windows)) / 2
+
+    def fit(self, df: pd.DataFrame) -> 'HierarchicalForecaster':
+        """Build the hierarchy and node series from transactions and fit the shared models."""
+        self.system = system = self.system_factory(**{'verbose': False, **self.system_kwargs})
+        if getattr(system, 'feature_columns', None):
+            raise ValueError("Hierarchical forecasting supports univariate systems only")
+        self.freq = getattr(system, 'freq', 'D')
+        self.hierarchy = Hierarchy.from_transactions(df, self.columns, self.grouped)
+        self.dates, self.history = self.hierarchy.series(df, self.freq)
+
+        # Min-max scale every node on its own, so large and small series train one model
+        self.offset = self.history.min(axis=1, keepdims=True)
+        self.scale = np.maximum(self.history.max(axis=1, keepdims=True) - self.offset, 1e-9)
+        self.scaled = ((self.history - self.offset) / self.scale).astype(np.float32)
+
+        X, y = self._windows(self.scaled)
+        n_val = max(1, int(X.shape[1] * self.validation_fraction))
+        lookback, target_horizon = system.lookback, system.target_horizon
+
+        def table(X_part, y_part):
+            y_part = y_part.reshape(-1, target_horizon)
+            return X_part.reshape(-1, lookback), (y_part[:, 0] if target_horizon == 1 else y_part)
+
+        self._log(f"\nFitting one model pair on {self.hierarchy.n_nodes} series "
+                  f"({self.hierarchy.n_leaves} leaves, {X.shape[0] * X.shape[1]} windows)...")
+        system.fit_models(*table(X[:, :-n_val], y[:, :-n_val]), *table(X[:, -n_val:], y[:, -n_val:]))
+
+        # One-step validation errors per node, in sales units, for the MinT weights
+        self.forecaster = BatchForecaster(system.models['lstm'], system.models['xgb'], lookback,
+                                          system.forecast_horizon)
+        X_val = np.ascontiguousarray(X[:, -n_val:]).reshape(-1, lookback)
+        predicted = self._one_step(self.forecaster, X_val).reshape(self.hierarchy.n_nodes, n_val)
+        residuals = (y[:, -n_val:, 0] - predicted) * self.scale
+
+        self.reconciler = HierarchicalReconciler(self.hierarchy, self.method, self.weights)
+        self.reconciler.fit(history=self.history, residuals=residuals)
+        return self
+
+    def forecast(self) -> pd.DataFrame:
+        """Base and reconciled forecasts of every node, as one long-format table."""
+        system, hierarchy = self.system, self.hierarchy
+        windows = self.scaled[:, -system.lookback:]
+        if system.forecast_strategy == 'direct':
+            scaled = self.forecaster.forecast_direct(windows)['ensemble']
+        else:
+            scaled = self.forecaster.forecast(windows, feedback=system.FORECAST_FEEDBACK)['ensemble']
+        base = scaled * self.scale + self.offset
+        reconciled = self.reconciler.reconcile(base)
+
+        horizon = base.shape[1]
+        forecast_dates = period_range(self.dates[-1], horizon + 1, self.freq)[1:]
+        frame = hierarchy.nodes.loc[np.repeat(np.arange(hierarchy.n_nodes), horizon)].reset_index(drop=True)
+        frame['date'] = np.tile(forecast_dates, hierarchy.n_nodes)
+        frame['base_forecast'] = base.ravel()
+        frame['predicted_sales'] = reconciled.ravel()
+        return frame
+
+    def fit_forecast(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).forecast()
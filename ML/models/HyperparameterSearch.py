@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import random
+import itertools
+import multiprocessing
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from MultiSeriesForecasting import GroupKey, _as_key_list, _limit_worker_threads, split_by_group
+from Instrumentation import Instrumentation
+from ForecastSetup import apply_config, development_windows
+
+# Candidate values per hyperparameter; dotted names address the pipelines'
+# `lstm_params` and `xgb_params` dictionaries
+DEFAULT_SEARCH_SPACE = {
+    'lookback': [2, 7, 14],
+    'lstm.units': [20, 50],
+    'lstm.epochs': [100],
+    'xgb.max_depth': [3, 5],
+    'xgb.n_estimators': [100, 300]
+}
+
+
+def expand_config(flat: Dict) -> Dict:
+    """Turn {'lookback': 7, 'lstm.units': 50} into {'lookback': 7, 'lstm': {'units': 50}}."""
+    config = {}
+    for name, value in flat.items():
+        if '.' in name:
+            section, param = name.split('.', 1)
+            config.setdefault(section, {})[param] = value
+        else:
+            config[name] = value
+    return config
+
+
+def candidate_configs(search_space: Dict[str, List], n_trials: Optional[int] = None,
+                      seed: int = 0) -> List[Dict]:
+    """Every combination of the search space, or a random sample of `n_trials` of them."""
+    names = list(search_space)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(search_space[n] for n in names))]
+    if n_trials is not None and n_trials < len(combos):
+        combos = random.Random(seed).sample(combos, n_trials)
+    return [expand_config(combo) for combo in combos]
+
+
+def walk_forward_folds(n_windows: int, n_folds: int = 3, gap: int = 0,
+                       min_train: int = 2) -> List[Tuple[slice, slice]]:
+    """Expanding-window (train, validation) slices over chronologically ordered windows.
+
+    Each fold validates on the block of windows that follows its training
+    windows; `gap` windows are skipped in between so multi-day targets of
+    the training windows never overlap the validation period.
+    """
+    val_size = max(1, n_windows // (n_folds + 1))
+    folds = []
+    for k in range(n_folds):
+        val_start = n_windows - (n_folds - k) * val_size
+        train_end = val_start - gap
+        if train_end < min_train:
+            continue
+        folds.append((slice(0, train_end), slice(val_start, val_start + val_size)))
+    return folds
+
+
+def validation_loss(system, X: np.ndarray, y: np.ndarray) -> float:
+    """Mean squared error of the ensemble forecast on scaled validation windows."""
+    lstm_preds = system.models['lstm'].predict(system._lstm_inputs(X), verbose=0).reshape(len(X), -1)
+    xgb_preds = np.asarray(system.models['xgb'].predict(X)).reshape(len(X), -1)
+    ensemble = (lstm_preds + xgb_preds) / 2
+    return float(np.mean((ensemble - np.asarray(y).reshape(len(X), -1)) ** 2))
+
+
+class MedianPruner:
+    """Stops a trial whose running validation loss is worse than the median of earlier trials.
+
+    A fold is only judged once at least `min_trials` trials have reported a
+    score for it, and the first `warmup_folds` folds are never pruned.
+    """
+
+    def __init__(self, min_trials: int = 3, warmup_folds: int = 0):
+        self.min_trials = min_trials
+        self.warmup_folds = warmup_folds
+
+    def should_prune(self, fold: int, running_loss: float, history: Dict[int, List[float]]) -> bool:
+        reported = history.get(fold, [])
+        if fold < self.warmup_folds or len(reported) < self.min_trials:
+            return False
+        return running_loss > float(np.median(reported))
+
+
+def _run_trial(system_factory: Callable, system_kwargs: Dict, config: Dict, scaled_data: np.ndarray,
+               n_folds: int, pruner: Optional[MedianPruner], history: Dict[int, List[float]],
+               history_lock=None) -> Dict:
+    """Evaluate one configuration with walk-forward validation (runs in a worker).
+
+    `history` is shared by every trial of a search: after each fold the trial
+    is judged against the running losses other trials reported for that fold
+    so far, then adds its own under `history_lock`.
+    """
+    start = time.perf_counter()
+    result = {'config': config, 'fold_losses': [], 'running_losses': [], 'pruned': False,
+              'lstm_epochs': 0, 'error': None}
+    try:
+        system = system_factory(**{'verbose': False, **system_kwargs})
+        apply_config(system, config)
+        X, y = system.create_sequences(scaled_data)
+        X_dev, y_dev = development_windows(system, X, y)
+
+        folds = walk_forward_folds(len(X_dev), n_folds, gap=system.target_horizon - 1)
+        if not folds:
+            raise ValueError(f"Not enough windows ({len(X_dev)}) for walk-forward validation")
+
+        for fold, (train, val) in enumerate(folds):
+            system.fit_models(X_dev[train], y_dev[train], X_dev[val], y_dev[val])
+            result['lstm_epochs'] += system.fit_stats.get('lstm_epochs', 0)
+            result['fold_losses'].append(validation_loss(system, X_dev[val], y_dev[val]))
+            running_loss = float(np.mean(result['fold_losses']))
+            result['running_losses'].append(running_loss)
+            prune = pruner and fold < len(folds) - 1 and pruner.should_prune(fold, running_loss, history)
+            with history_lock or nullcontext():
+                history[fold] = list(history.get(fold, [])) + [running_loss]
+            if prune:
+                result['pruned'] = True
+                break
+        result['loss'] = result['running_losses'][-1]
+    except Exception as e:
+        result['loss'] = float('inf')
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+class HyperparameterSearch:
+    """Parallel walk-forward search over lookback and model hyperparameters.
+
+    Trials run in a process pool and report their running loss after every
+    fold to a history shared across processes, so the pruner can stop a trial
+    after any fold where it is already worse than the median of the trials
+    that reached that fold, including ones still running; inside every fit,
+    early stopping cuts the epochs that no longer improve validation loss.
+    """
+
+    def __init__(self, system_factory: Callable, system_kwargs: Optional[Dict] = None,
+                 search_space: Optional[Dict[str, List]] = None, n_trials: Optional[int] = None,
+                 n_folds: int = 3, max_workers: Optional[int] = None,
+                 pruner: Optional[MedianPruner] = None, seed: int = 0, verbose: bool = True,
+                 instrumentation: Optional[Instrumentation] = None):
+        self.system_factory = system_factory
+        self.system_kwargs = system_kwargs or {}
+        self.search_space = search_space or DEFAULT_SEARCH_SPACE
+        self.n_trials = n_trials
+        self.n_folds = n_folds
+        self.max_workers = max_workers or os.cpu_count()
+        self.pruner = pruner if pruner is not None else MedianPruner()
+        self.seed = seed
+        self.trials: List[Dict] = []
+        # Progress output goes through the instrumentation; verbose=False silences it
+        self.instrumentation = instrumentation or Instrumentation(verbose=verbose)
+
+    def _log(self, *args):
+        self.instrumentation.log(*args)
+
+    def prepare(self, df: pd.DataFrame) -> np.ndarray:
+        """Scaled series for a transaction frame, prepared the way the system trains on it."""
+        system = self.system_factory(**{'verbose': False, **self.system_kwargs})
+        _, scaled_data = system.prepare_data(system.process_data(df))
+        return scaled_data
+
+    def search(self, scaled_data: np.ndarray, series_key: str = 'all',
+               results_path: Optional[str] = None) -> Dict:
+        """Evaluate the candidate configurations and return the best one.
+
+        The best configuration is also written to `results_path` under
+        `series_key` when a path is given.
+        """
+        configs = candidate_configs(self.search_space, self.n_trials, self.seed)
+        self._log(f"\nSearching {len(configs)} configurations for '{series_key}' on {self.max_workers} workers...")
+
+        self.trials = []
+        pending = list(configs)
+        # Spawned workers avoid forking a process that has already initialised TensorFlow
+        context = multiprocessing.get_context('spawn')
+        with context.Manager() as manager, \
+                ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                    initializer=_limit_worker_threads) as executor:
+            # Fold losses are shared live, so trials running side by side can prune each other
+            history, history_lock = manager.dict(), manager.Lock()
+            running = set()
+            while pending or running:
+                while pending and len(running) < self.max_workers:
+                    running.add(executor.submit(_run_trial, self.system_factory, self.system_kwargs,
+                                                pending.pop(0), scaled_data, self.n_folds, self.pruner,
+                                                history, history_lock))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                self.trials.extend(future.result() for future in done)
+
+        completed = [trial for trial in self.trials if not trial['pruned'] and trial['error'] is None]
+        if not completed:
+            errors = {trial['error'] for trial in self.trials if trial['error']}
+            raise ValueError(f"No configuration completed validation: {errors or 'all trials were pruned'}")
+
+        best = min(completed, key=lambda trial: trial['loss'])
+        n_pruned = sum(trial['pruned'] for trial in self.trials)
+        self._log(f"Best validation loss {best['loss']:.5f} with {best['config']} "
+                  f"({n_pruned} of {len(self.trials)} trials pruned)")
+
+        if results_path:
+            save_best_config(results_path, series_key, best)
+        return best
+
+    def search_groups(self, df: pd.DataFrame, group_key: GroupKey = 'category',
+                      results_path: Optional[str] = None) -> Dict[str, Dict]:
+        """Search a configuration for every group of transactions, keyed like 'category=Beverages'."""
+        keys = _as_key_list(group_key)
+        best = {}
+        for group_values, group_df in split_by_group(df, keys).items():
+            series_key = ','.join(f"{key}={value}" for key, value in zip(keys, group_values))
+            try:
+                best[series_key] = self.search(self.prepare(group_df), series_key, results_path)
+            except ValueError as e:
+                self._log(f"Warning: Skipping series {series_key}: {e}")
+        return best
+
+
+def save_best_config(path: str, series_key: str, trial: Dict):
+    """Record the best configuration for a series in a JSON file (atomically replaced)."""
+    configs = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            configs = json.load(f)
+    configs[series_key] = {
+        'config': trial['config'],
+        'loss': trial['loss'],
+        'fold_losses': trial['fold_losses'],
+        'searched_at': datetime.now().isoformat()
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(configs, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_best_config(path: str, series_key: str = 'all') -> Optional[Dict]:
+    """The stored best configuration for a series, or None if it has not been searched."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        entry = json.load(f).get(series_key)
+    return entry['config'] if entry else None
@@ -0,0 +1,135 @@
+"""Cold-start benchmark for the entry points of the sales forecasting modules.
+
+Each entry point runs in a fresh interpreter so that module caches from one
+measurement never leak into the next. Run from this directory:
+
+    python ImportTimeBenchmark.py --repeats 5 --baseline import_baseline.json
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+from typing import Dict, List, Optional
+
+# Modules that should only be imported when a model actually needs them
+HEAVY_MODULES = ['tensorflow', 'keras', 'xgboost', 'sklearn', 'google.generativeai', 'ipywidgets']
+
+_CHATBOT_QUERY = '''
+import pandas as pd
+from SalesForecastingBot import SalesDataChatbot
+
+class _Response:
+    text = 'ok'
+
+class _StubModel:
+    def generate_content(self, prompt):
+        return _Response()
+
+df = pd.DataFrame({
+    'date': pd.date_range('2022-03-01', periods=10).date,
+    'total': range(10),
+    'category': ['a', 'b'] * 5,
+    'customer_type': ['gold'] * 10,
+    'payment_type': ['cash'] * 10
+})
+SalesDataChatbot(_StubModel()).query_data(df, 'What is our average daily revenue?')
+'''
+
+# Entry point name -> code executed in a fresh interpreter
+ENTRY_POINTS = {
+    'bot_import': 'import SalesForecastingBot',
+    'chatbot_query': _CHATBOT_QUERY,
+    'forecasting_import': 'import MultiModalTimeSeriesForcasting',
+    'artifact_store_import': 'import ModelArtifacts'
+}
+
+_HARNESS = '''
+import sys, time, json
+start = time.perf_counter()
+exec(compile({code!r}, '<entry point>', 'exec'))
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy_modules': heavy}}))
+'''
+
+
+def time_entry_point(code: str, repeats: int = 3) -> Dict:
+    """Run `code` in `repeats` fresh interpreters and summarise the timings."""
+    models_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    harness = _HARNESS.format(code=code, heavy=HEAVY_MODULES)
+
+    timings = []
+    heavy_modules = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', harness], cwd=models_dir, env=env,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Entry point failed:\n{result.stderr}")
+        measurement = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(measurement['seconds'])
+        heavy_modules = measurement['heavy_modules']
+
+    return {
+        'median_seconds': statistics.median(timings),
+        'min_seconds': min(timings),
+        'max_seconds': max(timings),
+        'heavy_modules': heavy_modules
+    }
+
+
+def run_benchmark(entry_points: Optional[List[str]] = None, repeats: int = 3) -> Dict[str, Dict]:
+    """Time every (or the selected) entry point."""
+    names = entry_points or list(ENTRY_POINTS)
+    return {name: time_entry_point(ENTRY_POINTS[name], repeats) for name in names}
+
+
+def compare_to_baseline(results: Dict[str, Dict], baseline: Dict[str, Dict],
+                        tolerance: float = 0.25) -> List[str]:
+    """Entry points whose median start-up time regressed by more than `tolerance` (relative)."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        allowed = baseline[name]['median_seconds'] * (1 + tolerance)
+        if result['median_seconds'] > allowed:
+            regressions.append(
+                f"{name}: {result['median_seconds']:.3f}s vs baseline {baseline[name]['median_seconds']:.3f}s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start time of each entry point.')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--entry-point', action='append', choices=sorted(ENTRY_POINTS))
+    parser.add_argument('--baseline', help='JSON file with previous results to compare against')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.entry_point, args.repeats)
+
+    print(f"{'Entry point':<24}{'median (s)':>12}{'min (s)':>10}  heavy modules loaded")
+    for name, result in results.items():
+        print(f"{name:<24}{result['median_seconds']:>12.3f}{result['min_seconds']:>10.3f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nStart-up regressions:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from SequenceWindows import make_windows, flatten_windows
+from SalesIngestion import complete_period_totals, fill_missing_periods
+
+
+def new_daily_sales(history: pd.DataFrame, new_df: pd.DataFrame, value_col: str,
+                    fill_gaps: bool = False, freq: str = 'D') -> pd.DataFrame:
+    """Aggregate new transactions to daily totals and keep only days after the stored history.
+
+    With fill_gaps=True, missing days between the end of the history and the
+    new data are linearly interpolated, matching how the history was built.
+    With freq='H' or 'W' the totals are hourly or weekly, and missing hours
+    are filled with zeros instead; an hour or week the new data only partly
+    covers is left out until the rest of it arrives.
+    """
+    timestamps = new_df['datetime'] if 'datetime' in new_df.columns else new_df['date']
+    daily = complete_period_totals(new_df['total'], timestamps, freq).rename(value_col)
+    daily = daily.rename_axis('date').reset_index()
+
+    last_date = pd.to_datetime(history['date']).max()
+    daily = daily[daily['date'] > last_date].sort_values('date')
+    if daily.empty or not fill_gaps:
+        return daily.reset_index(drop=True)
+
+    # Anchor the interpolation on the last stored period, then drop it again
+    anchor = pd.DataFrame({'date': [last_date], value_col: [history[value_col].iloc[-1]]})
+    daily = fill_missing_periods(pd.concat([anchor, daily]).set_index('date'), freq).iloc[1:]
+    return daily.reset_index()
+
+
+def update_windows(history_scaled: np.ndarray, new_scaled: np.ndarray, lookback: int,
+                   replay: int = 0, horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Windows whose targets include new days, plus the last `replay` historical windows.
+
+    With horizon > 1 (direct forecasting) each target is the next `horizon` days.
+    """
+    tail = history_scaled[-(lookback + replay + horizon - 1):]
+    series = np.concatenate([tail.reshape(-1, 1), new_scaled.reshape(-1, 1)])
+    X, y = make_windows(series, lookback, horizon=horizon)
+    return flatten_windows(X), y
+
+
+def warm_start_models(models: Dict, X: np.ndarray, y: np.ndarray, lstm_epochs: int = 5,
+                      xgb_rounds: int = 10, batch_size: int = 32):
+    """Continue training the existing LSTM and XGBoost models on a handful of new windows.
+
+    The LSTM keeps its weights and optimizer and trains for a few more epochs;
+    XGBoost appends `xgb_rounds` trees to the existing booster instead of
+    refitting from scratch.
+    """
+    if len(X) == 0:
+        return
+
+    models['lstm'].fit(
+        X.reshape(X.shape[0], X.shape[1], 1), y,
+        epochs=lstm_epochs,
+        batch_size=batch_size,
+        verbose=0
+    )
+
+    # Continuation has no validation set, so early stopping is off for these rounds
+    xgb_model = models['xgb']
+    params = xgb_model.get_params()
+    booster = xgb_model.get_booster()
+    # An early-stopped booster is cut back to its best round and forgets it; otherwise predict
+    # would keep stopping at the old best iteration and ignore every appended tree
+    if booster.attr('best_iteration') is not None:
+        booster = booster[:int(booster.attr('best_iteration')) + 1]
+        booster.set_attr(best_iteration=None, best_score=None)
+    xgb_model.set_params(n_estimators=xgb_rounds, early_stopping_rounds=None)
+    xgb_model.fit(X, y, xgb_model=booster)
+    xgb_model.set_params(n_estimators=params['n_estimators'], early_stopping_rounds=params['early_stopping_rounds'])
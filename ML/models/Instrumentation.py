@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux), or 0 where unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class PeakRSSSampler:
+    """Samples RSS on a background thread to find the peak while a block runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+class MemorySink:
+    """Keeps stage records in a list, for tests and interactive inspection."""
+
+    def __init__(self):
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        with self._lock:
+            self.records.append(record)
+
+    def by_stage(self, stage: str) -> List[Dict]:
+        return [record for record in self.records if record['stage'] == stage]
+
+
+class JsonLinesSink:
+    """Appends one JSON object per stage record to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+
+class StageContext:
+    """Mutable view of a running stage, so the code inside can report rows and model calls."""
+
+    def __init__(self, name: str, rows: Optional[int], metadata: Dict):
+        self.name = name
+        self.rows = rows
+        self.model_calls = 0
+        self.metadata = metadata
+
+
+class Instrumentation:
+    """Records wall time, CPU time, peak RSS, row counts and model calls per pipeline stage.
+
+    Records go to every configured sink; with no sinks, stages cost only a
+    couple of clock reads. `verbose` controls the pipelines' progress prints.
+    """
+
+    def __init__(self, sinks: Optional[List] = None, verbose: bool = True, sample_rss: bool = True):
+        self.sinks = list(sinks or [])
+        self.verbose = verbose
+        self.sample_rss = sample_rss
+        self._local = threading.local()
+
+    def log(self, *args, **kwargs):
+        """print() that respects the verbose switch."""
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def _active(self) -> List[StageContext]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def count_model_call(self, calls: int = 1):
+        """Attribute model predict/fit calls to every stage currently running on this thread."""
+        for context in self._active():
+            context.model_calls += calls
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None, sample_rss: Optional[bool] = None,
+              **metadata) -> Iterator[StageContext]:
+        """Time a block of code as one named stage."""
+        context = StageContext(name, rows, metadata)
+        if not self.sinks:
+            # Still track the stage so nested model-call counting stays consistent
+            self._active().append(context)
+            try:
+                yield context
+            finally:
+                self._active().pop()
+            return
+
+        sample = self.sample_rss if sample_rss is None else sample_rss
+        sampler = PeakRSSSampler() if sample else None
+        self._active().append(context)
+        if sampler:
+            sampler.__enter__()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        error = None
+        try:
+            yield context
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            if sampler:
+                sampler.__exit__(None, None, None)
+            self._active().pop()
+            peak_rss = sampler.peak if sampler else current_rss_bytes()
+            record = {
+                'stage': name,
+                'timestamp': datetime.now().isoformat(),
+                'wall_seconds': wall_seconds,
+                'cpu_seconds': cpu_seconds,
+                'peak_rss_mb': peak_rss / 2 ** 20,
+                'rows': context.rows,
+                'model_calls': context.model_calls,
+                'error': error
+            }
+            record.update(context.metadata)
+            for sink in self.sinks:
+                sink.write(record)
+
+
+def instrumented(stage_name: Optional[str] = None, rows_arg: int = 0):
+    """Decorator recording a method call as a stage of `self.instrumentation`.
+
+    The row count is the length of positional argument `rows_arg` (the first
+    one by default), when it has a length.
+    """
+    def decorator(method):
+        name = stage_name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = getattr(self, 'instrumentation', None)
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+            rows_source = args[rows_arg] if len(args) > rows_arg else None
+            rows = len(rows_source) if hasattr(rows_source, '__len__') else None
+            with instrumentation.stage(name, rows=rows):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,232 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from collections.abc import MutableMapping
+from typing import Callable, Dict, List, Optional
+
+# Bump when the on-disk layout changes in a way older loaders cannot read
+ARTIFACT_FORMAT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+LSTM_CONFIG_FILE = 'lstm.json'
+LSTM_WEIGHTS_FILE = 'lstm.weights.h5'
+XGB_MODEL_FILE = 'xgb.ubj'
+HISTORY_FILE = 'daily_sales.csv'
+
+
+def data_fingerprint(values: np.ndarray) -> str:
+    """SHA-256 fingerprint of a numeric series, independent of its dtype."""
+    return hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+
+def scaler_to_dict(scaler) -> Dict:
+    """Serialise a fitted MinMaxScaler to plain JSON types."""
+    return {
+        'feature_range': list(scaler.feature_range),
+        'data_min': scaler.data_min_.tolist(),
+        'data_max': scaler.data_max_.tolist(),
+        'n_samples_seen': int(scaler.n_samples_seen_)
+    }
+
+
+def scaler_from_dict(params: Dict):
+    """Rebuild a fitted MinMaxScaler from scaler_to_dict output without refitting."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler(feature_range=tuple(params['feature_range']))
+    data_min = np.asarray(params['data_min'], dtype=np.float64)
+    data_max = np.asarray(params['data_max'], dtype=np.float64)
+    # Fitting on the two extremes reproduces data_min_, data_max_, scale_ and min_ exactly
+    scaler.fit(np.vstack([data_min, data_max]))
+    scaler.n_samples_seen_ = params['n_samples_seen']
+    return scaler
+
+
+def _to_builtin(value):
+    """Convert numpy scalars in nested metrics to JSON-serialisable Python types."""
+    if isinstance(value, dict):
+        return {key: _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _load_lstm(version_path: str, compile_config: Dict):
+    """Rebuild the LSTM from its architecture JSON and weights-only file."""
+    from tensorflow import keras
+
+    with open(os.path.join(version_path, LSTM_CONFIG_FILE)) as f:
+        model = keras.models.model_from_json(f.read())
+    model.load_weights(os.path.join(version_path, LSTM_WEIGHTS_FILE))
+    model.compile(**compile_config)
+    return model
+
+
+def _load_xgb(version_path: str):
+    """Load the XGBoost regressor from its native binary model file."""
+    import xgboost as xgb
+
+    model = xgb.XGBRegressor()
+    model.load_model(os.path.join(version_path, XGB_MODEL_FILE))
+    return model
+
+
+class LazyModels(MutableMapping):
+    """Model mapping that loads each model from disk the first time it is accessed."""
+
+    def __init__(self, loaders: Dict[str, Callable]):
+        self._loaders = dict(loaders)
+        self._models = {}
+
+    def __getitem__(self, name):
+        if name not in self._models:
+            if name not in self._loaders:
+                raise KeyError(name)
+            self._models[name] = self._loaders.pop(name)()
+        return self._models[name]
+
+    def __setitem__(self, name, model):
+        self._loaders.pop(name, None)
+        self._models[name] = model
+
+    def __delitem__(self, name):
+        if name in self._models:
+            del self._models[name]
+        else:
+            del self._loaders[name]
+
+    def __iter__(self):
+        return iter(list(self._models) + list(self._loaders))
+
+    def __len__(self):
+        return len(self._models) + len(self._loaders)
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether a model has already been materialised."""
+        return name in self._models
+
+
+class ModelArtifactStore:
+    """Versioned on-disk store for a trained LSTM/XGBoost ensemble and its scaler.
+
+    Each save writes a new `vNNNN` directory holding a JSON manifest, the LSTM
+    architecture and weights, the XGBoost model in its native binary format
+    and the daily history; a LATEST file points at the most recent version.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def versions(self) -> List[str]:
+        """All saved versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith('v') and os.path.exists(os.path.join(self.root, name, MANIFEST_FILE)))
+
+    def latest_version(self) -> Optional[str]:
+        """The version LATEST points at, or None if nothing has been saved."""
+        latest_file = os.path.join(self.root, LATEST_FILE)
+        if os.path.exists(latest_file):
+            with open(latest_file) as f:
+                return f.read().strip()
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def _version_path(self, version: Optional[str]) -> str:
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No saved models found in {self.root}")
+        return os.path.join(self.root, version)
+
+    def save(self, models: Dict, scaler, lookback: int, forecast_horizon: int,
+             metrics: Optional[Dict] = None, daily_sales: Optional[pd.DataFrame] = None,
+             value_col: str = 'total', extra: Optional[Dict] = None) -> str:
+        """Write a new artifact version and return its name."""
+        os.makedirs(self.root, exist_ok=True)
+        versions = self.versions()
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+
+        # Write into a temporary directory and rename, so readers never see a partial version
+        tmp_path = os.path.join(self.root, f".{version}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        lstm_model = models['lstm']
+        with open(os.path.join(tmp_path, LSTM_CONFIG_FILE), 'w') as f:
+            f.write(lstm_model.to_json())
+        lstm_model.save_weights(os.path.join(tmp_path, LSTM_WEIGHTS_FILE))
+        models['xgb'].save_model(os.path.join(tmp_path, XGB_MODEL_FILE))
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'lookback': lookback,
+            'forecast_horizon': forecast_horizon,
+            'scaler': scaler_to_dict(scaler),
+            'metrics': _to_builtin(metrics or {}),
+            'lstm_compile': {'optimizer': 'adam', 'loss': 'mse'},
+            'value_col': value_col,
+            'files': {
+                'lstm_config': LSTM_CONFIG_FILE,
+                'lstm_weights': LSTM_WEIGHTS_FILE,
+                'xgb': XGB_MODEL_FILE
+            }
+        }
+        if daily_sales is not None:
+            daily_sales.to_csv(os.path.join(tmp_path, HISTORY_FILE), index=False)
+            manifest['files']['history'] = HISTORY_FILE
+            manifest['data_fingerprint'] = data_fingerprint(daily_sales[value_col].values)
+            manifest['history_end'] = str(pd.to_datetime(daily_sales['date']).max().date())
+        if extra:
+            manifest.update(_to_builtin(extra))
+
+        with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(tmp_path, os.path.join(self.root, version))
+        with open(os.path.join(self.root, LATEST_FILE), 'w') as f:
+            f.write(version)
+        return version
+
+    def load_manifest(self, version: Optional[str] = None) -> Dict:
+        """Read the manifest of a version (latest by default)."""
+        with open(os.path.join(self._version_path(version), MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version', 0) > ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Artifact format {manifest['format_version']} is newer than this loader supports")
+        return manifest
+
+    def load(self, version: Optional[str] = None) -> Dict:
+        """Open a version without loading any model yet.
+
+        Returns the manifest, the rebuilt scaler, the daily history (if saved)
+        and a LazyModels mapping that loads the LSTM and XGBoost models on
+        first access.
+        """
+        version_path = self._version_path(version)
+        manifest = self.load_manifest(version)
+
+        history = None
+        if 'history' in manifest['files']:
+            history = pd.read_csv(os.path.join(version_path, manifest['files']['history']), parse_dates=['date'])
+
+        models = LazyModels({
+            'lstm': lambda: _load_lstm(version_path, manifest['lstm_compile']),
+            'xgb': lambda: _load_xgb(version_path)
+        })
+
+        return {
+            'manifest': manifest,
+            'scaler': scaler_from_dict(manifest['scaler']),
+            'daily_sales': history,
+            'models': models
+        }
@@ -1,26 +1,65 @@
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from tensorflow.keras.layers import Input
-import xgboost as xgb
+from BatchForecasting import BatchForecaster, as_sequence_batch, check_forecast_strategy
+from SequenceWindows import make_windows, flatten_windows, lstm_dataset
+from SalesIngestion import (PERIOD_NAMES, aggregate_daily_sales, check_freq, complete_period_totals,
+                            fill_missing_periods, parse_timestamps, period_range)
+from IncrementalTraining import new_daily_sales, update_windows, warm_start_models
+from ModelArtifacts import ModelArtifactStore, scaler_to_dict
+from TrainingCache import TrainingCache, training_key
+from ColumnarStore import ColumnarStore
+from Instrumentation import Instrumentation, instrumented
 from datetime import datetime, timedelta
 import json
 import warnings
 warnings.filterwarnings('ignore')
 
+# TensorFlow/Keras, XGBoost and scikit-learn are imported inside the methods that
+# use them, so importing this module (for its helpers or a saved system) stays cheap.
+
+# Model hyperparameters; `patience` and `early_stopping_rounds` stop training once
+# validation loss stops improving
+DEFAULT_LSTM_PARAMS = {'units': 20, 'epochs': 50, 'batch_size': 1, 'patience': 5}
+DEFAULT_XGB_PARAMS = {'n_estimators': 50, 'learning_rate': 0.1, 'max_depth': 3, 'early_stopping_rounds': 10}
+
+# LSTM batch size per granularity: hourly series are 24x longer, so they train in larger batches
+FREQ_BATCH_SIZES = {'H': 128, 'D': 1, 'W': 1}
+
 class SimpleSalesForecastSystem:
-    def __init__(self, forecast_horizon=30, train_split=0.5, validation_split=0.25):
+    # Each model rolls its own predictions back into its window when forecasting recursively
+    FORECAST_FEEDBACK = 'separate'
+    
+    def __init__(self, forecast_horizon=30, train_split=0.5, validation_split=0.25,
+                 verbose=True, instrumentation=None, forecast_strategy='recursive',
+                 lookback=2, lstm_params=None, xgb_params=None, freq='D', training_cache=None):
+        from sklearn.preprocessing import MinMaxScaler
+        
+        check_forecast_strategy(forecast_strategy)
+        check_freq(freq)
+        # Granularity of the series: 'H' (hourly), 'D' (daily) or 'W' (weekly); horizon and lookback count periods
+        self.freq = freq
         self.forecast_horizon = forecast_horizon
+        # 'recursive' predicts one day and feeds it back; 'direct' predicts the whole horizon at once
+        self.forecast_strategy = forecast_strategy
         self.train_split = train_split
         self.validation_split = validation_split
         self.scaler = MinMaxScaler()
         self.models = {}
         self.metrics = {}
-        self.lookback = 2  # Reduced lookback period for small datasets
+        self.lookback = lookback  # Short default lookback period for small datasets
+        self.lstm_params = {**DEFAULT_LSTM_PARAMS, 'batch_size': FREQ_BATCH_SIZES[freq], **(lstm_params or {})}
+        self.xgb_params = {**DEFAULT_XGB_PARAMS, **(xgb_params or {})}
+        self.fit_stats = {}
+        # Optional TrainingCache: train_models reuses models trained on identical data and settings
+        self.training_cache = training_cache
+        # Stage timings go to the instrumentation sinks; verbose=False silences progress output
+        self.instrumentation = instrumentation or Instrumentation(verbose=verbose)
+    
+    def _log(self, *args):
+        """Progress output, silenced when the system is not verbose."""
+        self.instrumentation.log(*args)
     
+    @instrumented()
     def process_data(self, df):
         """Initial data processing and analysis."""
         try:
@@ -28,7 +67,7 @@ class SimpleSalesForecastSystem:
             if 'datetime' not in df.columns:
                 # Convert timestamp if it exists
                 if 'timestamp' in df.columns:
-                    df['datetime'] = pd.to_datetime(df['timestamp'])
+                    df['datetime'] = parse_timestamps(df['timestamp'])
                     df.drop('timestamp', axis=1, inplace=True)
                 else:
                     raise ValueError("DataFrame must contain either 'datetime' or 'timestamp' column")
@@ -37,61 +76,76 @@ class SimpleSalesForecastSystem:
             df['date'] = pd.to_datetime(df['datetime']).dt.date
             
             # Print initial analysis
-            print("\nPreprocessing Status:")
-            print(f"Total records: {len(df)}")
-            print(f"Date range: {df['date'].min()} to {df['date'].max()}")
-            print(f"Number of unique days: {df['date'].nunique()}")
+            self._log("\nPreprocessing Status:")
+            self._log(f"Total records: {len(df)}")
+            self._log(f"Date range: {df['date'].min()} to {df['date'].max()}")
+            self._log(f"Number of unique days: {df['date'].nunique()}")
             
             return df
             
         except Exception as e:
-            print(f"Error in processing data: {str(e)}")
+            self._log(f"Error in processing data: {str(e)}")
             raise
         
+    @instrumented()
     def prepare_data(self, df):
-        """Prepare data for analysis and modeling."""
-        print("\nInitial Data Shape:", df.shape)
+        """Prepare data for analysis and modeling.
+        
+        Transactions are totalled per hour, day or week (`freq`); the result
+        keeps the `daily_sales` name and `date` column, holding period starts.
+        """
+        self._log("\nInitial Data Shape:", df.shape)
         
-        # Aggregate daily sales
-        daily_sales = df.groupby('date')['total'].sum().reset_index()
-        daily_sales['date'] = pd.to_datetime(daily_sales['date'])
-        daily_sales = daily_sales.sort_values('date')
+        # Aggregate sales per period (already aggregated input is regrouped on its own period starts);
+        # an hour or week the data only partly covers is left out rather than read as a full one
+        timestamps = df['datetime'] if 'datetime' in df.columns else df['date']
+        daily_sales = complete_period_totals(df['total'], timestamps, self.freq)
         
-        # Handle missing dates
-        date_range = pd.date_range(start=daily_sales['date'].min(), end=daily_sales['date'].max())
-        daily_sales = daily_sales.set_index('date').reindex(date_range).interpolate(method='linear').reset_index()
+        # Handle missing periods
+        daily_sales = fill_missing_periods(daily_sales.sort_index(), self.freq).reset_index()
         daily_sales.columns = ['date', 'sales']
+        self.daily_sales = daily_sales
         
         # Scale the data
         scaled_data = self.scaler.fit_transform(daily_sales['sales'].values.reshape(-1, 1))
         
         # Print analysis
-        print(f"\nData Analysis:")
-        print(f"Total days of data: {len(daily_sales)}")
-        print(f"Date range: {daily_sales['date'].min()} to {daily_sales['date'].max()}")
-        print(f"Average daily sales: {daily_sales['sales'].mean():.2f}")
-        print(f"Total sales in period: {daily_sales['sales'].sum():.2f}")
+        _, periods_name, adjective = PERIOD_NAMES[self.freq]
+        self._log(f"\nData Analysis:")
+        self._log(f"Total {periods_name} of data: {len(daily_sales)}")
+        self._log(f"Date range: {daily_sales['date'].min()} to {daily_sales['date'].max()}")
+        self._log(f"Average {adjective} sales: {daily_sales['sales'].mean():.2f}")
+        self._log(f"Total sales in period: {daily_sales['sales'].sum():.2f}")
         
         # Additional analysis
-        print("\nSales Statistics:")
-        print(f"Minimum daily sales: {daily_sales['sales'].min():.2f}")
-        print(f"Maximum daily sales: {daily_sales['sales'].max():.2f}")
-        print(f"Standard deviation: {daily_sales['sales'].std():.2f}")
+        self._log("\nSales Statistics:")
+        self._log(f"Minimum {adjective} sales: {daily_sales['sales'].min():.2f}")
+        self._log(f"Maximum {adjective} sales: {daily_sales['sales'].max():.2f}")
+        self._log(f"Standard deviation: {daily_sales['sales'].std():.2f}")
         
         return daily_sales, scaled_data
     
+    @property
+    def target_horizon(self):
+        """Periods each training target covers: the full horizon in direct mode, otherwise one."""
+        return self.forecast_horizon if self.forecast_strategy == 'direct' else 1
+    
+    @instrumented()
     def create_sequences(self, data):
-        """Create sequences for time series models."""
-        X, y = [], []
-        for i in range(len(data) - self.lookback):
-            X.append(data[i:(i + self.lookback), 0])
-            y.append(data[i + self.lookback, 0])
-        return np.array(X), np.array(y)
+        """Create sequences for time series models.
+        
+        Windows are read-only strided views over a float32 copy of the scaled
+        series, so no per-window copies are made. In direct mode each target
+        holds the next `forecast_horizon` periods.
+        """
+        X, y = make_windows(np.asarray(data[:, :1], dtype=np.float32), self.lookback, horizon=self.target_horizon)
+        return flatten_windows(X), y
     
     def split_data(self, X, y):
         """Split data into train, validation, and test sets."""
         if len(X) < 2:
-            raise ValueError(f"Insufficient data for splitting. Need at least {self.lookback + 2} days of data.")
+            raise ValueError(f"Insufficient data for splitting. Need at least "
+                             f"{self.lookback + self.target_horizon + 1} days of data.")
             
         train_size = max(1, int(len(X) * self.train_split))
         val_size = max(1, int(len(X) * self.validation_split))
@@ -107,71 +161,136 @@ class SimpleSalesForecastSystem:
         
         # Ensure we have at least one sample in test set
         if len(X_test) == 0:
+            self._log("Warning: No test windows left, reusing the validation windows as the test set "
+                      "(use Backtesting.Backtester for out-of-sample metrics)")
             X_test = X_val
             y_test = y_val
         
-        print(f"\nData Split Status:")
-        print(f"Training samples: {len(X_train)}")
-        print(f"Validation samples: {len(X_val)}")
-        print(f"Test samples: {len(X_test)}")
+        self._log(f"\nData Split Status:")
+        self._log(f"Training samples: {len(X_train)}")
+        self._log(f"Validation samples: {len(X_val)}")
+        self._log(f"Test samples: {len(X_test)}")
         
         return (X_train, y_train), (X_val, y_val), (X_test, y_test)
     
-    def train_models(self, X, y):
-        """Train both LSTM and XGBoost models."""
-        # Split data
-        (X_train, y_train), (X_val, y_val), (X_test, y_test) = self.split_data(X, y)
-        
-        # Train LSTM
-        X_train_lstm = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
-        X_val_lstm = X_val.reshape((X_val.shape[0], X_val.shape[1], 1))
-        X_test_lstm = X_test.reshape((X_test.shape[0], X_test.shape[1], 1))
-        
+    def _lstm_inputs(self, X):
+        """(n, lookback, 1) LSTM inputs from flattened windows."""
+        return X.reshape((X.shape[0], X.shape[1], 1))
+    
+    def fit_models(self, X_train, y_train, X_val, y_val):
+        """Build and fit both models with the configured hyperparameters.
+        
+        Both models stop early once the validation loss stops improving, and
+        the LSTM keeps the weights of its best epoch. The LSTM trains on
+        shuffled minibatches built lazily from the windows (lstm_dataset), so
+        long hourly series are never copied into one training tensor.
+        """
+        import xgboost as xgb
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Input
+        from tensorflow.keras.callbacks import EarlyStopping
+        
+        params = self.lstm_params
         lstm_model = Sequential([
             Input(shape=(self.lookback, 1)),
-            LSTM(20, activation='relu'),
-            Dense(1)
+            LSTM(params['units'], activation='relu'),
+            Dense(self.target_horizon)
         ])
         lstm_model.compile(optimizer='adam', loss='mse')
         
-        print("\nTraining LSTM model...")
+        callbacks = []
+        if params.get('patience') and len(X_val):
+            callbacks.append(EarlyStopping(monitor='val_loss', patience=params['patience'], restore_best_weights=True))
+        
+        self._log("\nTraining LSTM model...")
         lstm_history = lstm_model.fit(
-            X_train_lstm, y_train,
-            validation_data=(X_val_lstm, y_val),
-            epochs=50,
-            batch_size=1,
-            verbose=1
+            lstm_dataset(X_train, y_train, params['batch_size'], self.lookback, shuffle=True),
+            validation_data=lstm_dataset(X_val, y_val, params['batch_size'], self.lookback) if len(X_val) else None,
+            epochs=params['epochs'],
+            shuffle=False,
+            callbacks=callbacks,
+            verbose=1 if self.instrumentation.verbose else 0
         )
+        self.instrumentation.count_model_call()
         
         # Train XGBoost
-        print("\nTraining XGBoost model...")
-        xgb_model = xgb.XGBRegressor(
-            objective='reg:squarederror',
-            n_estimators=50,
-            learning_rate=0.1,
-            max_depth=3
-        )
-        xgb_model.fit(X_train, y_train)
+        self._log("\nTraining XGBoost model...")
+        xgb_params = dict(self.xgb_params)
+        if not len(X_val):
+            xgb_params['early_stopping_rounds'] = None
+        xgb_model = xgb.XGBRegressor(objective='reg:squarederror', **xgb_params)
+        xgb_model.fit(X_train, y_train, eval_set=[(X_val, y_val)] if len(X_val) else None, verbose=False)
+        self.instrumentation.count_model_call()
         
-        # Store models and calculate metrics
         self.models['lstm'] = lstm_model
         self.models['xgb'] = xgb_model
+        self.fit_stats = {
+            'lstm_epochs': len(lstm_history.history['loss']),
+            'xgb_rounds': xgb_model.get_booster().num_boosted_rounds()
+        }
+    
+    def _training_key(self, X, y):
+        """Training cache key for these windows under the current scaling and settings."""
+        return training_key(X, y, {
+            'system': type(self).__name__,
+            'scaler': scaler_to_dict(self.scaler),
+            'lookback': self.lookback,
+            'forecast_horizon': self.forecast_horizon,
+            'forecast_strategy': self.forecast_strategy,
+            'train_split': self.train_split,
+            'validation_split': self.validation_split,
+            'lstm_params': self.lstm_params,
+            'xgb_params': self.xgb_params
+        })
+    
+    @instrumented('train')
+    def train_models(self, X, y):
+        """Train both LSTM and XGBoost models.
+        
+        With a training cache, models and metrics from an earlier run on the
+        same windows and settings are returned instead of retraining.
+        """
+        # Split data
+        (X_train, y_train), (X_val, y_val), (X_test, y_test) = self.split_data(X, y)
         
-        self._calculate_metrics('lstm', lstm_model, X_test_lstm, y_test)
-        self._calculate_metrics('xgb', xgb_model, X_test, y_test)
+        key = self._training_key(X, y) if self.training_cache is not None else None
+        cached = self.training_cache.get(key) if key else None
+        if cached:
+            self.models, state = cached
+            self.metrics = state['metrics']
+            self.fit_stats = state['fit_stats']
+            self._log("\nLoaded trained models from the training cache")
+            return X_test, y_test
         
-        print("\nModel Performance Metrics:")
-        print(json.dumps(self.metrics, indent=2))
+        self.fit_models(X_train, y_train, X_val, y_val)
+        
+        # Calculate metrics
+        self._calculate_metrics('lstm', self.models['lstm'], self._lstm_inputs(X_test), y_test)
+        self._calculate_metrics('xgb', self.models['xgb'], X_test, y_test)
+        
+        self._log("\nModel Performance Metrics:")
+        self._log(json.dumps(self.metrics, indent=2))
+        
+        if key:
+            self.training_cache.put(key, self.models, self.scaler, self.lookback, self.forecast_horizon,
+                                    {'metrics': self.metrics, 'fit_stats': self.fit_stats})
         
         return X_test, y_test
     
+    @instrumented('metrics', rows_arg=2)
     def _calculate_metrics(self, model_name, model, X_test, y_test):
         """Calculate and store performance metrics."""
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        
         if len(X_test) == 0:
-            print(f"Warning: No test data available for {model_name} metrics calculation")
+            self._log(f"Warning: No test data available for {model_name} metrics calculation")
             return
             
-        y_pred = model.predict(X_test)
+        if model_name == 'lstm':
+            y_pred = model.predict(X_test, verbose=1 if self.instrumentation.verbose else 0)
+        else:
+            y_pred = model.predict(X_test)
+        self.instrumentation.count_model_call()
         
         if model_name == 'lstm':
             y_pred = y_pred.reshape(-1, 1)
@@ -187,62 +306,162 @@ class SimpleSalesForecastSystem:
             'r2': float(r2_score(y_test_actual, y_pred_actual))
         }
     
+    def _get_forecaster(self):
+        """Return a batch forecaster bound to the currently trained models."""
+        forecaster = getattr(self, '_forecaster', None)
+        if (forecaster is None or forecaster.lstm_model is not self.models['lstm']
+                or forecaster.xgb_model is not self.models['xgb']):
+            forecaster = BatchForecaster(self.models['lstm'], self.models['xgb'],
+                                         self.lookback, self.forecast_horizon, self.instrumentation)
+            self._forecaster = forecaster
+        return forecaster
+    
+    @instrumented()
     def generate_forecasts(self, last_sequence):
-        """Generate forecasts using both models."""
-        start_date = datetime.now().date()
-        future_dates = pd.date_range(start=start_date, periods=self.forecast_horizon)
-        
-        # Generate LSTM forecasts
-        lstm_sequence = last_sequence.reshape(1, self.lookback, 1)
-        lstm_forecasts = []
-        
-        for _ in range(self.forecast_horizon):
-            pred = self.models['lstm'].predict(lstm_sequence, verbose=0)[0]
-            lstm_forecasts.append(float(pred))
-            lstm_sequence = np.roll(lstm_sequence, -1, axis=1)
-            lstm_sequence[0, -1, 0] = float(pred)
-        
-        # Generate XGBoost forecasts
-        xgb_sequence = last_sequence.reshape(1, -1)
-        xgb_forecasts = []
-        
-        for _ in range(self.forecast_horizon):
-            pred = self.models['xgb'].predict(xgb_sequence)[0]
-            xgb_forecasts.append(float(pred))
-            xgb_sequence = np.roll(xgb_sequence, -1)
-            xgb_sequence[0, -1] = float(pred)
+        """Generate forecasts using both models.
+        
+        Accepts a single input window or a list of windows; every window is
+        advanced in the same batched model call, and a list of forecast frames
+        (one per window) is returned for list input. Forecasts start with the
+        current hour, day or week.
+        """
+        future_dates = period_range(datetime.now(), self.forecast_horizon, self.freq)
+        
+        # Forecast all windows together, each model feeding back its own predictions
+        # (or, in direct mode, emitting the whole horizon in one call)
+        windows, single = as_sequence_batch(last_sequence, self.lookback)
+        if self.forecast_strategy == 'direct':
+            raw_forecasts = self._get_forecaster().forecast_direct(windows)
+        else:
+            raw_forecasts = self._get_forecaster().forecast(windows, feedback=self.FORECAST_FEEDBACK)
         
         # Inverse transform predictions
-        lstm_forecasts = self.scaler.inverse_transform(np.array(lstm_forecasts).reshape(-1, 1))
-        xgb_forecasts = self.scaler.inverse_transform(np.array(xgb_forecasts).reshape(-1, 1))
-        
-        # Create forecast DataFrame with additional features
-        forecasts_df = pd.DataFrame({
-            'date': future_dates,
-            'lstm_forecast': lstm_forecasts.flatten(),
-            'xgb_forecast': xgb_forecasts.flatten(),
-            'ensemble_forecast': (lstm_forecasts.flatten() + xgb_forecasts.flatten()) / 2
-        })
-        
-        # Add temporal features
-        forecasts_df['day_of_week'] = forecasts_df['date'].dt.day_name()
-        forecasts_df['month'] = forecasts_df['date'].dt.month_name()
-        forecasts_df['year'] = forecasts_df['date'].dt.year
-        
-        return forecasts_df
+        lstm_forecasts = self.scaler.inverse_transform(
+            raw_forecasts['lstm'].reshape(-1, 1)).reshape(len(windows), -1)
+        xgb_forecasts = self.scaler.inverse_transform(
+            raw_forecasts['xgb'].reshape(-1, 1)).reshape(len(windows), -1)
+        
+        forecast_frames = []
+        for lstm_forecast, xgb_forecast in zip(lstm_forecasts, xgb_forecasts):
+            # Create forecast DataFrame with additional features
+            forecasts_df = pd.DataFrame({
+                'date': future_dates,
+                'lstm_forecast': lstm_forecast,
+                'xgb_forecast': xgb_forecast,
+                'ensemble_forecast': (lstm_forecast + xgb_forecast) / 2
+            })
+            
+            # Add temporal features
+            forecasts_df['day_of_week'] = forecasts_df['date'].dt.day_name()
+            forecasts_df['month'] = forecasts_df['date'].dt.month_name()
+            forecasts_df['year'] = forecasts_df['date'].dt.year
+            if self.freq == 'H':
+                forecasts_df['hour'] = forecasts_df['date'].dt.hour
+            forecast_frames.append(forecasts_df)
+        
+        return forecast_frames[0] if single else forecast_frames
+    
+    @instrumented('update')
+    def update_models(self, df, lstm_epochs=5, xgb_rounds=10, replay=30):
+        """Warm-start the trained models on periods that arrived since the last training run.
+        
+        Only the new periods (plus a replay of the last `replay` historical windows)
+        are trained on; the fitted scaler is kept so inputs stay on the same scale.
+        Returns the number of new periods added.
+        """
+        new_days = new_daily_sales(self.daily_sales, df, 'sales', fill_gaps=True, freq=self.freq)
+        if new_days.empty:
+            self._log("\nNo new days to update the models with")
+            return 0
+        
+        # Scale only the history tail the new windows need
+        history_tail = self.daily_sales['sales'].values[-(self.lookback + replay + self.target_horizon - 1):]
+        history_scaled = self.scaler.transform(history_tail.reshape(-1, 1))
+        new_scaled = self.scaler.transform(new_days['sales'].values.reshape(-1, 1))
+        
+        X, y = update_windows(history_scaled, new_scaled, self.lookback, replay, horizon=self.target_horizon)
+        self._log(f"\nUpdating models with {len(new_days)} new days ({len(X)} windows)...")
+        warm_start_models(self.models, X, y, lstm_epochs=lstm_epochs, xgb_rounds=xgb_rounds,
+                          batch_size=self.lstm_params['batch_size'])
+        
+        self.daily_sales = pd.concat([self.daily_sales, new_days], ignore_index=True)
+        return len(new_days)
+    
+    def save_models(self, base_path='./models'):
+        """Save models, scaler, metrics and daily history as a new artifact version."""
+        store = ModelArtifactStore(base_path)
+        return store.save(
+            self.models, self.scaler,
+            lookback=self.lookback,
+            forecast_horizon=self.forecast_horizon,
+            metrics=self.metrics,
+            daily_sales=getattr(self, 'daily_sales', None),
+            value_col='sales',
+            extra={
+                'forecast_strategy': self.forecast_strategy,
+                'freq': self.freq,
+                'lstm_params': self.lstm_params,
+                'xgb_params': self.xgb_params
+            }
+        )
+    
+    def load_models(self, base_path='./models', version=None):
+        """Load a saved artifact version (latest by default).
+        
+        Only the manifest, scaler and history are read here; each model is
+        loaded from disk the first time a forecast needs it.
+        """
+        artifacts = ModelArtifactStore(base_path).load(version)
+        manifest = artifacts['manifest']
+        
+        self.lookback = manifest['lookback']
+        self.forecast_horizon = manifest['forecast_horizon']
+        self.metrics = manifest['metrics']
+        self.forecast_strategy = manifest.get('forecast_strategy', 'recursive')
+        self.freq = manifest.get('freq', 'D')
+        self.lstm_params = {**DEFAULT_LSTM_PARAMS, 'batch_size': FREQ_BATCH_SIZES[self.freq],
+                            **manifest.get('lstm_params', {})}
+        self.xgb_params = {**DEFAULT_XGB_PARAMS, **manifest.get('xgb_params', {})}
+        self.scaler = artifacts['scaler']
+        self.models = artifacts['models']
+        if artifacts['daily_sales'] is not None:
+            self.daily_sales = artifacts['daily_sales']
+    
+    def fit_forecast(self, df):
+        """Prepare, train and forecast a processed transaction frame in one call."""
+        daily_sales, scaled_data = self.prepare_data(df)
+        X, y = self.create_sequences(scaled_data)
+        self.train_models(X, y)
+        
+        # Forecast from the most recent window of observed days
+        return self.generate_forecasts(scaled_data[-self.lookback:, 0])
 
-def main():
-    """Main function to run the forecasting system."""
+def main(data_path='/kaggle/input/datasetofmumbaihackers/groc_sales.csv', chunksize=None, output_dir='sales_store',
+         freq='D', cache_dir='training_cache'):
+    """Main function to run the forecasting system.
+    
+    Pass `chunksize` to stream the CSV and aggregate it to daily totals chunk
+    by chunk instead of loading every transaction into memory. Forecasts and
+    daily history are appended to a ColumnarStore under `output_dir`.
+    `freq` selects hourly ('H'), daily ('D') or weekly ('W') forecasts.
+    Trained models are cached under `cache_dir` (None disables the cache),
+    so re-running on unchanged data and settings skips training.
+    """
     try:
-        # Read and preprocess the data
-        print("Loading and preprocessing data...")
-        df = pd.read_csv('/kaggle/input/datasetofmumbaihackers/groc_sales.csv')
-        
         # Initialize system
-        system = SimpleSalesForecastSystem()
+        system = SimpleSalesForecastSystem(freq=freq,
+                                           training_cache=TrainingCache(cache_dir) if cache_dir else None)
         
-        # Process the data
-        df = system.process_data(df)
+        # Read and preprocess the data
+        print("Loading and preprocessing data...")
+        if chunksize:
+            df = aggregate_daily_sales(data_path, chunksize=chunksize, freq=freq,
+                                       verbose=system.instrumentation.verbose)
+        else:
+            df = pd.read_csv(data_path)
+            
+            # Process the data
+            df = system.process_data(df)
         
         # Prepare data for modeling
         daily_sales, scaled_data = system.prepare_data(df)
@@ -256,18 +475,16 @@ def main():
         # Generate forecasts
         forecasts_df = system.generate_forecasts(X_test[-1])
         
-        print("\nForecast Summary (Next 5 days):")
+        print(f"\nForecast Summary (Next 5 {PERIOD_NAMES[freq][1]}):")
         print(forecasts_df.head())
         
-        # Export forecasts to CSV
-        output_file = 'sales_forecasts.csv'
-        forecasts_df.to_csv(output_file, index=False)
-        print(f"\nForecasts exported to: {output_file}")
+        # Append the forecast run and any new history days to the columnar output store
+        store = ColumnarStore(output_dir)
+        run_id = store.append_forecasts(forecasts_df)
+        print(f"\nForecasts stored in {output_dir} as run {run_id}")
         
-        # Export daily sales history to CSV
-        history_file = 'sales_history.csv'
-        daily_sales.to_csv(history_file, index=False)
-        print(f"Historical sales exported to: {history_file}")
+        new_days = store.append_history(daily_sales, value_col='sales')
+        print(f"Historical sales stored in {output_dir} ({new_days} new {PERIOD_NAMES[freq][1]})")
         
         return forecasts_df, system.metrics, daily_sales
         
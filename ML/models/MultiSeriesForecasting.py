@@ -0,0 +1,95 @@
+import os
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from Instrumentation import Instrumentation
+
+GroupKey = Union[str, Sequence[str]]
+
+
+def _as_key_list(group_key: GroupKey) -> List[str]:
+    """Normalise a single column name or a list of names to a list."""
+    return [group_key] if isinstance(group_key, str) else list(group_key)
+
+
+def split_by_group(df: pd.DataFrame, group_key: GroupKey) -> Dict[tuple, pd.DataFrame]:
+    """Split a transaction frame into one frame per group value combination."""
+    keys = _as_key_list(group_key)
+    missing = [key for key in keys if key not in df.columns]
+    if missing:
+        raise ValueError(f"Group columns not found in data: {missing}")
+
+    groups = {}
+    for group_values, group_df in df.groupby(keys, observed=True, sort=True):
+        if not isinstance(group_values, tuple):
+            group_values = (group_values,)
+        groups[group_values] = group_df
+    return groups
+
+
+def _limit_worker_threads():
+    """Keep each worker to one TensorFlow thread so the pool does not oversubscribe cores."""
+    os.environ.setdefault('TF_NUM_INTRAOP_THREADS', '1')
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+
+def _fit_forecast_group(system_factory: Callable, system_kwargs: Dict, group_values: tuple,
+                        group_df: pd.DataFrame) -> Tuple[tuple, Optional[pd.DataFrame], Optional[str]]:
+    """Train a fresh forecasting system on one group and forecast it (runs in a worker)."""
+    try:
+        system = system_factory(**system_kwargs)
+        return group_values, system.fit_forecast(group_df), None
+    except Exception as e:
+        return group_values, None, str(e)
+
+
+class MultiSeriesForecaster:
+    """Trains and forecasts one model pair per group of transactions across a process pool."""
+
+    def __init__(self, system_factory: Callable, group_key: GroupKey = 'category',
+                 system_kwargs: Optional[Dict] = None, max_workers: Optional[int] = None,
+                 verbose: bool = True, instrumentation: Optional[Instrumentation] = None):
+        self.system_factory = system_factory
+        self.group_key = group_key
+        self.system_kwargs = system_kwargs or {}
+        self.max_workers = max_workers or os.cpu_count()
+        self.failures = {}
+        # Progress output goes through the instrumentation; verbose=False silences it
+        self.instrumentation = instrumentation or Instrumentation(verbose=verbose)
+
+    def _log(self, *args):
+        self.instrumentation.log(*args)
+
+    def fit_forecast(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Forecast every group and return one long-format table with the group columns first."""
+        keys = _as_key_list(self.group_key)
+        groups = split_by_group(df, keys)
+        self._log(f"\nForecasting {len(groups)} series grouped by {keys} on {self.max_workers} workers...")
+
+        results = []
+        self.failures = {}
+        # Spawned workers avoid forking a process that has already initialised TensorFlow
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                 initializer=_limit_worker_threads) as executor:
+            futures = [
+                executor.submit(_fit_forecast_group, self.system_factory, self.system_kwargs,
+                                group_values, group_df)
+                for group_values, group_df in groups.items()
+            ]
+            for future in futures:
+                group_values, forecasts_df, error = future.result()
+                if forecasts_df is None:
+                    self.failures[group_values] = error
+                    self._log(f"Warning: Skipping series {dict(zip(keys, group_values))}: {error}")
+                    continue
+                for key, value in zip(keys, group_values):
+                    forecasts_df.insert(keys.index(key), key, value)
+                results.append(forecasts_df)
+
+        if not results:
+            raise ValueError("No series could be forecast")
+
+        return pd.concat(results, ignore_index=True)
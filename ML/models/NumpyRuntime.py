@@ -0,0 +1,397 @@
+"""NumPy-only inference runtime for a trained LSTM/XGBoost ensemble.
+
+Export a trained pipeline once, then forecast in a worker that imports only
+NumPy:
+
+    python NumpyRuntime.py --models ./models --output runtime.npz
+
+The export checks parity against the original models before writing.
+"""
+import json
+import argparse
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from BatchForecasting import BatchForecaster, check_forecast_strategy
+
+# Bumped whenever the npz layout changes, so loaders refuse files newer than they understand
+RUNTIME_FORMAT_VERSION = 1
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0, 1)
+}
+
+
+def _activation(name: str):
+    if name not in _ACTIVATIONS:
+        raise ValueError(f"Unsupported activation for the NumPy runtime: {name}")
+    return _ACTIVATIONS[name]
+
+
+class NumpyLSTM:
+    """Forward pass of a stack of Keras LSTM, Dropout and Dense layers.
+
+    Each layer is a dict of float32 arrays plus its activation names, in
+    Keras' weight layout: LSTM kernels are (inputs, 4 * units) with gates
+    ordered input, forget, cell, output. Dropout layers only hold their rate
+    and, as in Keras, are active only when called with training=True.
+    """
+
+    def __init__(self, layers: List[Dict]):
+        self.layers = layers
+
+    @property
+    def has_dropout(self) -> bool:
+        return any(layer['type'] == 'dropout' and layer['rate'] > 0 for layer in self.layers)
+
+    @staticmethod
+    def _lstm(x: np.ndarray, layer: Dict) -> np.ndarray:
+        units = layer['recurrent_kernel'].shape[0]
+        activation = _activation(layer['activation'])
+        recurrent_activation = _activation(layer['recurrent_activation'])
+        # Input projections of every time step in one matmul; only the recurrence is sequential
+        projected = x @ layer['kernel'] + layer['bias']
+        h = np.zeros((len(x), units), dtype=np.float32)
+        c = np.zeros((len(x), units), dtype=np.float32)
+        outputs = []
+        for t in range(x.shape[1]):
+            z = projected[:, t] + h @ layer['recurrent_kernel']
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            c = f * c + i * activation(z[:, 2 * units:3 * units])
+            h = recurrent_activation(z[:, 3 * units:]) * activation(c)
+            outputs.append(h)
+        return np.stack(outputs, axis=1) if layer['return_sequences'] else h
+
+    def __call__(self, x: np.ndarray, training: bool = False,
+                 rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            if layer['type'] == 'lstm':
+                x = self._lstm(x, layer)
+            elif layer['type'] == 'dropout':
+                if training and layer['rate'] > 0:
+                    # Inverted dropout, as Keras: kept units are scaled up by 1 / (1 - rate)
+                    rng = rng or np.random.default_rng()
+                    keep = rng.random(x.shape) >= layer['rate']
+                    x = np.where(keep, x / np.float32(1 - layer['rate']), np.float32(0))
+            else:
+                x = _activation(layer['activation'])(x @ layer['kernel'] + layer['bias'])
+        return x
+
+
+class NumpyTrees:
+    """XGBoost regression trees packed into padded (n_trees, max_nodes) arrays.
+
+    All samples walk all trees together: each of `depth` steps gathers every
+    sample's split feature and threshold per tree and moves it left or right,
+    so prediction is a fixed number of vectorised array operations.
+    """
+
+    def __init__(self, left: np.ndarray, right: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray, tree_group: np.ndarray, base_score: np.ndarray,
+                 depth: int):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.tree_group = tree_group
+        self.base_score = base_score
+        self.depth = depth
+
+    @classmethod
+    def from_xgboost(cls, model) -> 'NumpyTrees':
+        """Pack the trees an XGBRegressor predicts with (up to its best iteration when early stopping ran)."""
+        booster = model.get_booster()
+        try:
+            # predict() stops at the best iteration when early stopping ran
+            booster = booster[:model.best_iteration + 1]
+        except AttributeError:
+            pass
+        config = json.loads(booster.save_raw('json'))['learner']
+        trees = config['gradient_booster']['model']['trees']
+        n_groups = max(1, int(config['learner_model_param'].get('num_target', 1)))
+        base_score = np.array(config['learner_model_param']['base_score'].strip('[]').split(','), dtype=np.float32)
+
+        max_nodes = max(len(tree['left_children']) for tree in trees)
+        shape = (len(trees), max_nodes)
+        left = np.zeros(shape, dtype=np.int32)
+        right = np.zeros(shape, dtype=np.int32)
+        feature = np.zeros(shape, dtype=np.int32)
+        threshold = np.zeros(shape, dtype=np.float32)
+        default_left = np.zeros(shape, dtype=bool)
+        value = np.zeros(shape, dtype=np.float32)
+        depth = 0
+        for t, tree in enumerate(trees):
+            n = len(tree['left_children'])
+            children = np.array(tree['left_children'])
+            is_leaf = children == -1
+            nodes = np.arange(n)
+            # Leaves point at themselves, so extra traversal steps leave them in place
+            left[t, :n] = np.where(is_leaf, nodes, children)
+            right[t, :n] = np.where(is_leaf, nodes, tree['right_children'])
+            feature[t, :n] = tree['split_indices']
+            threshold[t, :n] = tree['split_conditions']
+            default_left[t, :n] = np.array(tree['default_left'], dtype=bool)
+            # XGBoost keeps a leaf's value in its split condition slot
+            value[t, :n] = np.where(is_leaf, tree['split_conditions'], 0)
+            depth = max(depth, cls._tree_depth(children, np.array(tree['right_children'])))
+
+        tree_group = np.array(config['gradient_booster']['model']['tree_info'], dtype=np.int32)
+        base_score = np.broadcast_to(base_score, (n_groups,)).astype(np.float32)
+        return cls(left, right, feature, threshold, default_left, value, tree_group, base_score, depth)
+
+    @staticmethod
+    def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+        """Longest root-to-leaf path of one tree (leaves have child -1)."""
+        depth, level = 0, [0]
+        while True:
+            level = [child for node in level for child in (left[node], right[node]) if child != -1]
+            if not level:
+                return depth
+            depth += 1
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """(n_samples,) predictions for one output, (n_samples, n_outputs) for several."""
+        X = np.asarray(X, dtype=np.float32)
+        n_trees, max_nodes = self.left.shape
+        # Gather through flat node indices (tree * max_nodes + node) instead of 2-D fancy indexing
+        offsets = np.arange(n_trees, dtype=np.int64) * max_nodes
+        row_offsets = np.arange(len(X), dtype=np.int64)[:, np.newaxis] * X.shape[1]
+        flat_x = X.reshape(-1)
+        left, right = self.left.reshape(-1), self.right.reshape(-1)
+        feature, threshold = self.feature.reshape(-1), self.threshold.reshape(-1)
+        default_left = self.default_left.reshape(-1)
+        index = np.broadcast_to(offsets, (len(X), n_trees)).copy()
+        for _ in range(self.depth):
+            x = flat_x.take(row_offsets + feature.take(index))
+            go_left = (x < threshold.take(index)) | (np.isnan(x) & default_left.take(index))
+            index = offsets + np.where(go_left, left.take(index), right.take(index))
+
+        leaves = self.value.reshape(-1).take(index)
+        outputs = np.empty((len(X), len(self.base_score)), dtype=np.float32)
+        for group in range(len(self.base_score)):
+            outputs[:, group] = leaves[:, self.tree_group == group].sum(axis=1) + self.base_score[group]
+        return outputs[:, 0] if outputs.shape[1] == 1 else outputs
+
+
+class NumpyForecaster(BatchForecaster):
+    """BatchForecaster that runs NumpyLSTM and NumpyTrees instead of TensorFlow and XGBoost.
+
+    The recursive and direct forecasting loops, and Monte-Carlo dropout
+    sampling, are inherited unchanged; `seed` seeds the dropout masks.
+    """
+
+    def __init__(self, lstm: NumpyLSTM, trees: NumpyTrees, lookback: int, forecast_horizon: int,
+                 instrumentation=None, n_features: int = 1, seed: Optional[int] = None):
+        self.lstm_model = lstm
+        self.xgb_model = trees
+        self.lookback = lookback
+        self.forecast_horizon = forecast_horizon
+        self.instrumentation = instrumentation
+        self.n_features = n_features
+        self.rng = np.random.default_rng(seed)
+        self._sampling = False
+
+    def _lstm_outputs(self, windows: np.ndarray) -> np.ndarray:
+        if self.instrumentation:
+            self.instrumentation.count_model_call()
+        if windows.ndim == 2:
+            windows = windows[:, :, np.newaxis]
+        return self.lstm_model(windows, training=self._sampling, rng=self.rng).reshape(len(windows), -1)
+
+    def _prepare_sampling(self):
+        if not self.lstm_model.has_dropout:
+            raise ValueError("Monte-Carlo dropout needs an LSTM model with Dropout layers")
+
+
+class NumpyRuntime:
+    """Univariate ensemble forecaster with the MinMaxScaler folded in.
+
+    Takes recent daily totals in sales units and returns the ensemble
+    forecast in sales units, using the exported pipeline's forecasting
+    strategy and feedback mode.
+    """
+
+    def __init__(self, forecaster: NumpyForecaster, scale: float, offset: float, strategy: str = 'recursive',
+                 feedback: str = 'ensemble'):
+        check_forecast_strategy(strategy)
+        self.forecaster = forecaster
+        self.scale = scale
+        self.offset = offset
+        self.strategy = strategy
+        self.feedback = feedback
+
+    @property
+    def lookback(self) -> int:
+        return self.forecaster.lookback
+
+    @property
+    def forecast_horizon(self) -> int:
+        return self.forecaster.forecast_horizon
+
+    def _windows(self, recent_sales) -> Tuple[np.ndarray, bool]:
+        """The last `lookback` totals of one (days,) or many (n_series, days) histories, and a single flag."""
+        recent = np.asarray(recent_sales, dtype=np.float64)
+        single = recent.ndim == 1
+        recent = np.atleast_2d(recent)
+        if recent.shape[1] < self.lookback:
+            raise ValueError(f"Need at least {self.lookback} days of recent sales, got {recent.shape[1]}")
+        return recent[:, -self.lookback:], single
+
+    def forecast_all(self, recent_sales) -> Dict[str, np.ndarray]:
+        """(n_series, forecast_horizon) LSTM, XGBoost and ensemble forecasts in sales units."""
+        windows, _ = self._windows(recent_sales)
+        windows = (windows * self.scale + self.offset).astype(np.float32)
+        if self.strategy == 'direct':
+            scaled = self.forecaster.forecast_direct(windows)
+        else:
+            scaled = self.forecaster.forecast(windows, feedback=self.feedback)
+        return {name: (values.astype(np.float64) - self.offset) / self.scale for name, values in scaled.items()}
+
+    def forecast(self, recent_sales) -> np.ndarray:
+        """Ensemble forecast: (forecast_horizon,) for one history of totals, (n, forecast_horizon) for several."""
+        windows, single = self._windows(recent_sales)
+        forecasts = self.forecast_all(windows)['ensemble']
+        return forecasts[0] if single else forecasts
+
+    def save(self, path: str):
+        """Write the runtime as a single compressed .npz file."""
+        arrays = {}
+        layers_meta = []
+        for i, layer in enumerate(self.forecaster.lstm_model.layers):
+            meta = {key: value for key, value in layer.items() if not isinstance(value, np.ndarray)}
+            for key, value in layer.items():
+                if isinstance(value, np.ndarray):
+                    arrays[f'lstm_{i}_{key}'] = value
+            layers_meta.append(meta)
+        trees = self.forecaster.xgb_model
+        for key in ('left', 'right', 'feature', 'threshold', 'default_left', 'value', 'tree_group', 'base_score'):
+            arrays[f'xgb_{key}'] = getattr(trees, key)
+
+        meta = {
+            'format_version': RUNTIME_FORMAT_VERSION,
+            'lookback': self.lookback,
+            'forecast_horizon': self.forecast_horizon,
+            'strategy': self.strategy,
+            'feedback': self.feedback,
+            'scale': self.scale,
+            'offset': self.offset,
+            'xgb_depth': trees.depth,
+            'lstm_layers': layers_meta
+        }
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyRuntime':
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['format_version'] > RUNTIME_FORMAT_VERSION:
+                raise ValueError(f"Runtime format {meta['format_version']} is newer than this loader supports")
+            layers = []
+            for i, layer_meta in enumerate(meta['lstm_layers']):
+                layer = dict(layer_meta)
+                prefix = f'lstm_{i}_'
+                layer.update({key[len(prefix):]: data[key] for key in data.files if key.startswith(prefix)})
+                layers.append(layer)
+            trees = NumpyTrees(*(data[f'xgb_{key}'] for key in ('left', 'right', 'feature', 'threshold',
+                                                               'default_left', 'value', 'tree_group',
+                                                               'base_score')),
+                               depth=meta['xgb_depth'])
+        forecaster = NumpyForecaster(NumpyLSTM(layers), trees, meta['lookback'], meta['forecast_horizon'])
+        return cls(forecaster, meta['scale'], meta['offset'], meta['strategy'], meta['feedback'])
+
+
+def export_lstm(model) -> NumpyLSTM:
+    """Copy the weights of a Keras model made of LSTM, Dropout and Dense layers."""
+    layers = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        weights = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+        if kind == 'LSTM':
+            kernel, recurrent_kernel = weights[:2]
+            bias = weights[2] if config.get('use_bias', True) else np.zeros(kernel.shape[1], dtype=np.float32)
+            layers.append({'type': 'lstm', 'kernel': kernel, 'recurrent_kernel': recurrent_kernel, 'bias': bias,
+                           'activation': config['activation'], 'recurrent_activation': config['recurrent_activation'],
+                           'return_sequences': bool(config['return_sequences'])})
+        elif kind == 'Dropout':
+            layers.append({'type': 'dropout', 'rate': float(config['rate'])})
+        elif kind == 'Dense':
+            bias = weights[1] if config.get('use_bias', True) else np.zeros(weights[0].shape[1], dtype=np.float32)
+            layers.append({'type': 'dense', 'kernel': weights[0], 'bias': bias, 'activation': config['activation']})
+        elif kind != 'InputLayer':
+            raise ValueError(f"Unsupported layer for the NumPy runtime: {kind}")
+    return NumpyLSTM(layers)
+
+
+def export_runtime(system) -> NumpyRuntime:
+    """Build a NumpyRuntime from a trained (or loaded) univariate SalesInsightPipeline or SimpleSalesForecastSystem."""
+    if getattr(system, 'feature_columns', None):
+        raise ValueError("The NumPy runtime only supports univariate models")
+    forecaster = NumpyForecaster(export_lstm(system.models['lstm']), NumpyTrees.from_xgboost(system.models['xgb']),
+                                 system.lookback, system.forecast_horizon)
+    # MinMaxScaler: scaled = sales * scale_ + min_
+    return NumpyRuntime(forecaster, float(system.scaler.scale_[0]), float(system.scaler.min_[0]),
+                        system.forecast_strategy, system.FORECAST_FEEDBACK)
+
+
+def check_parity(system, runtime: NumpyRuntime, recent_sales: Optional[np.ndarray] = None,
+                 n_windows: int = 64, seed: int = 0) -> Dict[str, float]:
+    """Largest absolute and relative differences between the runtime and the original models' forecasts.
+
+    Windows default to random daily totals within the scaler's fitted range.
+    """
+    if recent_sales is None:
+        rng = np.random.default_rng(seed)
+        low, high = system.scaler.data_min_[0], system.scaler.data_max_[0]
+        recent_sales = rng.uniform(low, high, size=(n_windows, system.lookback))
+    recent_sales = np.asarray(recent_sales, dtype=np.float64)
+
+    windows = system.scaler.transform(recent_sales.reshape(-1, 1)).reshape(recent_sales.shape)
+    reference_forecaster = BatchForecaster(system.models['lstm'], system.models['xgb'], system.lookback,
+                                           system.forecast_horizon)
+    if system.forecast_strategy == 'direct':
+        reference = reference_forecaster.forecast_direct(windows)
+    else:
+        reference = reference_forecaster.forecast(windows, feedback=system.FORECAST_FEEDBACK)
+    expected = {name: system.scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+                for name, values in reference.items()}
+    actual = runtime.forecast_all(recent_sales)
+
+    report = {}
+    for name in expected:
+        difference = np.abs(actual[name] - expected[name])
+        report[f'{name}_max_abs'] = float(difference.max())
+        report[f'{name}_max_rel'] = float((difference / np.maximum(np.abs(expected[name]), 1e-9)).max())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export saved pipeline models to the NumPy runtime.')
+    parser.add_argument('--models', default='./models', help='Artifact store of a univariate SalesInsightPipeline')
+    parser.add_argument('--version', help='Artifact version (latest by default)')
+    parser.add_argument('--output', default='runtime.npz')
+    parser.add_argument('--tolerance', type=float, default=1e-3, help='Largest relative difference accepted')
+    args = parser.parse_args()
+
+    from SalesForecastingBot import SalesInsightPipeline
+
+    pipeline = SalesInsightPipeline(gemini_api_key='unused', verbose=False)
+    pipeline.load_models(args.models, args.version)
+    runtime = export_runtime(pipeline)
+    report = check_parity(pipeline, runtime)
+    print(json.dumps(report, indent=2))
+    if report['ensemble_max_rel'] > args.tolerance:
+        raise SystemExit(f"Parity check failed: relative difference {report['ensemble_max_rel']:.2e}")
+    runtime.save(args.output)
+    print(f"NumPy runtime written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
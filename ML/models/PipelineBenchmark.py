@@ -0,0 +1,192 @@
+"""Stage-by-stage benchmark of the forecasting pipelines on synthetic data.
+
+Run from this directory, for example:
+
+    python PipelineBenchmark.py --rows 200000 --days 120 --save-baseline pipeline_baseline.json
+    python PipelineBenchmark.py --rows 200000 --days 120 --baseline pipeline_baseline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import pandas as pd
+from SyntheticSales import generate_transactions
+from Instrumentation import PeakRSSSampler
+
+
+def measure_stage(fn: Callable, rows: int, trace_memory: bool = False):
+    """Run one stage and return its result plus wall time, throughput and memory figures."""
+    if trace_memory:
+        tracemalloc.start()
+    with PeakRSSSampler() as sampler:
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+    stats = {
+        'seconds': seconds,
+        'rows': rows,
+        'rows_per_second': rows / seconds if seconds > 0 else float('inf'),
+        'peak_rss_mb': sampler.peak / 2 ** 20
+    }
+    if trace_memory:
+        stats['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, stats
+
+
+def benchmark_simple(df: pd.DataFrame, forecast_series: int, trace_memory: bool = False,
+                     feature_columns: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Time each stage of SimpleSalesForecastSystem (univariate only, so `feature_columns` is ignored)."""
+    from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+
+    system = SimpleSalesForecastSystem(verbose=False)
+    stages = {}
+    processed, stages['process_data'] = measure_stage(lambda: system.process_data(df.copy()), len(df), trace_memory)
+    (daily_sales, scaled), stages['prepare_data'] = measure_stage(
+        lambda: system.prepare_data(processed), len(processed), trace_memory)
+    (X, y), stages['create_sequences'] = measure_stage(
+        lambda: system.create_sequences(scaled), len(scaled), trace_memory)
+    # Training also scores the held-out windows, so metrics are part of this stage
+    _, stages['train'] = measure_stage(lambda: system.train_models(X, y), len(X), trace_memory)
+    windows = [scaled[-system.lookback:, 0]] * forecast_series
+    _, stages['generate_forecasts'] = measure_stage(
+        lambda: system.generate_forecasts(windows), forecast_series * system.forecast_horizon, trace_memory)
+    return stages
+
+
+def benchmark_insight(df: pd.DataFrame, forecast_series: int, trace_memory: bool = False,
+                      feature_columns: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Time each stage of SalesInsightPipeline (no Gemini calls are made)."""
+    from SalesForecastingBot import SalesInsightPipeline
+
+    pipeline = SalesInsightPipeline(gemini_api_key='benchmark', verbose=False, feature_columns=feature_columns)
+    stages = {}
+    processed, stages['process_data'] = measure_stage(lambda: pipeline.process_data(df), len(df), trace_memory)
+    (daily_sales, scaled), stages['prepare_data'] = measure_stage(
+        lambda: pipeline.prepare_data(processed), len(processed), trace_memory)
+    (X, y), stages['create_sequences'] = measure_stage(
+        lambda: pipeline.create_sequences(scaled), len(scaled), trace_memory)
+
+    def train():
+        pipeline.build_models()
+        return pipeline.train(X, y)
+
+    # Training also scores the held-out windows, so metrics are part of this stage
+    _, stages['train'] = measure_stage(train, len(X), trace_memory)
+    windows = [pipeline.last_context()] * forecast_series
+    _, stages['predict'] = measure_stage(
+        lambda: pipeline.generate_forecasts(windows), forecast_series * pipeline.forecast_horizon, trace_memory)
+    return stages
+
+
+PIPELINES = {
+    'simple': benchmark_simple,
+    'insight': benchmark_insight
+}
+
+# Memory figures checked against the baseline, and the absolute growth always allowed
+MEMORY_FIGURES = ('peak_rss_mb', 'peak_traced_mb')
+MEMORY_SLACK_MB = 16
+
+
+def run_benchmark(rows: int, days: int, categories: int, pipelines: Optional[List[str]] = None,
+                  forecast_series: int = 1, trace_memory: bool = False, seed: int = 0,
+                  feature_columns: Optional[List[str]] = None) -> Dict:
+    """Generate synthetic data once and time every stage of the selected pipelines."""
+    df = generate_transactions(rows, n_days=days, n_categories=categories, seed=seed)
+    results = {
+        'config': {'rows': rows, 'days': days, 'categories': categories, 'forecast_series': forecast_series,
+                   'feature_columns': feature_columns},
+        'pipelines': {}
+    }
+    for name in pipelines or list(PIPELINES):
+        results['pipelines'][name] = PIPELINES[name](df, forecast_series, trace_memory, feature_columns)
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float = 0.2,
+                        memory_tolerance: float = 0.2) -> List[str]:
+    """Stages whose wall time or peak memory regressed by more than the tolerance (relative) against the baseline.
+
+    Peak RSS is always compared and peak traced memory when both runs recorded
+    it; memory may also grow by MEMORY_SLACK_MB to absorb allocator noise.
+    """
+    regressions = []
+    if results['config'] != baseline.get('config'):
+        print("Warning: baseline was recorded with a different configuration")
+    for pipeline, stages in results['pipelines'].items():
+        baseline_stages = baseline.get('pipelines', {}).get(pipeline, {})
+        for stage, stats in stages.items():
+            if stage not in baseline_stages:
+                continue
+            previous = baseline_stages[stage]['seconds']
+            if stats['seconds'] > previous * (1 + tolerance):
+                regressions.append(f"{pipeline}.{stage}: {stats['seconds']:.3f}s vs baseline {previous:.3f}s")
+            for figure in MEMORY_FIGURES:
+                previous = baseline_stages[stage].get(figure)
+                # RSS reads as 0 where /proc is unavailable
+                if figure not in stats or not previous:
+                    continue
+                if stats[figure] > previous * (1 + memory_tolerance) + MEMORY_SLACK_MB:
+                    regressions.append(f"{pipeline}.{stage}: {figure} {stats[figure]:.1f} MB "
+                                       f"vs baseline {previous:.1f} MB")
+    return regressions
+
+
+def print_report(results: Dict):
+    for pipeline, stages in results['pipelines'].items():
+        print(f"\n{pipeline}")
+        print(f"{'stage':<22}{'seconds':>10}{'rows':>12}{'rows/s':>14}{'peak RSS MB':>14}")
+        for stage, stats in stages.items():
+            print(f"{stage:<22}{stats['seconds']:>10.3f}{stats['rows']:>12}"
+                  f"{stats['rows_per_second']:>14.0f}{stats['peak_rss_mb']:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the forecasting pipelines stage by stage.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--categories', type=int, default=11)
+    parser.add_argument('--pipeline', action='append', choices=sorted(PIPELINES))
+    parser.add_argument('--forecast-series', type=int, default=1,
+                        help='Number of windows forecast together in the forecast stage')
+    parser.add_argument('--features', nargs='+',
+                        help='Multivariate feature columns for the insight pipeline, e.g. total day_of_week rolling_avg_7d')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also record peak Python-level allocations (slower)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--save-baseline', help='Write the results as a new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--memory-tolerance', type=float, default=0.2,
+                        help='Allowed relative growth of peak RSS (and traced memory) per stage')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.days, args.categories, args.pipeline,
+                            args.forecast_series, args.trace_memory, feature_columns=args.features)
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance, args.memory_tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import numpy as np
+from typing import Callable, Dict, Optional, Tuple
+from SequenceWindows import flatten_windows, make_windows
+
+# 'conformal' widens point forecasts by backtest residual quantiles, 'mc_dropout'
+# samples forecast paths with the LSTM's dropout active, and 'quantile' fits
+# XGBoost to the interval bounds directly
+INTERVAL_METHODS = ('conformal', 'mc_dropout', 'quantile')
+
+# Conformal intervals are calibrated on at least this many backtest cutoffs when the series allows it
+MIN_CALIBRATION_CUTOFFS = 20
+
+
+def check_interval_method(method: str):
+    if method not in INTERVAL_METHODS:
+        raise ValueError(f"Unknown interval method: {method}. Expected one of {INTERVAL_METHODS}")
+
+
+def interval_quantiles(coverage: float) -> Tuple[float, float]:
+    """Lower and upper quantile levels of a central interval, e.g. 0.9 -> (0.05, 0.95)."""
+    if not 0 < coverage < 1:
+        raise ValueError(f"coverage must be between 0 and 1, got {coverage}")
+    tail = (1 - coverage) / 2
+    return tail, 1 - tail
+
+
+def path_quantiles(paths: np.ndarray, coverage: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Interval bounds across sampled paths: (n_series, n_samples, horizon) -> two (n_series, horizon) arrays."""
+    low, high = interval_quantiles(coverage)
+    bounds = np.quantile(paths, [low, high], axis=1)
+    return bounds[0], bounds[1]
+
+
+class ConformalIntervals:
+    """Split-conformal intervals from backtest residuals, one half-width per horizon step.
+
+    The half-width is a finite-sample corrected quantile of the absolute
+    residual (actual minus forecast), so the band is centred on the forecast
+    and about `coverage` of future values fall inside forecast ± half-width
+    as long as errors behave like the backtest's. `lower` and `upper` are the
+    offsets -half-width and +half-width. Applying them costs two additions.
+    """
+
+    def __init__(self, coverage: float = 0.9, lower: Optional[np.ndarray] = None,
+                 upper: Optional[np.ndarray] = None, n_calibration: int = 0):
+        interval_quantiles(coverage)
+        self.coverage = coverage
+        self.lower = None if lower is None else np.asarray(lower, dtype=np.float64)
+        self.upper = None if upper is None else np.asarray(upper, dtype=np.float64)
+        self.n_calibration = n_calibration
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.lower is not None
+
+    def fit(self, residuals: np.ndarray) -> 'ConformalIntervals':
+        """Calibrate on (n_cutoffs, horizon) residuals in sales units."""
+        residuals = np.asarray(residuals, dtype=np.float64)
+        if residuals.ndim != 2 or len(residuals) < 2:
+            raise ValueError("Conformal calibration needs residuals from at least two cutoffs")
+        n = len(residuals)
+        # Finite-sample correction: the level is ceil((n + 1) * coverage) / n
+        level = min(1.0, np.ceil((n + 1) * self.coverage) / n)
+        half_width = np.quantile(np.abs(residuals), level, axis=0)
+        self.lower, self.upper = -half_width, half_width
+        self.n_calibration = n
+        return self
+
+    @classmethod
+    def from_backtest(cls, result, model: str = 'ensemble', coverage: float = 0.9) -> 'ConformalIntervals':
+        """Calibrate on a Backtesting.BacktestResult."""
+        return cls(coverage).fit(result.residuals(model))
+
+    def interval(self, forecasts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper bounds for (..., horizon) forecasts in sales units."""
+        if not self.is_fitted:
+            raise ValueError("Conformal intervals have not been calibrated")
+        forecasts = np.asarray(forecasts, dtype=np.float64)
+        horizon = forecasts.shape[-1]
+        if horizon > len(self.lower):
+            raise ValueError(f"Calibrated for {len(self.lower)} steps, got forecasts of {horizon}")
+        return forecasts + self.lower[:horizon], forecasts + self.upper[:horizon]
+
+    def to_dict(self) -> Dict:
+        return {
+            'coverage': self.coverage,
+            'lower': self.lower.tolist(),
+            'upper': self.upper.tolist(),
+            'n_calibration': self.n_calibration
+        }
+
+    @classmethod
+    def from_dict(cls, params: Dict) -> 'ConformalIntervals':
+        return cls(params['coverage'], params['lower'], params['upper'], params.get('n_calibration', 0))
+
+
+def calibrate_conformal(system, scaled_data: np.ndarray, first_unseen: int, coverage: float = 0.9,
+                        min_cutoffs: int = MIN_CALIBRATION_CUTOFFS,
+                        log: Optional[Callable] = None) -> ConformalIntervals:
+    """Conformal intervals for a trained system, calibrated on a backtest of its own forecasts.
+
+    The cutoffs start at `first_unseen`, the first period no training window
+    covered. When fewer than `min_cutoffs` of them leave a full horizon of
+    actuals (a long horizon on a short series), the last `min_cutoffs`
+    cutoffs are used instead; the earlier ones fall in the training period,
+    so their residuals are in-sample and the band may be narrower than
+    `coverage`, which is reported through `log`.
+    """
+    from Backtesting import Backtester
+
+    backtester = Backtester(system)
+    cutoffs = backtester.cutoffs(len(scaled_data), first_unseen)
+    if len(cutoffs) < min_cutoffs:
+        held_out = len(cutoffs)
+        cutoffs = backtester.cutoffs(len(scaled_data), 0)[-min_cutoffs:]
+        if len(cutoffs) > held_out and log is not None:
+            log(f"Warning: only {held_out} cutoffs follow the training period; calibrating conformal "
+                f"intervals on the last {len(cutoffs)}, some in-sample, so they may be too narrow")
+    if len(cutoffs) < 2:
+        raise ValueError(f"Conformal intervals need a backtest of at least two {backtester.horizon}-period "
+                         f"forecasts, but the series has {len(scaled_data)} periods; use a shorter "
+                         f"forecast_horizon or interval_method='mc_dropout'")
+    return ConformalIntervals.from_backtest(backtester.evaluate(scaled_data, cutoffs), coverage=coverage)
+
+
+def horizon_rows(windows: np.ndarray, horizon: int) -> np.ndarray:
+    """Repeat each flattened window once per horizon step, with the step appended as a feature."""
+    windows = np.asarray(windows, dtype=np.float32).reshape(len(windows), -1)
+    steps = np.tile(np.arange(horizon, dtype=np.float32), len(windows))[:, np.newaxis]
+    return np.hstack([np.repeat(windows, horizon, axis=0), steps])
+
+
+class QuantileXGBIntervals:
+    """XGBoost fitted to the interval's lower and upper quantiles of the next `horizon` days.
+
+    The quantile loss only supports a single target, so the horizon step is
+    a feature: one model predicts both bounds of every step for a batch of
+    windows in a single call, whatever strategy the point models use.
+    """
+
+    def __init__(self, coverage: float = 0.9, horizon: int = 30, xgb_params: Optional[Dict] = None):
+        self.coverage = coverage
+        self.horizon = horizon
+        self.xgb_params = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 3, **(xgb_params or {})}
+        self.model = None
+
+    def fit(self, scaled_data: np.ndarray, lookback: int) -> 'QuantileXGBIntervals':
+        """Fit on every window of a scaled (days, features) series and its next `horizon` totals."""
+        import xgboost as xgb
+
+        X, y = make_windows(scaled_data, lookback, horizon=self.horizon)
+        if not len(X):
+            raise ValueError(f"Quantile intervals need at least {lookback + self.horizon} days of data")
+        self.model = xgb.XGBRegressor(objective='reg:quantileerror',
+                                      quantile_alpha=np.array(interval_quantiles(self.coverage)),
+                                      **self.xgb_params)
+        self.model.fit(horizon_rows(flatten_windows(X), self.horizon), np.asarray(y).reshape(-1))
+        return self
+
+    def interval(self, windows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scaled (n_windows, horizon) lower and upper bounds for a batch of windows."""
+        if self.model is None:
+            raise ValueError("Quantile intervals have not been fitted")
+        bounds = np.asarray(self.model.predict(horizon_rows(windows, self.horizon)))
+        bounds = np.sort(bounds.reshape(len(windows), self.horizon, 2), axis=-1)
+        return bounds[..., 0], bounds[..., 1]
@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold a question and drop whitespace and trailing-punctuation differences."""
+    question = re.sub(r'\s+', ' ', question.strip().lower())
+    return question.rstrip('?!. ')
+
+
+def summary_hash(data_summary: Dict) -> str:
+    """Stable hash of a data summary, so answers are tied to the data they were given."""
+    payload = json.dumps(data_summary, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _flush_at_exit(cache_ref: weakref.ref):
+    cache = cache_ref()
+    if cache is not None:
+        cache.flush()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of LLM answers with a time-to-live and optional JSON persistence.
+
+    Keys combine the normalised question with a hash of the data summary, so
+    any change in the underlying data produces new keys rather than stale hits.
+
+    With a `path`, new answers are written in batches rather than on every
+    set: the file is rewritten once `flush_every` answers are pending or
+    `flush_interval` seconds have passed since the last write, on flush()
+    and at interpreter exit.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0, path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time, flush_every: int = 32, flush_interval: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Serialises file writes, which happen outside _lock
+        self._write_lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = clock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+        if path and os.path.exists(path):
+            self.load(path)
+        if path:
+            atexit.register(_flush_at_exit, weakref.ref(self))
+
+    @staticmethod
+    def make_key(question: str, data_summary: Dict) -> str:
+        return f"{summary_hash(data_summary)}:{normalize_question(question)}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached answer, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, response = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: str):
+        """Store an answer, evicting the least recently used entries beyond maxsize."""
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._pending += 1
+            due = self._pending >= self.flush_every or self.clock() - self._last_flush >= self.flush_interval
+        if self.path and due:
+            self.flush()
+
+    def flush(self):
+        """Write pending answers to `path`, if there are any."""
+        with self._lock:
+            if not self.path or not self._pending:
+                return
+            self._pending = 0
+            self._last_flush = self.clock()
+        with self._write_lock:
+            self.save()
+            self.flushes += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'flushes': self.flushes
+        }
+
+    def save(self, path: Optional[str] = None):
+        """Write unexpired entries to a JSON file (atomically replaced)."""
+        path = path or self.path
+        now = self.clock()
+        with self._lock:
+            entries = [[key, expires_at, response] for key, (expires_at, response) in self._entries.items()
+                       if expires_at > now]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None):
+        """Load unexpired entries from a JSON file written by save."""
+        path = path or self.path
+        with open(path) as f:
+            entries = json.load(f)
+        now = self.clock()
+        with self._lock:
+            for key, expires_at, response in entries:
+                if expires_at > now:
+                    self._entries[key] = (expires_at, response)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
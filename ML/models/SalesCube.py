@@ -0,0 +1,373 @@
+import re
+import weakref
+import threading
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from ResponseCache import normalize_question
+from SalesIngestion import frame_version
+
+CUBE_DIMENSIONS = ['date', 'category', 'customer_type', 'payment_type']
+CUBE_MEASURES = ['revenue', 'transactions']
+
+# Every transaction column the cube reads; refresh() rebuilds it when any of them changed
+CUBE_SOURCE_COLUMNS = ['date', 'datetime'] + CUBE_DIMENSIONS[1:] + ['total']
+
+
+def has_cube_columns(df: pd.DataFrame) -> bool:
+    """Whether a transaction frame carries every column the cube aggregates."""
+    return ('date' in df.columns or 'datetime' in df.columns) and \
+        all(column in df.columns for column in CUBE_DIMENSIONS[1:] + ['total'])
+
+
+def frame_fingerprint(df: pd.DataFrame, columns: Sequence[str] = CUBE_SOURCE_COLUMNS) -> str:
+    """Fingerprint of every row of `columns` (those present in the frame).
+
+    Rows are hashed in one vectorised pass, so an edit to any row or column
+    changes it; row hashes are weighted by position, so reordered rows do too.
+    """
+    if len(df) == 0:
+        return '0:empty'
+    columns = [col for col in columns if col in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).values
+    # Odd weights are invertible modulo 2**64, so no row's hash is ever cancelled out
+    weights = np.arange(1, 2 * len(df), 2, dtype=np.uint64)
+    return f"{len(df)}:{(row_hashes * weights).sum(dtype=np.uint64):x}"
+
+
+def _transaction_days(df: pd.DataFrame) -> pd.Series:
+    dates = df['date'] if 'date' in df.columns else df['datetime']
+    return pd.to_datetime(dates).dt.normalize().rename('date')
+
+
+class SalesCube:
+    """Pre-aggregated revenue and transaction counts over date x category x customer_type x payment_type.
+
+    The cube is a dense array with one cell per combination of dimension
+    values seen so far, so any roll-up is a slice and a sum over a few
+    thousand cells instead of a scan of the transactions. New rows are
+    folded in as they arrive: `update` recognises a frame that
+    append_transactions built from the one the cube holds and only
+    aggregates the appended rows. Telling frames apart costs no scan of the
+    rows, so edits made in place need an explicit `refresh`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+        self.extensions = 0
+        self._reset()
+
+    def _reset(self):
+        self.coords = {dim: pd.DatetimeIndex([]) if dim == 'date' else pd.Index([], dtype=object)
+                       for dim in CUBE_DIMENSIONS}
+        self._revenue = np.zeros((0,) * len(CUBE_DIMENSIONS), dtype=np.float64)
+        self._transactions = np.zeros((0,) * len(CUBE_DIMENSIONS), dtype=np.int64)
+        self.n_rows = 0
+        self._source = None
+        self._version = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_transactions(cls, df: pd.DataFrame) -> 'SalesCube':
+        cube = cls()
+        cube.update(df)
+        return cube
+
+    def _grow(self):
+        """Pad the cell arrays to the current number of values along every dimension."""
+        padding = [(0, len(self.coords[dim]) - size) for dim, size in zip(CUBE_DIMENSIONS, self._revenue.shape)]
+        if any(after for _, after in padding):
+            self._revenue = np.pad(self._revenue, padding)
+            self._transactions = np.pad(self._transactions, padding)
+
+    def add(self, df: pd.DataFrame):
+        """Fold transactions into the cube."""
+        with self._lock:
+            if len(df):
+                keys = [_transaction_days(df)] + [df[dim] for dim in CUBE_DIMENSIONS[1:]]
+                cells = df.groupby(keys, observed=True)['total'].agg(['sum', 'count'])
+                positions = []
+                for level, dim in enumerate(CUBE_DIMENSIONS):
+                    values = cells.index.get_level_values(level)
+                    values = pd.DatetimeIndex(values) if dim == 'date' else pd.Index(np.asarray(values, dtype=object))
+                    unique = values.unique()
+                    new = unique[self.coords[dim].get_indexer(unique) == -1]
+                    if len(new):
+                        self.coords[dim] = self.coords[dim].append(new)
+                    positions.append(self.coords[dim].get_indexer(values))
+                self._grow()
+                # groupby cells are unique, so plain fancy-index accumulation is safe
+                cell = tuple(positions)
+                self._revenue[cell] += cells['sum'].to_numpy(dtype=np.float64)
+                self._transactions[cell] += cells['count'].to_numpy(dtype=np.int64)
+            self.n_rows += len(df)
+            self._fingerprint = None
+
+    def update(self, df: pd.DataFrame) -> 'SalesCube':
+        """Bring the cube in line with `df`, aggregating only rows appended since the last update.
+
+        The frame the cube was built from is a no-op; a later version of its
+        dataset (see SalesIngestion.frame_version) is extended by its new
+        rows, and any other frame rebuilds the cube.
+        """
+        with self._lock:
+            if self._source is not None and self._source() is df and self.n_rows == len(df):
+                return self
+            dataset, appends, n_rows = version = frame_version(df)
+            if self._version is not None and dataset is not None and dataset == self._version[0] and \
+                    appends > self._version[1] and n_rows > self.n_rows:
+                self.add(df.iloc[self.n_rows:])
+                self.extensions += 1
+            else:
+                self._rebuild(df)
+            self._source = weakref.ref(df)
+            self._version = version
+            return self
+
+    def refresh(self, df: pd.DataFrame) -> 'SalesCube':
+        """Hash every row of `df` and rebuild the cube if it changed since the last refresh.
+
+        `update` trusts a frame's identity and append counter, so call this
+        after editing rows of a frame in place.
+        """
+        with self._lock:
+            fingerprint = frame_fingerprint(df)
+            if fingerprint != self._fingerprint:
+                self._rebuild(df)
+                self._fingerprint = fingerprint
+            self._source = weakref.ref(df)
+            self._version = frame_version(df)
+            return self
+
+    def _rebuild(self, df: pd.DataFrame):
+        self._reset()
+        self.add(df)
+        self.rebuilds += 1
+
+    def _positions(self, dim: str, where: Dict, start, end) -> Optional[np.ndarray]:
+        """Cell positions kept along one dimension by the filters, or None when all are kept."""
+        values = self.coords[dim]
+        keep = None
+        if dim in where:
+            keep = np.asarray(values == where[dim])
+        if dim == 'date' and (start is not None or end is not None):
+            keep = np.ones(len(values), dtype=bool) if keep is None else keep
+            if start is not None:
+                keep &= values >= pd.Timestamp(start)
+            if end is not None:
+                keep &= values <= pd.Timestamp(end)
+        return None if keep is None else np.flatnonzero(keep)
+
+    def rollup(self, by: Union[str, Sequence[str]] = (), where: Optional[Dict] = None,
+               start=None, end=None) -> pd.DataFrame:
+        """Revenue and transaction count per value of the `by` dimensions.
+
+        `where` keeps only the given dimension values (e.g. {'category': 'Dairy'})
+        and `start`/`end` an inclusive date range. Combinations without any
+        transaction are dropped; dates come back in order.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = [dim for dim in by + list(where or {}) if dim not in CUBE_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {unknown}. Expected some of {CUBE_DIMENSIONS}")
+        kept = [dim for dim in CUBE_DIMENSIONS if dim in by]
+        summed = tuple(axis for axis, dim in enumerate(CUBE_DIMENSIONS) if dim not in by)
+        with self._lock:
+            revenue, transactions = self._revenue, self._transactions
+            labels = {}
+            for axis, dim in enumerate(CUBE_DIMENSIONS):
+                positions = self._positions(dim, where or {}, start, end)
+                if positions is not None:
+                    revenue = revenue.take(positions, axis=axis)
+                    transactions = transactions.take(positions, axis=axis)
+                labels[dim] = self.coords[dim] if positions is None else self.coords[dim][positions]
+            revenue = revenue.sum(axis=summed).ravel()
+            transactions = transactions.sum(axis=summed).ravel()
+
+        if len(kept) == 1:
+            index = labels[kept[0]]
+        elif kept:
+            index = pd.MultiIndex.from_product([labels[dim] for dim in kept], names=kept)
+        else:
+            index = pd.RangeIndex(1)
+        nonempty = np.flatnonzero(transactions > 0)
+        if 'date' in kept:
+            # Dates are stored in arrival order
+            nonempty = nonempty[np.argsort(np.asarray(index.get_level_values('date') if len(kept) > 1 else index)
+                                           [nonempty], kind='stable')]
+        table = pd.DataFrame({'revenue': revenue[nonempty], 'transactions': transactions[nonempty]},
+                             index=index[nonempty])
+        if len(kept) == 1:
+            table.index.name = kept[0]
+        elif len(kept) > 1 and kept != by:
+            table = table.reorder_levels(by)
+        return table
+
+    def totals(self, where: Optional[Dict] = None, start=None, end=None) -> Dict:
+        """Revenue, transactions and trading days (days with at least one transaction)."""
+        daily = self.rollup('date', where, start, end)
+        return {
+            'revenue': float(daily['revenue'].sum()),
+            'transactions': int(daily['transactions'].sum()),
+            'days': len(daily)
+        }
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+def _share(part: float, whole: float) -> str:
+    return f"{part / whole:.1%}" if whole else "0.0%"
+
+
+_REVENUE_WORDS = re.compile(r'\b(revenue|sales|spend|spending|money|income|earn\w*)\b')
+
+
+def _dimension_filters(cube: SalesCube, question: str, exclude: Sequence[str] = ()) -> Dict:
+    """Dimension values named in the question, e.g. 'dairy' -> {'category': 'Dairy'}."""
+    where = {}
+    for dim in CUBE_DIMENSIONS[1:]:
+        if dim in exclude:
+            continue
+        for value in cube.coords[dim]:
+            if re.search(rf'\b{re.escape(str(value).lower())}\b', question):
+                where[dim] = value
+                break
+    return where
+
+
+def _scope(where: Dict) -> str:
+    return ''.join(f" for {value}" for value in where.values())
+
+
+def _extreme_day(best: bool) -> Callable[[SalesCube, str], Optional[str]]:
+    def answer(cube: SalesCube, question: str) -> Optional[str]:
+        where = _dimension_filters(cube, question)
+        daily = cube.rollup('date', where)
+        if daily.empty:
+            return None
+        day = daily['revenue'].idxmax() if best else daily['revenue'].idxmin()
+        row = daily.loc[day]
+        label = 'best performing' if best else 'weakest'
+        return (f"The {label} day{_scope(where)} was {day.date()} with {_money(row['revenue'])} in sales "
+                f"across {int(row['transactions']):,} transactions, against a daily average of "
+                f"{_money(daily['revenue'].mean())}.")
+    return answer
+
+
+def _average_daily_revenue(cube: SalesCube, question: str) -> Optional[str]:
+    where = _dimension_filters(cube, question)
+    totals = cube.totals(where)
+    if not totals['days']:
+        return None
+    return (f"Average daily revenue{_scope(where)} is {_money(totals['revenue'] / totals['days'])} over "
+            f"{totals['days']:,} trading days ({_money(totals['revenue'])} in total).")
+
+
+def _total_revenue(cube: SalesCube, question: str) -> Optional[str]:
+    where = _dimension_filters(cube, question)
+    totals = cube.totals(where)
+    if not totals['days']:
+        return None
+    dates = cube.rollup('date', where).index
+    return (f"Total revenue{_scope(where)} is {_money(totals['revenue'])} from {totals['transactions']:,} "
+            f"transactions between {dates.min().date()} and {dates.max().date()}.")
+
+
+def _transaction_count(cube: SalesCube, question: str) -> Optional[str]:
+    where = _dimension_filters(cube, question)
+    totals = cube.totals(where)
+    if not totals['days']:
+        return None
+    return (f"There were {totals['transactions']:,} transactions{_scope(where)} over {totals['days']:,} "
+            f"trading days, about {totals['transactions'] / totals['days']:,.1f} per day.")
+
+
+def _ranking(dim: str, label: str, default_measure: str) -> Callable[[SalesCube, str], Optional[str]]:
+    """Answer 'which <dim> ...' questions by revenue or transaction count, whichever the question asks for."""
+    def answer(cube: SalesCube, question: str) -> Optional[str]:
+        where = _dimension_filters(cube, question, exclude=[dim])
+        table = cube.rollup(dim, where)
+        if table.empty:
+            return None
+        measure = 'revenue' if _REVENUE_WORDS.search(question) else default_measure
+        table = table.sort_values(measure, ascending=False, kind='stable')
+        whole = table[measure].sum()
+        fmt = _money if measure == 'revenue' else (lambda value: f"{int(value):,} transactions")
+        top = table.index[0]
+        others = ', '.join(f"{value} ({fmt(table.loc[value, measure])})" for value in table.index[1:3])
+        response = (f"{top} leads{_scope(where)} with {fmt(table.loc[top, measure])}, "
+                    f"{_share(table.loc[top, measure], whole)} of {label} {measure}.")
+        return response + (f" Next: {others}." if others else '')
+    return answer
+
+
+# Questions asking for reasons, advice, speculation or a particular time period are left to the LLM;
+# 'may' only counts as the month ('in may', 'may 2024') or as speculation ('may be', 'may have')
+_NEEDS_LLM = re.compile(
+    r'\b(why|how come|explain|recommend\w*|suggest\w*|should|could|would|improve|strateg\w*|forecast\w*|'
+    r'predict\w*|trends?|insights?|compare|comparison|versus|vs|analy[sz]\w*|week\w*|month\w*|year\w*|'
+    r'quarter\w*|yesterday|today|last|recent\w*|january|february|march|april|june|july|august|'
+    r'september|october|november|december|(in|during|since|until|of) may|may \d+|\d{4}|'
+    r'what if|might|may (be|have)|likely|likelihood|expect\w*|caus\w*|because|due to|reasons?)\b')
+
+# (name, pattern, answer) triples, tried in order on the normalised question
+INTENTS: List[Tuple] = [
+    ('best_day', re.compile(r'\b(best|top|highest|peak|biggest|busiest|strongest)\b.*\b(day|date)\b'),
+     _extreme_day(best=True)),
+    ('worst_day', re.compile(r'\b(worst|lowest|slowest|weakest|quietest)\b.*\b(day|date)\b'),
+     _extreme_day(best=False)),
+    ('average_daily_revenue',
+     re.compile(r'\b(average|mean|avg|typical)\b.*\b(daily|per day|a day|each day)\b|\bdaily (average|mean)\b'),
+     _average_daily_revenue),
+    ('total_revenue', re.compile(r'\btotal (revenue|sales)\b|\bhow much\b.*\b(revenue|sales|sold|made)\b'),
+     _total_revenue),
+    ('transaction_count', re.compile(r'\bhow many (transactions|orders|purchases|sales)\b'), _transaction_count),
+    ('top_category', re.compile(r'\b(which|what|top|best|most)\b.*\bcategor(y|ies)\b|'
+                                r'\bcategor(y|ies)\b.*\b(most|top|best|highest|leads?)\b'),
+     _ranking('category', 'category', 'revenue')),
+    ('payment_method', re.compile(r'\bpayment (method|type|option)s?\b|\bhow do (customers|people) pay\b'),
+     _ranking('payment_type', 'payment', 'transactions')),
+    ('customer_type', re.compile(r'\b(type|kind|group|segment)s? of customers?\b|'
+                                 r'\bcustomer (type|group|segment)s?\b|\bcustomers?\b.*\b(shop|buy|spend)\w*\b'),
+     _ranking('customer_type', 'customer', 'transactions')),
+]
+
+
+class QueryRouter:
+    """Routes chatbot questions: recognised aggregate questions to a SalesCube, the rest to the LLM.
+
+    Matching is a handful of regular expressions over the normalised
+    question, so routing costs microseconds; questions asking for reasons,
+    advice or a time period always go to the LLM.
+    """
+
+    def __init__(self, intents: Optional[Sequence] = None):
+        self.intents = list(INTENTS if intents is None else intents)
+        self.local = 0
+        self.forwarded = 0
+
+    def match(self, question: str) -> Optional[Tuple]:
+        """The first intent the question matches, or None when it needs the LLM."""
+        question = normalize_question(question)
+        if not _NEEDS_LLM.search(question):
+            for intent in self.intents:
+                if intent[1].search(question):
+                    return intent
+        return None
+
+    def answer(self, cube_fn: Callable[[], SalesCube], question: str) -> Optional[str]:
+        """Answer from the cube, or None to send the question to the LLM.
+
+        `cube_fn` returns an up-to-date cube and is only called for
+        recognised questions, so open-ended ones never pay for a cube update.
+        """
+        intent = self.match(question)
+        response = intent[2](cube_fn(), normalize_question(question)) if intent is not None else None
+        if response is None:
+            self.forwarded += 1
+        else:
+            self.local += 1
+        return response
@@ -1,44 +1,93 @@
+import asyncio
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import google.generativeai as genai
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
-import tensorflow.keras as keras
-from tensorflow.keras.models import Model
-import xgboost as xgb
-from typing import Dict, List, Tuple
-from IPython.display import display, clear_output
-import ipywidgets as widgets
+from BatchForecasting import BatchForecaster, as_sequence_batch, check_forecast_strategy
+from SequenceWindows import make_windows, flatten_windows, lstm_dataset
+from SalesIngestion import check_freq, period_range, read_transactions
+from IncrementalTraining import new_daily_sales, update_windows, warm_start_models
+from ModelArtifacts import LazyModels, ModelArtifactStore, scaler_from_dict, scaler_to_dict
+from TrainingCache import TrainingCache, training_key
+from SalesSummary import SummaryCache
+from SalesCube import QueryRouter, SalesCube, has_cube_columns
+from FeatureStore import (CALENDAR_FEATURES, DailyFeatureStore, FutureFeatureBuilder, check_forecastable,
+                          feature_matrix, history_length, is_feature_table)
+from ChatBackends import AsyncQueryExecutor, as_backend
+from ResponseCache import ResponseCache
+from Instrumentation import Instrumentation, instrumented
+from PredictionIntervals import (ConformalIntervals, QuantileXGBIntervals, calibrate_conformal, check_interval_method,
+                                 path_quantiles)
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# TensorFlow/Keras, XGBoost, scikit-learn, google.generativeai and the notebook
+# widgets are imported inside the methods that use them, so the chatbot and
+# data-summary paths start without paying for the ML backends.
+
+# Model hyperparameters; `patience` and `early_stopping_rounds` stop training once
+# validation loss stops improving
+DEFAULT_LSTM_PARAMS = {'units': 50, 'dropout': 0.2, 'epochs': 50, 'batch_size': 32, 'patience': 5}
+DEFAULT_XGB_PARAMS = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 3, 'early_stopping_rounds': 10}
+
+# LSTM batch size per granularity: hourly series are 24x longer, so they train in larger batches
+FREQ_BATCH_SIZES = {'H': 256, 'D': 32, 'W': 16}
 
 class SalesDataChatbot:
-    """Interactive chatbot for querying sales data using Gemini."""
+    """Interactive chatbot for querying sales data using Gemini.
+    
+    `gemini_model` may be a Gemini GenerativeModel or any chat backend with
+    `generate`/`agenerate` methods, such as ChatBackends.LocalStubBackend.
+    When a built `feature_store` is given, day-level figures in the summary
+    come from its daily feature table.
     
-    def __init__(self, gemini_model):
+    Aggregate questions the `query_router` recognises (best day, top category,
+    most common payment method, average daily revenue, ...) are answered
+    from a SalesCube kept in step with the data, without an LLM call;
+    pass local_answers=False to send every question to the LLM.
+    """
+    
+    def __init__(self, gemini_model, max_concurrency: int = 4, timeout: float = 30.0, max_retries: int = 2,
+                 response_cache: Optional[ResponseCache] = None,
+                 feature_store: Optional[DailyFeatureStore] = None,
+                 query_router: Optional[QueryRouter] = None, local_answers: bool = True):
         self.gemini = gemini_model
+        self.backend = as_backend(gemini_model)
+        self.executor = AsyncQueryExecutor(self.backend, max_concurrency=max_concurrency,
+                                           timeout=timeout, max_retries=max_retries)
         self.context = """You are a sales data analyst assistant. Analyze the data and provide clear, 
         concise answers. Consider total sales, product categories, customer types, and payment methods 
         in your analysis. Always include relevant numbers and insights in your responses."""
+        self.summary_cache = SummaryCache()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.feature_store = feature_store
+        self.cube = SalesCube()
+        self.router = (query_router or QueryRouter()) if local_answers else None
     
-    def query_data(self, df: pd.DataFrame, user_query: str) -> str:
-        """Process user query about sales data."""
-        try:
-            # Prepare data summary for context
-            data_summary = {
-                'total_sales': df['total'].sum(),
-                'avg_daily_sales': df['total'].mean(),
-                'date_range': f"{df['date'].min()} to {df['date'].max()}",
-                'peak_sales': df['total'].max(),
-                'peak_sales_date': df.loc[df['total'].idxmax(), 'date'],
-                'recent_trend': df.tail(7)['total'].tolist(),
-                'top_categories': df.groupby('category')['total'].sum().nlargest(3).to_dict(),
-                'customer_types': df['customer_type'].value_counts().to_dict(),
-                'payment_methods': df['payment_type'].value_counts().to_dict()
-            }
-            
-            prompt = f"""{self.context}
+    def _answer_locally(self, df: pd.DataFrame, user_query: str) -> Optional[str]:
+        """Answer a recognised aggregate question from the sales cube, or None to ask the LLM."""
+        if self.router is None or not has_cube_columns(df):
+            return None
+        return self.router.answer(lambda: self.cube.update(df), user_query)
+    
+    def _summarize(self, df: pd.DataFrame) -> Dict:
+        """Data summary for the prompt (cached per dataset, extended as rows are appended)."""
+        data_summary = self.summary_cache.get(df)
+        if self.feature_store is not None and self.feature_store.is_built:
+            # Daily totals, peak day and recent trend are read from the daily feature table
+            data_summary = {**data_summary, **self.feature_store.daily_summary()}
+        return data_summary
+    
+    def refresh(self, df: pd.DataFrame):
+        """Recompute the cached aggregates of a frame whose rows were edited in place.
+        
+        Frames are told apart by identity and their append counter, not by
+        scanning rows, so in-place edits are only seen after this call.
+        """
+        self.summary_cache.refresh(df)
+        self.cube.refresh(df)
+    
+    def _build_prompt(self, data_summary: Dict, user_query: str) -> str:
+        """Build the LLM prompt from the data summary and the user question."""
+        return f"""{self.context}
             
             Data Summary:
             - Total Sales: ${data_summary['total_sales']:,.2f}
@@ -53,58 +102,151 @@ class SalesDataChatbot:
             User Question: {user_query}
             
             Provide a clear, data-driven response focusing on the specific question while incorporating relevant context."""
-
-            response = self.gemini.generate_content(prompt)
-            return response.text
+    
+    def query_data(self, df: pd.DataFrame, user_query: str) -> str:
+        """Process user query about sales data."""
+        try:
+            response = self._answer_locally(df, user_query)
+            if response is not None:
+                return response
+            
+            # Prepare data summary for context
+            data_summary = self._summarize(df)
+            
+            # Repeated questions about the same data are answered from the cache
+            cache_key = self.response_cache.make_key(user_query, data_summary)
+            response = self.response_cache.get(cache_key)
+            if response is None:
+                response = self.backend.generate(self._build_prompt(data_summary, user_query))
+                self.response_cache.set(cache_key, response)
+            return response
+            
+        except Exception as e:
+            return f"I encountered an error analyzing the data: {str(e)}"
+    
+    async def query_data_async(self, df: pd.DataFrame, user_query: str) -> str:
+        """Process a user query without blocking the event loop.
+        
+        Calls run under the chatbot's concurrency limit, timeout and retry
+        policy, and identical questions in flight share one LLM call.
+        """
+        try:
+            # Local answers take milliseconds, so they are not worth a worker thread
+            response = self._answer_locally(df, user_query)
+            if response is not None:
+                return response
+            
+            data_summary = self._summarize(df)
+            
+            cache_key = self.response_cache.make_key(user_query, data_summary)
+            response = self.response_cache.get(cache_key)
+            if response is None:
+                response = await self.executor.run(self._build_prompt(data_summary, user_query))
+                self.response_cache.set(cache_key, response)
+            return response
             
         except Exception as e:
             return f"I encountered an error analyzing the data: {str(e)}"
+    
+    async def query_many(self, df: pd.DataFrame, user_queries: List[str]) -> List[str]:
+        """Answer several questions concurrently, returning answers in question order."""
+        return await asyncio.gather(*(self.query_data_async(df, query) for query in user_queries))
 
 class SalesInsightPipeline:
-    """Combines Gemini's insights with LSTM-XGBoost ensemble forecasting."""
+    """Combines Gemini's insights with LSTM-XGBoost ensemble forecasting.
+    
+    By default the models see only lagged daily totals. Passing
+    `feature_columns` (for example FeatureStore.MULTIVARIATE_FEATURES)
+    switches to multivariate mode: windows carry those daily feature table
+    columns, and XGBoost also receives the calendar features of the day it
+    predicts.
+    
+    With forecast_strategy='direct' both models are trained to output all
+    `forecast_horizon` days at once, so forecasting is a single batched call
+    per model instead of a step-by-step loop.
+    
+    Forecast intervals cover `coverage` of outcomes. 'conformal' intervals are
+    calibrated on backtest residuals after training, reaching back into the
+    training period when too few held-out cutoffs leave a full horizon;
+    'mc_dropout' samples `mc_samples` LSTM paths and 'quantile' fits an
+    XGBoost quantile model. Every band contains its point forecast.
     
-    def __init__(self, gemini_api_key: str, forecast_horizon: int = 30):
+    `freq` sets the granularity: 'H' forecasts hourly totals (for intraday
+    staffing), 'D' daily and 'W' weekly ones. Lookback and horizon count
+    periods of that length, and the feature table, forecast dates and LSTM
+    batch size follow it.
+    
+    With a `training_cache`, train returns the models, metrics and conformal
+    intervals of an earlier run on the same windows and settings instead of
+    training fresh models again.
+    """
+    
+    # Both models share one window per series, advanced with the ensemble average
+    FORECAST_FEEDBACK = 'ensemble'
+    
+    def __init__(self, gemini_api_key: str, forecast_horizon: int = 30, verbose: bool = True,
+                 instrumentation: Optional[Instrumentation] = None,
+                 feature_columns: Optional[Sequence[str]] = None, forecast_strategy: str = 'recursive',
+                 lookback: int = 2, lstm_params: Optional[Dict] = None, xgb_params: Optional[Dict] = None,
+                 interval_method: str = 'conformal', coverage: float = 0.9, mc_samples: int = 100,
+                 freq: str = 'D', training_cache: Optional[TrainingCache] = None):
+        check_forecast_strategy(forecast_strategy)
+        check_interval_method(interval_method)
+        check_freq(freq)
+        import google.generativeai as genai
+        from sklearn.preprocessing import MinMaxScaler
+        
         # Initialize Gemini
         genai.configure(api_key=gemini_api_key)
         self.gemini = genai.GenerativeModel('gemini-pro')
-        self.chatbot = SalesDataChatbot(self.gemini)
+        
+        # Daily (or hourly/weekly) features are computed once and shared by training and the chatbot
+        self.freq = freq
+        self.feature_store = DailyFeatureStore(holiday_fn=self._identify_holidays, freq=freq)
+        self.chatbot = SalesDataChatbot(self.gemini, feature_store=self.feature_store)
         
         # Initialize ML components
         self.forecast_horizon = forecast_horizon
+        self.forecast_strategy = forecast_strategy
         self.scaler = MinMaxScaler()
-        self.lookback = 2
+        self.lookback = lookback
+        self.lstm_params = {**DEFAULT_LSTM_PARAMS, 'batch_size': FREQ_BATCH_SIZES[freq], **(lstm_params or {})}
+        self.xgb_params = {**DEFAULT_XGB_PARAMS, **(xgb_params or {})}
         self.models = {}
         self.metrics = {'lstm': {}, 'xgb': {}}
+        self.fit_stats = {}
+        self.training_cache = training_cache
+        
+        # Forecast intervals, fitted after training
+        self.interval_method = interval_method
+        self.coverage = coverage
+        self.mc_samples = mc_samples
+        self.intervals = None
+        
+        # Multivariate mode: 'total' first, then features that can be rolled forward while forecasting
+        self.feature_columns = list(feature_columns) if feature_columns else None
+        if self.feature_columns:
+            check_forecastable(self.feature_columns)
+        self.n_features = len(self.feature_columns) if self.feature_columns else 1
+        self.feature_scaler = None
+        
+        # Stage timings go to the instrumentation sinks; verbose=False silences progress output
+        self.instrumentation = instrumentation or Instrumentation(verbose=verbose)
+    
+    def _log(self, *args):
+        """Progress output, silenced when the pipeline is not verbose."""
+        self.instrumentation.log(*args)
         
+    @instrumented()
     def process_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Process and enhance the raw sales data."""
-        processed_df = df.copy()
-        
-        # Ensure datetime column exists
-        if 'datetime' not in processed_df.columns:
-            processed_df['datetime'] = pd.to_datetime(processed_df['timestamp'])
-        
-        # Extract date components
-        processed_df['date'] = processed_df['datetime'].dt.date
-        processed_df['day'] = processed_df['datetime'].dt.day
-        processed_df['month'] = processed_df['datetime'].dt.month
-        processed_df['year'] = processed_df['datetime'].dt.year
-        processed_df['day_of_week'] = processed_df['datetime'].dt.dayofweek
-        processed_df['hour'] = processed_df['datetime'].dt.hour
-        
-        # Create derived features
-        processed_df['is_weekend'] = processed_df['day_of_week'].isin([5, 6]).astype(int)
-        processed_df['is_holiday'] = self._identify_holidays(processed_df['date'])
-        
-        # Calculate rolling statistics
-        daily_sales = processed_df.groupby('date')['total'].agg(['sum', 'count', 'mean']).reset_index()
-        daily_sales['rolling_avg_7d'] = daily_sales['sum'].rolling(window=7, min_periods=1).mean()
-        daily_sales['rolling_std_7d'] = daily_sales['sum'].rolling(window=7, min_periods=1).std()
-        
-        # Merge daily stats back to main dataframe
-        processed_df = processed_df.merge(daily_sales, on='date', how='left')
-        
-        return processed_df
+        """Build the daily feature table from raw sales transactions.
+        
+        Returns one row per day, indexed by date, with the daily total,
+        transaction count and mean, 7-day rolling stats, lags and calendar
+        features; the transactions themselves are not copied or extended.
+        """
+        self.daily_features = self.feature_store.build(df)
+        return self.daily_features
     
     def _identify_holidays(self, dates) -> pd.Series:
         """Simple holiday identification - can be enhanced with holiday API."""
@@ -112,107 +254,244 @@ class SalesInsightPipeline:
         # Returns a series of 0s with the same index as dates
         return pd.Series(0, index=range(len(dates)))
     
+    @instrumented()
     def prepare_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
-        """Prepare data for time series forecasting."""
-        # Group by date and sum total sales
-        daily_sales = df.groupby('date')['total'].sum().reset_index()
-        daily_sales = daily_sales.sort_values('date')
+        """Prepare data for time series forecasting.
+        
+        Accepts the daily feature table from process_data, or transactions,
+        which are turned into the feature table first.
+        """
+        features = df if is_feature_table(df) else self.process_data(df)
+        daily_sales = features[['total']].reset_index()
+        self.daily_sales = daily_sales
         
         # Scale the data
         sales_scaled = self.scaler.fit_transform(daily_sales[['total']])
-        print("Shape of daily_sales:", daily_sales.shape)  # Print shape of daily_sales DataFrame
-        print("Shape of sales_scaled:", sales_scaled.shape)  # Print shape of scaled data
+        if self.feature_columns:
+            # Column 0 is 'total', scaled exactly as by self.scaler
+            from sklearn.preprocessing import MinMaxScaler
+            self.feature_scaler = MinMaxScaler()
+            sales_scaled = self.feature_scaler.fit_transform(feature_matrix(features, self.feature_columns))
+        
+        # Kept for forecasting, so features are not recomputed after training
+        self.scaled_data = sales_scaled
+        self._log("Shape of daily_sales:", daily_sales.shape)  # Print shape of daily_sales DataFrame
+        self._log("Shape of sales_scaled:", sales_scaled.shape)  # Print shape of scaled data
 
         
         return daily_sales, sales_scaled
     
+    @instrumented()
     def create_sequences(self, scaled_data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Create sequences for LSTM training."""
-        X, y = [], []
-        for i in range(len(scaled_data) - self.lookback):
-            X.append(scaled_data[i:(i + self.lookback), 0])
-            y.append(scaled_data[i + self.lookback, 0])
-        
-        return np.array(X), np.array(y)
+        """Create sequences for LSTM training.
+        
+        Windows are read-only strided views over a float32 copy of the scaled
+        series, so no per-window copies are made.
+        """
+        if not self.feature_columns:
+            X, y = make_windows(np.asarray(scaled_data[:, :1], dtype=np.float32), self.lookback,
+                                horizon=self.target_horizon)
+            return flatten_windows(X), y
+        
+        # Multivariate rows: the flattened feature window, then the (first) target day's calendar features
+        scaled_data = np.asarray(scaled_data, dtype=np.float32)
+        X, y = make_windows(scaled_data, self.lookback, horizon=self.target_horizon)
+        calendar_idx = self._calendar_idx()
+        target_calendar = scaled_data[self.lookback:self.lookback + len(X)][:, calendar_idx]
+        return np.hstack([flatten_windows(X), target_calendar]), y
+    
+    @property
+    def target_horizon(self) -> int:
+        """Periods each training target covers: the full horizon in direct mode, otherwise one."""
+        return self.forecast_horizon if self.forecast_strategy == 'direct' else 1
+    
+    def _calendar_idx(self) -> List[int]:
+        """Positions of the calendar features within the feature columns."""
+        return [i for i, column in enumerate(self.feature_columns or []) if column in CALENDAR_FEATURES]
+    
+    def _lstm_inputs(self, X: np.ndarray) -> np.ndarray:
+        """(n, lookback, n_features) LSTM inputs from rows built by create_sequences."""
+        return X[:, :self.lookback * self.n_features].reshape(-1, self.lookback, self.n_features)
         
     def split_data(self, X: np.ndarray, y: np.ndarray) -> Tuple:
+        from sklearn.model_selection import train_test_split
+        
         # First split into train+val and test
         X_temp, X_test, y_temp, y_test = train_test_split(X, y, test_size=0.05, train_size=0.95, shuffle=False) 
 
         # Then split train+val into train and val
         X_train, X_val, y_train, y_val = train_test_split(X_temp, y_temp, test_size=0.05, train_size=0.9, shuffle=False)  
 
-        # Reshape data for LSTM
-        X_train = X_train.reshape(-1, self.lookback, 1)
-        X_val = X_val.reshape(-1, self.lookback, 1)
-        X_test = X_test.reshape(-1, self.lookback, 1)
-
+        # Splits stay tabular for XGBoost; _lstm_inputs reshapes them for the LSTM
         return X_train, X_val, X_test, y_train, y_val, y_test
     
     def build_models(self):
         """Build LSTM and XGBoost models."""
+        import xgboost as xgb
+        from tensorflow import keras
+        from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+        
         # LSTM model
-        input_layer = Input(shape=(self.lookback, 1))  # Define input layer
-        x = LSTM(50, activation='relu', return_sequences=True)(input_layer)  # Connect input
-        x = Dropout(0.2)(x)
-        x = LSTM(50, activation='relu')(x)
-        x = Dropout(0.2)(x)
-        output_layer = Dense(1)(x)
+        units, dropout = self.lstm_params['units'], self.lstm_params['dropout']
+        input_layer = Input(shape=(self.lookback, self.n_features))  # Define input layer
+        x = LSTM(units, activation='relu', return_sequences=True)(input_layer)  # Connect input
+        x = Dropout(dropout)(x)
+        x = LSTM(units, activation='relu')(x)
+        x = Dropout(dropout)(x)
+        output_layer = Dense(self.target_horizon)(x)
 
         self.models['lstm'] = keras.Model(inputs=input_layer, outputs=output_layer)  # Create model
         self.models['lstm'].compile(optimizer='adam', loss='mse')
 
         # XGBoost model
-        self.models['xgb'] = xgb.XGBRegressor(
-            objective='reg:squarederror',
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=3
-        )
+        self.models['xgb'] = xgb.XGBRegressor(objective='reg:squarederror', **self.xgb_params)
     
+    @instrumented()
     def train(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Train both LSTM and XGBoost models."""
         # Split data
-        print("Shape of X:", X.shape)  # Print shape of X before split
-        print("Shape of y:", y.shape)  # Print shape of y before split
+        self._log("Shape of X:", X.shape)  # Print shape of X before split
+        self._log("Shape of y:", y.shape)  # Print shape of y before split
 
         X_train, X_val, X_test, y_train, y_val, y_test = self.split_data(X, y)
         
+        # Models that were already trained keep training, so only fresh fits are cached
+        key = None
+        if self.training_cache is not None and self._models_untrained():
+            key = self._training_key(X, y)
+            cached = self.training_cache.get(key)
+            if cached:
+                self._restore_training(*cached, n_train=len(X_train))
+                self._log("Loaded trained models from the training cache")
+                return X_test, y_test
+        
         # Build models if not already built
+        self.fit_models(X_train, y_train, X_val, y_val, rebuild=not self.models)
+        
+        # Calculate metrics
+        self._calculate_metrics(X_test, y_test)
+        self.fit_intervals(n_train=len(X_train))
+        
+        if key:
+            state = {'metrics': self.metrics, 'fit_stats': self.fit_stats}
+            if isinstance(self.intervals, ConformalIntervals):
+                state['conformal_intervals'] = self.intervals.to_dict()
+            self.training_cache.put(key, self.models, self.scaler, self.lookback, self.forecast_horizon, state)
+        
+        return X_test, y_test
+    
+    def _models_untrained(self) -> bool:
+        """Whether train would fit new models rather than continue fitted or loaded ones."""
         if not self.models:
+            return True
+        return not isinstance(self.models, LazyModels) and not self.models['xgb'].__sklearn_is_fitted__()
+    
+    def _training_key(self, X: np.ndarray, y: np.ndarray) -> str:
+        """Training cache key for these windows under the current scaling and settings."""
+        return training_key(X, y, {
+            'system': type(self).__name__,
+            'scaler': scaler_to_dict(self.scaler),
+            'feature_columns': self.feature_columns,
+            'feature_scaler': scaler_to_dict(self.feature_scaler) if self.feature_columns else None,
+            'lookback': self.lookback,
+            'forecast_horizon': self.forecast_horizon,
+            'forecast_strategy': self.forecast_strategy,
+            'lstm_params': self.lstm_params,
+            'xgb_params': self.xgb_params,
+            'interval_method': self.interval_method,
+            'coverage': self.coverage
+        })
+    
+    def _restore_training(self, models: Dict, state: Dict, n_train: int):
+        """Adopt the models, metrics and intervals of a cached training run."""
+        self.models = models
+        self.metrics = state['metrics']
+        self.fit_stats = state['fit_stats']
+        conformal = state.get('conformal_intervals')
+        if conformal:
+            self.intervals = ConformalIntervals.from_dict(conformal)
+        elif self.interval_method == 'quantile':
+            # Quantile models are not cached; they are refitted on the same training days
+            self.fit_intervals(n_train)
+        else:
+            self.intervals = None
+    
+    def fit_models(self, X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray,
+                   rebuild: bool = True):
+        """Fit both models with the configured hyperparameters (building fresh ones by default).
+        
+        Both models stop early once the validation loss stops improving, and
+        the LSTM keeps the weights of its best epoch. The LSTM trains on
+        shuffled float32 minibatches built lazily from the windows
+        (lstm_dataset), so long hourly series are never copied into one
+        training tensor.
+        """
+        from tensorflow.keras.callbacks import EarlyStopping
+        
+        if rebuild:
             self.build_models()
         
         # Train LSTM
-        self.models['lstm'].fit(
-            X_train, y_train,
-            epochs=50,
-            batch_size=32,
-            validation_data=(X_val, y_val),
+        params = self.lstm_params
+        callbacks = []
+        if params.get('patience') and len(X_val):
+            callbacks.append(EarlyStopping(monitor='val_loss', patience=params['patience'], restore_best_weights=True))
+        batch_size = params['batch_size']
+        history = self.models['lstm'].fit(
+            lstm_dataset(X_train, y_train, batch_size, self.lookback, self.n_features, shuffle=True),
+            epochs=params['epochs'],
+            shuffle=False,
+            validation_data=(lstm_dataset(X_val, y_val, batch_size, self.lookback, self.n_features)
+                             if len(X_val) else None),
+            callbacks=callbacks,
             verbose=0
         )
-        
-        # Prepare data for XGBoost
-        X_train_2d = X_train.reshape(X_train.shape[0], -1)
-        X_test_2d = X_test.reshape(X_test.shape[0], -1)
-        
-        # Train XGBoost
-        self.models['xgb'].fit(X_train_2d, y_train)
-        
-        # Calculate metrics
-        self._calculate_metrics(X_test, y_test)
-        
-        return X_test, y_test
+        self.instrumentation.count_model_call()
+        
+        # Train XGBoost on the tabular rows
+        if len(X_val):
+            self.models['xgb'].fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        else:
+            self.models['xgb'].set_params(early_stopping_rounds=None)
+            self.models['xgb'].fit(X_train, y_train)
+        self.instrumentation.count_model_call()
+        
+        self.fit_stats = {
+            'lstm_epochs': len(history.history['loss']),
+            'xgb_rounds': self.models['xgb'].get_booster().num_boosted_rounds()
+        }
+    
+    @instrumented('intervals')
+    def fit_intervals(self, n_train: int, backtest=None):
+        """Fit the forecast intervals on data the first `n_train` training windows did not cover.
+        
+        Conformal intervals are calibrated on `backtest` (a BacktestResult) if
+        given, otherwise on a backtest from the later days (see
+        calibrate_conformal); quantile intervals are fitted on the training
+        days. A series too short for either raises ValueError.
+        """
+        first_unseen = self.lookback + self.target_horizon - 1 + n_train
+        if self.interval_method == 'conformal':
+            if backtest is None:
+                self.intervals = calibrate_conformal(self, self.scaled_data, first_unseen, self.coverage,
+                                                     log=self._log)
+            else:
+                self.intervals = ConformalIntervals.from_backtest(backtest, coverage=self.coverage)
+        elif self.interval_method == 'quantile':
+            self.intervals = QuantileXGBIntervals(self.coverage, self.forecast_horizon).fit(
+                self.scaled_data[:first_unseen], self.lookback)
     
+    @instrumented('metrics')
     def _calculate_metrics(self, X_test: np.ndarray, y_test: np.ndarray):
         """Calculate performance metrics for both models."""
         from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
         
         # LSTM predictions
-        lstm_preds = self.models['lstm'].predict(X_test, verbose=0)
+        lstm_preds = self.models['lstm'].predict(self._lstm_inputs(X_test), verbose=0)
         
         # XGBoost predictions
-        X_test_2d = X_test.reshape(X_test.shape[0], -1)
-        xgb_preds = self.models['xgb'].predict(X_test_2d)
+        xgb_preds = self.models['xgb'].predict(X_test)
+        self.instrumentation.count_model_call(2)
         
         # Calculate metrics for both models
         for model_name, preds in [('lstm', lstm_preds), ('xgb', xgb_preds)]:
@@ -222,72 +501,281 @@ class SalesInsightPipeline:
                 'r2': r2_score(y_test, preds)
             }
     
-    def generate_forecasts(self, last_sequence: np.ndarray) -> pd.DataFrame:
-        """Generate and format forecasts."""
-        # Generate raw predictions
-        predictions = self.predict(last_sequence)
+    @instrumented()
+    def generate_forecasts(self, last_sequence: Union[np.ndarray, List[np.ndarray]]) -> Union[pd.DataFrame, List[pd.DataFrame]]:
+        """Generate and format forecasts.
         
-        # Create forecast dates
-        last_date = pd.Timestamp.now().date()
-        forecast_dates = pd.date_range(start=last_date, periods=self.forecast_horizon + 1)[1:]
-        
-        # Create forecast DataFrame
-        forecasts_df = pd.DataFrame({
-            'date': forecast_dates,
-            'predicted_sales': predictions,
-            'confidence_lower': predictions * 0.9,  # Simple confidence interval
-            'confidence_upper': predictions * 1.1
-        })
+        A list of input windows yields a list of forecast frames, one per window.
+        """
+        # Generate raw predictions and their intervals
+        predictions, lower, upper = self.predict_intervals(last_sequence)
+        single = predictions.ndim == 1
         
-        return forecasts_df
+        # Create forecast dates
+        forecast_dates = self._forecast_dates()
+        
+        forecast_frames = []
+        for series_predictions, series_lower, series_upper in zip(
+                np.atleast_2d(predictions), np.atleast_2d(lower), np.atleast_2d(upper)):
+            # Create forecast DataFrame
+            forecast_frames.append(pd.DataFrame({
+                'date': forecast_dates,
+                'predicted_sales': series_predictions,
+                'confidence_lower': series_lower,
+                'confidence_upper': series_upper
+            }))
+        
+        return forecast_frames[0] if single else forecast_frames
     
-    def predict(self, last_sequence: np.ndarray) -> np.ndarray:
-        """Generate ensemble forecast."""
-        forecasts = []
-        sequence = last_sequence.copy()
-        
-        for _ in range(self.forecast_horizon):
-            # LSTM prediction
-            lstm_pred = self.models['lstm'].predict(
-                sequence.reshape(1, self.lookback, 1), verbose=0
-            )[0, 0]
-            
-            # XGBoost prediction
-            xgb_pred = self.models['xgb'].predict(sequence.reshape(1, -1))[0]
-            
-            # Ensemble prediction (average)
-            pred = (lstm_pred + xgb_pred) / 2
-            forecasts.append(pred)
-            
-            # Update sequence
-            sequence = np.roll(sequence, -1)
-            sequence[-1] = pred
-        
-        # Inverse transform predictions
-        forecasts = np.array(forecasts).reshape(-1, 1)
-        return self.scaler.inverse_transform(forecasts).flatten()
+    def _forecast_dates(self) -> pd.DatetimeIndex:
+        """Start dates of the forecast periods.
+        
+        Multivariate forecasts start the period after the last observed one,
+        since their calendar features must match the periods being predicted;
+        univariate ones the period after the current one.
+        """
+        if self.feature_columns:
+            last_date = pd.Timestamp(self.daily_sales['date'].max())
+        else:
+            last_date = pd.Timestamp.now()
+        return period_range(last_date, self.forecast_horizon + 1, self.freq)[1:]
     
-    def save_models(self, base_path: str = './models'):
-        """Save models and scalers."""
-        import os
-        import pickle
-        
-        # Create directory if it doesn't exist
-        os.makedirs(base_path, exist_ok=True)
-        
-        # Save LSTM model
-        self.models['lstm'].save(os.path.join(base_path, 'lstm_model'))
-        
-        # Save XGBoost model
-        with open(os.path.join(base_path, 'xgb_model.pkl'), 'wb') as f:
-            pickle.dump(self.models['xgb'], f)
-        
-        # Save scaler
-        with open(os.path.join(base_path, 'scaler.pkl'), 'wb') as f:
-            pickle.dump(self.scaler, f)
+    @property
+    def context_length(self) -> int:
+        """Rows of scaled history a forecast needs: the window, or more for rolling/lag features."""
+        if not self.feature_columns:
+            return self.lookback
+        return max(self.lookback, history_length(self.feature_columns))
+    
+    def last_context(self) -> np.ndarray:
+        """The most recent scaled input for forecasting past the end of the prepared data."""
+        if not self.feature_columns:
+            return self.scaled_data[-self.lookback:, 0]
+        return self.scaled_data[-self.context_length:]
+    
+    def _context_batch(self, context: Union[np.ndarray, List[np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """Split multivariate contexts into windows and total histories.
+        
+        Each context is a (rows, n_features) block of scaled feature rows with
+        at least `lookback` rows; shorter histories than the rolling and lag
+        features need are padded with their first total.
+        """
+        if isinstance(context, (list, tuple)):
+            batch, single = np.stack([np.asarray(c, dtype=np.float64) for c in context]), False
+        else:
+            batch = np.asarray(context, dtype=np.float64)
+            single = batch.ndim == 2
+            batch = batch[np.newaxis] if single else batch
+        if batch.shape[1] < self.lookback or batch.shape[2] != self.n_features:
+            raise ValueError(f"Expected contexts of at least {self.lookback} rows and {self.n_features} features, "
+                             f"got {batch.shape[1:]}")
+        
+        history = batch[:, :, 0]
+        pad = self.context_length - history.shape[1]
+        if pad > 0:
+            history = np.pad(history, ((0, 0), (pad, 0)), mode='edge')
+        return batch[:, -self.lookback:, :], history, single
+    
+    def _get_forecaster(self) -> BatchForecaster:
+        """Return a batch forecaster bound to the currently trained models."""
+        forecaster = getattr(self, '_forecaster', None)
+        if (forecaster is None or forecaster.lstm_model is not self.models['lstm']
+                or forecaster.xgb_model is not self.models['xgb']):
+            forecaster = BatchForecaster(self.models['lstm'], self.models['xgb'],
+                                         self.lookback, self.forecast_horizon, self.instrumentation,
+                                         n_features=self.n_features)
+            self._forecaster = forecaster
+        return forecaster
+    
+    def _forecast_inputs(self, last_sequence: Union[np.ndarray, List[np.ndarray]]) -> Tuple:
+        """Windows, total histories, future-feature builder and single-window flag for a forecast."""
+        if self.feature_columns:
+            windows, history, single = self._context_batch(last_sequence)
+            features = FutureFeatureBuilder(self.feature_columns, self._forecast_dates(),
+                                            self.feature_scaler.min_, self.feature_scaler.scale_,
+                                            self._identify_holidays)
+        else:
+            windows, single = as_sequence_batch(last_sequence, self.lookback)
+            history = features = None
+        return windows, history, features, single
+    
+    def _unscale(self, values: np.ndarray) -> np.ndarray:
+        """Scaled totals of any shape back in sales units."""
+        values = np.asarray(values)
+        return self.scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+    
+    def _scaled_forecast(self, windows: np.ndarray, history: Optional[np.ndarray], features) -> np.ndarray:
+        """Scaled (n_windows, forecast_horizon) ensemble forecasts."""
+        if self.forecast_strategy == 'direct':
+            # One call per model returns the whole horizon
+            exogenous = features.exogenous(0) if features is not None else None
+            return self._get_forecaster().forecast_direct(windows, exogenous)['ensemble']
+        return self._get_forecaster().forecast(windows, feedback=self.FORECAST_FEEDBACK, features=features,
+                                               history=history)['ensemble']
+    
+    def predict(self, last_sequence: Union[np.ndarray, List[np.ndarray]]) -> np.ndarray:
+        """Generate ensemble forecast.
+        
+        Returns a (forecast_horizon,) array for a single window, or a
+        (n_windows, forecast_horizon) array when several windows are passed.
+        In multivariate mode each window is a context block of scaled feature
+        rows, such as the one returned by last_context.
+        """
+        windows, history, features, single = self._forecast_inputs(last_sequence)
+        forecasts = self._unscale(self._scaled_forecast(windows, history, features))
+        return forecasts[0] if single else forecasts
+    
+    def predict_intervals(self, last_sequence: Union[np.ndarray, List[np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ensemble forecasts with the lower and upper bounds of their `coverage` interval.
+        
+        Shapes follow predict. Conformal intervals add two array additions to
+        the point forecast and quantile intervals one XGBoost call; Monte-Carlo
+        dropout forecasts all `mc_samples` paths of all windows as one batch
+        per step.
+        """
+        windows, history, features, single = self._forecast_inputs(last_sequence)
+        forecasts = self._unscale(self._scaled_forecast(windows, history, features))
+        
+        if self.interval_method == 'quantile' and self.intervals is not None:
+            lower, upper = (self._unscale(bound) for bound in self.intervals.interval(windows))
+        elif self.interval_method == 'conformal' and self.intervals is not None:
+            lower, upper = self.intervals.interval(forecasts)
+        else:
+            exogenous = features.exogenous(0) if features is not None else None
+            paths = self._get_forecaster().sample_paths(windows, self.mc_samples, self.forecast_strategy,
+                                                        self.FORECAST_FEEDBACK, features, history, exogenous)
+            lower, upper = path_quantiles(self._unscale(paths['ensemble']), self.coverage)
+        # Sampled and quantile bounds come from different models than the point forecast
+        lower, upper = np.minimum(lower, forecasts), np.maximum(upper, forecasts)
+        
+        if single:
+            return forecasts[0], lower[0], upper[0]
+        return forecasts, lower, upper
+    
+    def fit_forecast(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Prepare, train and forecast a processed transaction frame in one call."""
+        daily_sales, sales_scaled = self.prepare_data(df)
+        X, y = self.create_sequences(sales_scaled)
+        self.build_models()
+        self.train(X, y)
+        
+        # Forecast from the most recent window of observed days
+        return self.generate_forecasts(self.last_context())
+    
+    def save_models(self, base_path: str = './models') -> str:
+        """Save models, scaler, metrics and daily history as a new artifact version."""
+        store = ModelArtifactStore(base_path)
+        return store.save(
+            self.models, self.scaler,
+            lookback=self.lookback,
+            forecast_horizon=self.forecast_horizon,
+            metrics=self.metrics,
+            daily_sales=getattr(self, 'daily_sales', None),
+            value_col='total',
+            extra=self._manifest_extra()
+        )
+    
+    def _manifest_extra(self) -> Dict:
+        """Forecasting and multivariate settings to store alongside the models."""
+        extra = {
+            'forecast_strategy': self.forecast_strategy,
+            'freq': self.freq,
+            'lstm_params': self.lstm_params,
+            'xgb_params': self.xgb_params,
+            'interval_method': self.interval_method,
+            'coverage': self.coverage
+        }
+        if isinstance(self.intervals, ConformalIntervals):
+            extra['conformal_intervals'] = self.intervals.to_dict()
+        if self.feature_columns:
+            extra['feature_columns'] = self.feature_columns
+            extra['feature_scaler'] = scaler_to_dict(self.feature_scaler)
+        return extra
+    
+    def load_models(self, base_path: str = './models', version: Optional[str] = None):
+        """Load a saved artifact version (latest by default).
+        
+        Only the manifest, scaler and history are read here; each model is
+        loaded from disk the first time a forecast needs it.
+        """
+        artifacts = ModelArtifactStore(base_path).load(version)
+        manifest = artifacts['manifest']
+        
+        self.lookback = manifest['lookback']
+        self.forecast_horizon = manifest['forecast_horizon']
+        self.metrics = manifest['metrics']
+        self.forecast_strategy = manifest.get('forecast_strategy', 'recursive')
+        self.freq = manifest.get('freq', 'D')
+        self.feature_store.freq = self.freq
+        self.lstm_params = {**DEFAULT_LSTM_PARAMS, 'batch_size': FREQ_BATCH_SIZES[self.freq],
+                            **manifest.get('lstm_params', {})}
+        self.xgb_params = {**DEFAULT_XGB_PARAMS, **manifest.get('xgb_params', {})}
+        self.interval_method = manifest.get('interval_method', 'conformal')
+        self.coverage = manifest.get('coverage', 0.9)
+        # Quantile models are not saved, so those pipelines fall back to Monte-Carlo dropout
+        conformal = manifest.get('conformal_intervals')
+        self.intervals = ConformalIntervals.from_dict(conformal) if conformal else None
+        self.scaler = artifacts['scaler']
+        self.models = artifacts['models']
+        if artifacts['daily_sales'] is not None:
+            self.daily_sales = artifacts['daily_sales']
+        
+        self.feature_columns = manifest.get('feature_columns')
+        self.n_features = len(self.feature_columns) if self.feature_columns else 1
+        self.feature_scaler = scaler_from_dict(manifest['feature_scaler']) if self.feature_columns else None
+        
+        # The saved history is enough to rebuild the scaled context the next forecast starts from
+        if artifacts['daily_sales'] is not None:
+            self.scaled_data = self._scale_history(self.daily_sales)
+    
+    def _scale_history(self, daily_sales: pd.DataFrame) -> np.ndarray:
+        """Scaled model inputs for saved daily totals, without refitting the scalers."""
+        if not self.feature_columns:
+            return self.scaler.transform(daily_sales[['total']])
+        features = self.feature_store.build_from_daily(daily_sales)
+        return self.feature_scaler.transform(feature_matrix(features, self.feature_columns))
+    
+    @instrumented()
+    def update(self, df: pd.DataFrame, base_path: str = './models', lstm_epochs: int = 5,
+               xgb_rounds: int = 10, replay: int = 30) -> int:
+        """Incrementally update the persisted models with days that arrived since they were saved.
+        
+        Loads the saved models if none are in memory, trains only on windows
+        ending in new days (plus a replay of the last `replay` historical
+        windows), keeps the fitted scaler, and saves the result back.
+        Returns the number of new days added.
+        """
+        if not self.models:
+            self.load_models(base_path)
+        if self.feature_columns:
+            raise ValueError("Incremental updates are only supported for univariate models")
+        
+        self.daily_sales['date'] = pd.to_datetime(self.daily_sales['date'])
+        # Hours without sales are zeros in the hourly history, so they are filled in here too
+        new_days = new_daily_sales(self.daily_sales, df, 'total', fill_gaps=self.freq == 'H', freq=self.freq)
+        if new_days.empty:
+            self._log("No new days to update the models with")
+            return 0
+        
+        # Scale only the history tail the new windows need
+        history_tail = self.daily_sales[['total']].tail(self.lookback + replay + self.target_horizon - 1)
+        history_scaled = self.scaler.transform(history_tail)
+        new_scaled = self.scaler.transform(new_days[['total']])
+        
+        X, y = update_windows(history_scaled, new_scaled, self.lookback, replay, horizon=self.target_horizon)
+        warm_start_models(self.models, X, y, lstm_epochs=lstm_epochs, xgb_rounds=xgb_rounds,
+                          batch_size=self.lstm_params['batch_size'])
+        
+        self.daily_sales = pd.concat([self.daily_sales, new_days], ignore_index=True)
+        self.scaled_data = self._scale_history(self.daily_sales)
+        self.save_models(base_path)
+        return len(new_days)
 
 def create_interactive_chat(pipeline, df):
     """Create an interactive chat interface using IPython widgets."""
+    import ipywidgets as widgets
+    from IPython.display import display, clear_output
+    
     output = widgets.Output()
     
     text_input = widgets.Text(
@@ -323,15 +811,21 @@ def create_interactive_chat(pipeline, df):
     )
     chatbot = SalesDataChatbot(pipeline.gemini)
     
-    def on_button_click(b):
+    async def answer_query(query):
+        response = await pipeline.chatbot.query_data_async(df, query)
         with output:
-            clear_output()
-            query = text_input.value if text_input.value else None
-            if query:
-                print(f"Question: {query}")
-                response = pipeline.chatbot.query_data(df, query)
-                print(f"\nResponse: {response}")
-                text_input.value = ''
+            print(f"\nQuestion: {query}")
+            print(f"Response: {response}")
+    
+    def on_button_click(b):
+        query = text_input.value if text_input.value else None
+        if query:
+            with output:
+                clear_output()
+                print(f"Question: {query} (waiting for the answer...)")
+            text_input.value = ''
+            # Answer on the notebook's event loop so a slow LLM call never blocks the widgets
+            asyncio.ensure_future(answer_query(query))
     
     def on_dropdown_change(change):
         if change['new'] != sample_questions[0]:
@@ -356,10 +850,8 @@ def main():
             gemini_api_key="YOUR_GEMINI_API_KEY"  # Replace with actual API key
         )
         
-        # Load and process data
-        df = pd.read_csv('/content/groc_sales.csv')
-        # Convert 'timestamp' to datetime format (assuming 'timestamp' is in YYYY-MM-DD HH:MM format)
-        df['datetime'] = pd.to_datetime(df['timestamp'], format='%d-%m-%Y %H:%M')
+        # Load and process data with compact dtypes; 'timestamp' is parsed into 'datetime'
+        df = read_transactions('/content/groc_sales.csv')
 
         # Extract components from datetime
         df['date'] = df['datetime'].dt.date
@@ -371,13 +863,11 @@ def main():
         df['minutes'] = df['datetime'].dt.minute
         df['seconds'] = df['datetime'].dt.second
 
-        # Drop the original timestamp column (optional)
-        df.drop('timestamp', axis=1, inplace=True)  # Uncomment to drop original column
-
         
         # Initialize pipeline
         api_key = "YOUR_GEMINI_API_KEY"  # Replace with your actual API key
-        pipeline = SalesInsightPipeline(gemini_api_key=api_key)
+        # Re-runs on unchanged data reuse the models trained last time
+        pipeline = SalesInsightPipeline(gemini_api_key=api_key, training_cache=TrainingCache('training_cache'))
         
         print("🤖 Welcome to the Sales Analysis Chatbot!")
         print("----------------------------------------")
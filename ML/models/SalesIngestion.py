@@ -0,0 +1,256 @@
+import uuid
+import pandas as pd
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+# Timestamps in the transaction log are normally written as day-month-year; other
+# layouts still parse, through pandas' format inference (see parse_timestamps)
+TIMESTAMP_FORMAT = '%d-%m-%Y %H:%M'
+
+GROUP_COLUMNS = ['category', 'customer_type', 'payment_type']
+
+# Compact dtypes for the transaction log columns
+TRANSACTION_DTYPES = {
+    'sr_no': 'int32',
+    'transaction_id': 'string',
+    'product_id': 'string',
+    'category': 'category',
+    'customer_type': 'category',
+    'unit_price': 'float32',
+    'quantity': 'int32',
+    'total': 'float32',
+    'payment_type': 'category'
+}
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# Frames built by read_transactions and append_transactions carry a dataset id and an
+# append counter in df.attrs, so caches can recognise appended rows without scanning them
+DATASET_ATTR = 'dataset_id'
+APPENDS_ATTR = 'appends'
+
+# Forecasting granularities: hourly, daily and weekly (weeks start on Monday).
+# Every period is labelled by the timestamp it starts at.
+FREQUENCIES = ('H', 'D', 'W')
+PANDAS_FREQUENCIES = {'H': 'h', 'D': 'D', 'W': 'W-MON'}
+PERIOD_NAMES = {'H': ('hour', 'hours', 'hourly'), 'D': ('day', 'days', 'daily'), 'W': ('week', 'weeks', 'weekly')}
+
+# Resolution at which an hour or week at the edge of the data counts as fully covered
+EDGE_RESOLUTIONS = {'H': 'min', 'W': 'D'}
+
+
+def parse_timestamps(values) -> pd.Series:
+    """Parse transaction timestamps, trying the fast TIMESTAMP_FORMAT path before format inference."""
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values)
+
+
+def check_freq(freq: str):
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {freq}. Expected one of {FREQUENCIES}")
+
+
+def period_start(timestamps, freq: str = 'D') -> pd.Series:
+    """The start of the hour, day or week each timestamp falls in (a Series keeps its index)."""
+    check_freq(freq)
+    timestamps = pd.to_datetime(timestamps)
+    if not isinstance(timestamps, pd.Series):
+        timestamps = pd.Series(timestamps)
+    if freq == 'H':
+        return timestamps.dt.floor('h')
+    days = timestamps.dt.normalize()
+    if freq == 'W':
+        return days - pd.to_timedelta(days.dt.dayofweek, unit='D')
+    return days
+
+
+def period_delta(freq: str = 'D') -> pd.Timedelta:
+    """Length of one period."""
+    check_freq(freq)
+    return {'H': pd.Timedelta(hours=1), 'D': pd.Timedelta(days=1), 'W': pd.Timedelta(weeks=1)}[freq]
+
+
+def period_range(start, periods: int, freq: str = 'D') -> pd.DatetimeIndex:
+    """`periods` consecutive period starts, beginning with the period containing `start`."""
+    first = period_start([start], freq).iloc[0]
+    return pd.date_range(start=first, periods=periods, freq=PANDAS_FREQUENCIES[freq])
+
+
+def fill_missing_periods(frame: Union[pd.DataFrame, pd.Series], freq: str = 'D') -> Union[pd.DataFrame, pd.Series]:
+    """Reindex a frame indexed by period start to every period between its first and last.
+
+    Hours without transactions (the store is closed overnight) really had no
+    sales and are filled with zeros; missing days and weeks are gaps in the
+    data and are linearly interpolated.
+    """
+    full_range = pd.date_range(start=frame.index.min(), end=frame.index.max(), freq=PANDAS_FREQUENCIES[freq])
+    frame = frame.reindex(full_range)
+    frame = frame.fillna(0) if freq == 'H' else frame.interpolate(method='linear')
+    frame.index.name = 'date'
+    return frame
+
+
+def partial_edge_periods(first_seen, last_seen, freq: str = 'D') -> List[pd.Timestamp]:
+    """Starts of the first and last period when the data covers only part of them.
+
+    Data that begins on a Wednesday or ends at 14:20 would otherwise total
+    a partial week or hour as if it were a full one. An hour is complete when
+    the data spans its first to last minute, a week its Monday to Sunday;
+    days are always kept.
+    """
+    check_freq(freq)
+    if freq not in EDGE_RESOLUTIONS:
+        return []
+    resolution = EDGE_RESOLUTIONS[freq]
+    first_seen, last_seen = pd.Timestamp(first_seen), pd.Timestamp(last_seen)
+    first_period, last_period = period_start([first_seen, last_seen], freq)
+    partial = []
+    if first_seen.floor(resolution) > first_period:
+        partial.append(first_period)
+    if last_seen.floor(resolution) < last_period + period_delta(freq) - pd.Timedelta(1, resolution):
+        partial.append(last_period)
+    return sorted(set(partial))
+
+
+def complete_period_totals(values: pd.Series, timestamps, freq: str = 'D') -> pd.Series:
+    """Sum `values` per period (indexed by period start), leaving out partial edge periods.
+
+    Timestamps that are all period starts already are totals per period
+    and are taken as complete.
+    """
+    timestamps = pd.to_datetime(timestamps)
+    periods = period_start(timestamps, freq)
+    totals = values.groupby(periods.values).sum().astype('float64')
+    if len(timestamps) and not (periods.values == timestamps.values).all():
+        totals = totals.drop(partial_edge_periods(timestamps.min(), timestamps.max(), freq))
+    return totals
+
+
+def read_transaction_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                            usecols: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """Stream the transaction CSV in chunks with compact dtypes and a parsed `datetime` column."""
+    columns = list(usecols) if usecols is not None else None
+    if columns is not None and 'timestamp' not in columns:
+        columns.append('timestamp')
+    dtypes = {col: dtype for col, dtype in TRANSACTION_DTYPES.items() if columns is None or col in columns}
+
+    for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        chunk['datetime'] = parse_timestamps(chunk.pop('timestamp'))
+        yield chunk
+
+
+def read_transactions(path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                      usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read the full transaction log with compact dtypes."""
+    chunks = list(read_transaction_chunks(path, chunksize=chunksize, usecols=usecols))
+    df = pd.concat(chunks, ignore_index=True)
+    # Chunks may see different category sets; restore compact categoricals after concatenation
+    for col in GROUP_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    df.attrs.update({DATASET_ATTR: uuid.uuid4().hex, APPENDS_ATTR: 0})
+    return df
+
+
+def append_transactions(df: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """Return `df` with `new_rows` appended, as the next version of the same dataset.
+
+    The result keeps the dataset id of `df` and bumps its append counter, which
+    tells the chatbot's caches that only the new rows need aggregating.
+    """
+    combined = pd.concat([df, new_rows], ignore_index=True)
+    for col in GROUP_COLUMNS:
+        if col in combined.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype('category')
+    combined.attrs = {DATASET_ATTR: df.attrs.get(DATASET_ATTR) or uuid.uuid4().hex,
+                      APPENDS_ATTR: df.attrs.get(APPENDS_ATTR, 0) + 1}
+    return combined
+
+
+def frame_version(df: pd.DataFrame) -> Tuple[Optional[str], int, int]:
+    """Cheap version token of a transaction frame: (dataset id, append count, rows).
+
+    Frames that did not come from the ingestion helpers have no dataset id.
+    """
+    return df.attrs.get(DATASET_ATTR), df.attrs.get(APPENDS_ATTR, 0), len(df)
+
+
+class DailySalesAggregator:
+    """Folds transaction chunks into running daily (optionally per-group) sales totals.
+
+    Only the aggregate table is kept between chunks, so memory is bounded by
+    the number of days times the number of groups, not by the file size.
+    With freq='H' or 'W' the totals are hourly or weekly instead; the `date`
+    column then holds the start of each hour or week, and a first or last
+    hour or week the transactions only partly cover is left out.
+    """
+
+    def __init__(self, group_key: Optional[Union[str, Sequence[str]]] = None, freq: str = 'D'):
+        check_freq(freq)
+        self.freq = freq
+        if group_key is None:
+            self.group_keys = []
+        elif isinstance(group_key, str):
+            self.group_keys = [group_key]
+        else:
+            self.group_keys = list(group_key)
+        self._totals = None
+        self.rows_seen = 0
+        self.first_seen = self.last_seen = None
+
+    def add_chunk(self, chunk: pd.DataFrame):
+        """Fold one chunk of transactions into the running aggregates."""
+        keys = ['date'] + self.group_keys
+        chunk_dates = period_start(chunk['datetime'], self.freq).rename('date')
+        partial = chunk.groupby([chunk_dates] + [chunk[key] for key in self.group_keys], observed=True)['total']
+        partial = partial.agg(['sum', 'count']).reset_index()
+        # Accumulate in double precision even though the inputs are float32
+        partial['sum'] = partial['sum'].astype('float64')
+        self.rows_seen += len(chunk)
+        first_seen, last_seen = chunk['datetime'].min(), chunk['datetime'].max()
+        self.first_seen = first_seen if self.first_seen is None else min(self.first_seen, first_seen)
+        self.last_seen = last_seen if self.last_seen is None else max(self.last_seen, last_seen)
+
+        if self._totals is not None:
+            partial = pd.concat([self._totals, partial], ignore_index=True)
+        # Categories can differ between chunks, so combine on plain values
+        for key in self.group_keys:
+            partial[key] = partial[key].astype(object)
+        self._totals = partial.groupby(keys, sort=False).sum().reset_index()
+
+    def result(self) -> pd.DataFrame:
+        """Return the aggregated daily sales with `date`, group columns, `total` and `transactions`.
+
+        Ungrouped hourly totals include the hours without any transaction, as zeros.
+        """
+        if self._totals is None:
+            raise ValueError("No transaction data has been aggregated")
+
+        daily = self._totals.rename(columns={'sum': 'total', 'count': 'transactions'})
+        # Judged on every transaction seen so far, so an edge period is kept once it fills up
+        daily = daily[~daily['date'].isin(partial_edge_periods(self.first_seen, self.last_seen, self.freq))]
+        if self.freq == 'H' and not self.group_keys:
+            daily = fill_missing_periods(daily.set_index('date').sort_index(), self.freq).reset_index()
+        daily = daily.sort_values(['date'] + self.group_keys).reset_index(drop=True)
+        for key in self.group_keys:
+            daily[key] = daily[key].astype('category')
+        daily['transactions'] = daily['transactions'].astype('int64')
+        return daily
+
+
+def aggregate_daily_sales(path: str, group_key: Optional[Union[str, Sequence[str]]] = None,
+                          chunksize: int = DEFAULT_CHUNKSIZE, freq: str = 'D',
+                          verbose: bool = True) -> pd.DataFrame:
+    """Stream the transaction CSV and return daily (or hourly/weekly) sales totals with bounded memory.
+
+    verbose=False silences the progress line, as it does for the pipelines.
+    """
+    aggregator = DailySalesAggregator(group_key, freq)
+    usecols: List[str] = ['total'] + aggregator.group_keys
+    for chunk in read_transaction_chunks(path, chunksize=chunksize, usecols=usecols):
+        aggregator.add_chunk(chunk)
+
+    if verbose:
+        print(f"Aggregated {aggregator.rows_seen} transactions into {PERIOD_NAMES[freq][2]} totals")
+    return aggregator.result()
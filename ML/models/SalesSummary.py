@@ -0,0 +1,149 @@
+import copy
+import weakref
+import threading
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Optional
+from SalesIngestion import frame_version
+
+
+class SummaryState:
+    """Mergeable aggregates behind the chatbot's data summary."""
+
+    def __init__(self, df: pd.DataFrame):
+        totals = df['total']
+        self.n_rows = len(df)
+        self.total_sum = float(totals.sum())
+        self.date_min = df['date'].min()
+        self.date_max = df['date'].max()
+        peak_idx = totals.idxmax()
+        self.peak_sales = totals.loc[peak_idx]
+        self.peak_sales_date = df.loc[peak_idx, 'date']
+        self.recent = totals.tail(7).tolist()
+        self.category_sums = df.groupby('category', observed=True)['total'].sum()
+        self.customer_counts = df['customer_type'].value_counts()
+        self.payment_counts = df['payment_type'].value_counts()
+
+    @staticmethod
+    def _add_counts(left: pd.Series, right: pd.Series) -> pd.Series:
+        combined = left.add(right, fill_value=0)
+        return combined.sort_values(ascending=False, kind='stable')
+
+    def extend(self, appended: 'SummaryState'):
+        """Fold the state of rows appended after this state's rows into it."""
+        self.n_rows += appended.n_rows
+        self.total_sum += appended.total_sum
+        self.date_min = min(self.date_min, appended.date_min)
+        self.date_max = max(self.date_max, appended.date_max)
+        # idxmax keeps the first occurrence, so later rows only win on a strictly larger value
+        if appended.peak_sales > self.peak_sales:
+            self.peak_sales = appended.peak_sales
+            self.peak_sales_date = appended.peak_sales_date
+        self.recent = (self.recent + appended.recent)[-7:]
+        self.category_sums = self.category_sums.add(appended.category_sums, fill_value=0)
+        self.customer_counts = self._add_counts(self.customer_counts, appended.customer_counts).astype('int64')
+        self.payment_counts = self._add_counts(self.payment_counts, appended.payment_counts).astype('int64')
+
+    def summary(self) -> Dict:
+        """The data summary dictionary used to build the chatbot prompt."""
+        return {
+            'total_sales': self.total_sum,
+            'avg_daily_sales': self.total_sum / self.n_rows,
+            'date_range': f"{self.date_min} to {self.date_max}",
+            'peak_sales': self.peak_sales,
+            'peak_sales_date': self.peak_sales_date,
+            'recent_trend': self.recent,
+            'top_categories': self.category_sums.nlargest(3).to_dict(),
+            'customer_types': self.customer_counts.to_dict(),
+            'payment_methods': self.payment_counts.to_dict()
+        }
+
+
+class SummaryCache:
+    """LRU cache of data summaries, keyed on the frame object and its row count.
+
+    A lookup is a dictionary access, never a scan of the rows. A frame that
+    append_transactions built from a cached one only has its new rows
+    aggregated and folded into a copy of the cached aggregates; any other new
+    frame is summarised from scratch, which costs less than hashing its rows.
+    Rows edited in place are not noticed, so call refresh() after editing a
+    frame. Concurrent requests for the same frame share one computation, and
+    no computation runs under the cache lock.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        # (id, rows) -> (weak reference to the frame, frame_version, Future of its SummaryState)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+
+    def get(self, df: pd.DataFrame) -> Dict:
+        """Return the data summary for `df`, reusing or extending cached aggregates."""
+        key = (id(df), len(df))
+        with self._lock:
+            entry = self._entries.get(key)
+            # An id can be reused once its frame is collected, so the entry must still point at df
+            hit = entry is not None and entry[0]() is df
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                future = entry[2]
+            else:
+                base = self._appended_from(df)
+                future = Future()
+                self._entries[key] = (weakref.ref(df), frame_version(df), future)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        if hit:
+            # Waits outside the lock while another thread computes the same summary
+            return future.result().summary()
+
+        try:
+            if base is not None:
+                state = copy.copy(base)
+                state.extend(SummaryState(df.iloc[base.n_rows:]))
+            else:
+                state = SummaryState(df)
+        except Exception as error:
+            with self._lock:
+                if self._entries.get(key, (None, None, None))[2] is future:
+                    del self._entries[key]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            if base is not None:
+                self.extensions += 1
+            else:
+                self.misses += 1
+        future.set_result(state)
+        return state.summary()
+
+    def _appended_from(self, df: pd.DataFrame) -> Optional[SummaryState]:
+        """The largest finished state of an earlier version of df's dataset, or None."""
+        dataset, appends, n_rows = frame_version(df)
+        if dataset is None:
+            return None
+        base = None
+        for _, version, future in self._entries.values():
+            if version[0] != dataset or version[1] >= appends or version[2] >= n_rows:
+                continue
+            if future.done() and future.exception() is None and \
+                    (base is None or future.result().n_rows > base.n_rows):
+                base = future.result()
+        return base
+
+    def refresh(self, df: pd.DataFrame) -> Dict:
+        """Recompute the summary of a frame whose rows were edited in place."""
+        with self._lock:
+            self._entries.pop((id(df), len(df)), None)
+        return self.get(df)
+
+    def clear(self):
+        """Drop every cached summary."""
+        with self._lock:
+            self._entries.clear()
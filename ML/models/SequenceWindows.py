@@ -0,0 +1,87 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from typing import Iterator, Optional, Tuple, Union
+
+# TensorFlow is imported inside lstm_dataset, so windowing stays usable without it
+
+
+def make_windows(data: np.ndarray, lookback: int, horizon: int = 1, stride: int = 1,
+                 target_col: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Build sliding input windows and targets as read-only strided views.
+
+    `data` is a (time,) or (time, features) array. Returns X with shape
+    (n_windows, lookback, features) and y with shape (n_windows,) for
+    horizon == 1 or (n_windows, horizon) otherwise, where window i starts at
+    row i * stride and its targets are the `horizon` rows that follow it.
+    No data is copied unless the input itself is not C-contiguous.
+    """
+    if lookback < 1 or horizon < 1 or stride < 1:
+        raise ValueError("lookback, horizon and stride must all be positive")
+
+    data = np.ascontiguousarray(data)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    n_steps, n_features = data.shape
+    n_windows = max(0, (n_steps - lookback - horizon) // stride + 1)
+
+    row_stride, col_stride = data.strides
+    X = as_strided(data, shape=(n_windows, lookback, n_features),
+                   strides=(stride * row_stride, row_stride, col_stride), writeable=False)
+
+    targets = data[lookback:, target_col] if n_windows else data[:0, target_col]
+    y = as_strided(targets, shape=(n_windows, horizon),
+                   strides=(stride * row_stride, row_stride), writeable=False)
+
+    return X, (y[:, 0] if horizon == 1 else y)
+
+
+def flatten_windows(X: np.ndarray) -> np.ndarray:
+    """View (n_windows, lookback, features) windows as a (n_windows, lookback * features) table.
+
+    For windows produced by make_windows the lookback and feature axes are
+    laid out back to back in memory, so this is a view rather than a copy.
+    """
+    n_windows, lookback, n_features = X.shape
+    if X.strides[1] == n_features * X.strides[2]:
+        return as_strided(X, shape=(n_windows, lookback * n_features),
+                          strides=(X.strides[0], X.strides[2]), writeable=False)
+    return X.reshape(n_windows, lookback * n_features)
+
+
+def window_batches(X: np.ndarray, y: np.ndarray, batch_size: int, shuffle: bool = False,
+                   seed: Optional[Union[int, np.random.Generator]] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield float32 (X, y) minibatches, materialising one batch of windows at a time.
+
+    For strided windows from make_windows only the current batch is ever
+    copied, so memory stays at the series plus one batch however many
+    windows there are.
+    """
+    order = np.random.default_rng(seed).permutation(len(X)) if shuffle else None
+    for start in range(0, len(X), batch_size):
+        rows = slice(start, start + batch_size) if order is None else order[start:start + batch_size]
+        yield np.asarray(X[rows], dtype=np.float32), np.asarray(y[rows], dtype=np.float32)
+
+
+def lstm_dataset(X: np.ndarray, y: np.ndarray, batch_size: int, lookback: int, n_features: int = 1,
+                 shuffle: bool = False, seed: Optional[int] = None):
+    """A tf.data pipeline of (batch, lookback, n_features) LSTM minibatches from flattened windows.
+
+    Rows may carry extra columns after the window (such as target-day
+    calendar features), which are dropped. Batches are built lazily by
+    window_batches and reshuffled every epoch when `shuffle` is set, so
+    Keras never converts the whole window table to one tensor.
+    """
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed)
+    width = lookback * n_features
+
+    def batches():
+        for X_batch, y_batch in window_batches(X, y, batch_size, shuffle, rng):
+            yield X_batch[:, :width].reshape(-1, lookback, n_features), y_batch
+
+    dataset = tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec(shape=(None, lookback, n_features), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,) + tuple(y.shape[1:]), dtype=tf.float32)))
+    n_batches = -(-len(X) // batch_size)
+    return dataset.apply(tf.data.experimental.assert_cardinality(n_batches)).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from typing import Iterator, Optional
+from SalesIngestion import TIMESTAMP_FORMAT
+
+# Value sets observed in groc_sales.csv
+CATEGORIES = [
+    'Fruits & Vegetables', 'Bakery, Cakes & Dairy', 'Snacks & Branded Foods', 'Eggs, Meat & Fish',
+    'Kitchen, Garden & Pets', 'Gourmet & World Food', 'Beauty & Hygiene', 'Foodgrains, Oil & Masala',
+    'Beverages', 'Cleaning & Household', 'Baby Care'
+]
+CUSTOMER_TYPES = ['non-member', 'standard', 'premium', 'basic', 'gold']
+PAYMENT_TYPES = ['cash', 'credit card', 'e-wallet', 'debit card']
+UNIT_PRICES = np.array([0.19, 0.49, 1.49, 1.99, 2.49, 3.99, 4.49, 4.99, 7.19, 8.19, 8.99, 9.49, 11.19, 14.99, 23.99])
+
+# Relative transaction volume by day of week (Monday first), busier at the weekend
+WEEKLY_PROFILE = np.array([0.9, 0.85, 0.9, 0.95, 1.05, 1.2, 1.15])
+
+
+def category_names(n_categories: int):
+    """The real category names, extended with numbered ones when more are requested."""
+    names = CATEGORIES[:n_categories]
+    return names + [f"Category {i + 1}" for i in range(len(names), n_categories)]
+
+
+def _hex_ids(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Random UUID-shaped identifiers."""
+    raw = rng.integers(0, 2 ** 63, size=(n, 2), dtype=np.int64)
+    return np.array([f"{a:016x}{b:016x}" for a, b in raw], dtype=object)
+
+
+def iter_transactions(n_rows: int, n_days: int = 365, n_categories: int = 11, n_products: int = 300,
+                      start_date: str = '2022-01-01', chunksize: int = 1_000_000,
+                      seed: Optional[int] = 0) -> Iterator[pd.DataFrame]:
+    """Yield synthetic groc_sales.csv-shaped transactions in chronological chunks.
+
+    Daily volume follows a weekly profile with a mild trend and noise, and
+    each category has its own popularity, so per-day and per-group series
+    have realistic structure. Generating in chunks keeps memory bounded.
+    """
+    rng = np.random.default_rng(seed)
+    categories = np.array(category_names(n_categories), dtype=object)
+    category_weights = rng.dirichlet(np.full(n_categories, 2.0))
+    product_ids = _hex_ids(rng, n_products)
+    product_category = rng.choice(n_categories, size=n_products, p=category_weights)
+    product_price = rng.choice(UNIT_PRICES, size=n_products)
+
+    # Split the rows across days by the weekly profile, trend and noise
+    days = pd.date_range(start=start_date, periods=n_days)
+    day_weights = WEEKLY_PROFILE[days.dayofweek] * np.linspace(1.0, 1.2, n_days) * rng.lognormal(0, 0.1, n_days)
+    rows_per_day = rng.multinomial(n_rows, day_weights / day_weights.sum())
+    day_of_row_start = np.concatenate([[0], np.cumsum(rows_per_day)])
+
+    for start in range(0, n_rows, chunksize):
+        stop = min(start + chunksize, n_rows)
+        n = stop - start
+        row_day = np.searchsorted(day_of_row_start, np.arange(start, stop), side='right') - 1
+        # Opening hours 8:00-22:00, sorted within the chunk so timestamps stay chronological
+        minutes = np.sort(rng.integers(8 * 60, 22 * 60, size=n) + row_day * 24 * 60)
+        timestamps = days[0] + pd.to_timedelta(minutes, unit='m')
+
+        products = rng.integers(0, n_products, size=n)
+        quantity = rng.integers(1, 5, size=n).astype(np.int32)
+        unit_price = product_price[products].astype(np.float32)
+
+        yield pd.DataFrame({
+            'sr_no': np.arange(start, stop, dtype=np.int64),
+            'transaction_id': _hex_ids(rng, n),
+            'timestamp': pd.Series(timestamps).dt.strftime(TIMESTAMP_FORMAT).values,
+            'product_id': product_ids[products],
+            'category': categories[product_category[products]],
+            'customer_type': rng.choice(CUSTOMER_TYPES, size=n),
+            'unit_price': unit_price,
+            'quantity': quantity,
+            'total': np.round(unit_price * quantity, 2),
+            'payment_type': rng.choice(PAYMENT_TYPES, size=n)
+        })
+
+
+def generate_transactions(n_rows: int, n_days: int = 365, n_categories: int = 11,
+                          seed: Optional[int] = 0, **kwargs) -> pd.DataFrame:
+    """Generate a synthetic transaction frame in memory."""
+    chunks = iter_transactions(n_rows, n_days=n_days, n_categories=n_categories, seed=seed, **kwargs)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_transactions_csv(path: str, n_rows: int, n_days: int = 365, n_categories: int = 11,
+                           seed: Optional[int] = 0, **kwargs):
+    """Write a synthetic groc_sales.csv-shaped file chunk by chunk."""
+    chunks = iter_transactions(n_rows, n_days=n_days, n_categories=n_categories, seed=seed, **kwargs)
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
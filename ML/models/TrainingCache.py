@@ -0,0 +1,151 @@
+import os
+import json
+import shutil
+import hashlib
+import importlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from ModelArtifacts import ModelArtifactStore, _to_builtin
+
+# Bump when what a cache entry holds changes, so older entries stop matching
+CACHE_FORMAT_VERSION = 1
+
+ENTRY_FILE = 'entry.json'
+
+# Libraries whose version changes can change a trained model
+VERSIONED_LIBRARIES = ('numpy', 'sklearn', 'xgboost', 'tensorflow')
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    """Installed versions of the libraries training depends on."""
+    versions = {}
+    for name in VERSIONED_LIBRARIES:
+        try:
+            versions[name] = importlib.import_module(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def training_key(X: np.ndarray, y: np.ndarray, settings: Dict) -> str:
+    """SHA-256 key of a training run: its windows, targets and settings.
+
+    The windows are built from the prepared (scaled) series, so they change
+    whenever the series, its scaling or the lookback does; `settings` holds
+    everything else that shapes the result (splits, model configs, ...).
+    Library versions are always part of the key.
+    """
+    digest = hashlib.sha256()
+    header = {'format_version': CACHE_FORMAT_VERSION, 'libraries': library_versions(), 'settings': settings}
+    digest.update(json.dumps(_to_builtin(header), sort_keys=True, default=str).encode('utf-8'))
+    for values in (X, y):
+        values = np.ascontiguousarray(values)
+        digest.update(f"{values.dtype.str}{values.shape}".encode('utf-8'))
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(folder, name))
+               for folder, _, names in os.walk(path) for name in names)
+
+
+class TrainingCache:
+    """Content-addressed on-disk cache of trained models and their metrics.
+
+    Each entry is a directory named by its training_key, holding a
+    ModelArtifactStore version plus a JSON file of the metrics and any other
+    state training produced. A hit opens the models lazily, so returning them
+    costs a manifest read. Entries are evicted least recently used first once
+    the cache exceeds `max_bytes`; a hit refreshes the entry's modification
+    time, which is what recency is judged by.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 ** 2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def entries(self) -> List[str]:
+        """Keys of all complete entries, least recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+        keys = [name for name in os.listdir(self.root)
+                if not name.startswith('.') and os.path.exists(os.path.join(self.root, name, ENTRY_FILE))]
+        return sorted(keys, key=lambda key: os.path.getmtime(self._entry_path(key)))
+
+    def get(self, key: str) -> Optional[Tuple[Dict, Dict]]:
+        """Return (models, state) for a key, or None on a miss.
+
+        `models` is a LazyModels mapping; `state` is the dictionary given to put.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(os.path.join(path, ENTRY_FILE)) as f:
+                state = json.load(f)
+            models = ModelArtifactStore(path).load()['models']
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return models, state
+
+    def put(self, key: str, models: Dict, scaler, lookback: int, forecast_horizon: int, state: Dict):
+        """Store trained models under a key, then evict entries beyond max_bytes."""
+        os.makedirs(self.root, exist_ok=True)
+        # Build the entry beside the cache and rename it in, so readers never see a partial entry
+        tmp_path = os.path.join(self.root, f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        ModelArtifactStore(tmp_path).save(models, scaler, lookback, forecast_horizon,
+                                          metrics=state.get('metrics'))
+        with open(os.path.join(tmp_path, ENTRY_FILE), 'w') as f:
+            json.dump(_to_builtin(state), f)
+        try:
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError:
+            # Another process stored the same key first; its entry is equivalent
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        keys = self.entries()
+        sizes = {key: _directory_size(self._entry_path(key)) for key in keys}
+        total = sum(sizes.values())
+        removed = 0
+        # The newest entry is kept even when it alone exceeds the cap
+        for key in keys[:-1]:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+            total -= sizes[key]
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and the current size on disk."""
+        lookups = self.hits + self.misses
+        keys = self.entries()
+        return {
+            'entries': len(keys),
+            'bytes': sum(_directory_size(self._entry_path(key)) for key in keys),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
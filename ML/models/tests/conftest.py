@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The model modules import each other as top-level siblings, as they do when run from ML/models
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
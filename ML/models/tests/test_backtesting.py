@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Backtesting import _backtest_fold, _fit_fold_scalers, forecast_metrics
+from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+
+SYSTEM_KWARGS = {'forecast_horizon': 5, 'lstm_params': {'epochs': 2, 'units': 4},
+                 'xgb_params': {'n_estimators': 20}}
+
+
+def _daily(n_days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'date': pd.date_range('2024-01-01', periods=n_days, freq='D'),
+                         'total': 100 + 10 * np.sin(np.arange(n_days) / 7) + rng.normal(0, 3, n_days)})
+
+
+def test_forecast_metrics_match_per_cutoff_loops():
+    rng = np.random.default_rng(0)
+    actual = rng.uniform(50, 150, (12, 4))
+    predicted = actual + rng.normal(0, 5, (12, 4))
+    metrics = forecast_metrics(actual, predicted)
+    assert metrics['overall']['rmse'] == pytest.approx(np.sqrt(np.mean((predicted - actual) ** 2)))
+    assert metrics['by_horizon']['mae'] == pytest.approx(np.abs(predicted - actual).mean(axis=0))
+
+
+def test_fold_scalers_only_see_the_days_before_the_fold():
+    daily = _daily()
+    daily.loc[100:, 'total'] *= 10
+    system = SimpleSalesForecastSystem(verbose=False)
+    _, scaled = system.prepare_data(daily)
+    rescaled = _fit_fold_scalers(system, scaled, 90)
+
+    assert system.scaler.data_max_[0] == pytest.approx(daily['total'][:90].max())
+    np.testing.assert_allclose(system.scaler.inverse_transform(rescaled)[:, 0], daily['total'], rtol=1e-9)
+    assert rescaled[:90].max() == pytest.approx(1.0) and rescaled[100:].min() > 1
+
+
+def test_fold_models_train_without_seeing_values_after_the_fold():
+    daily = _daily()
+    daily.loc[100:, 'total'] *= 10
+    systems = []
+
+    def factory(**kwargs):
+        systems.append(SimpleSalesForecastSystem(**kwargs))
+        return systems[-1]
+
+    result = _backtest_fold(factory, SYSTEM_KWARGS, None, daily, np.arange(80, 90), None, 0.1)
+    assert systems[0].scaler.data_max_[0] == pytest.approx(daily['total'][:80].max())
+    np.testing.assert_allclose(result.actual, np.lib.stride_tricks.sliding_window_view(
+        daily['total'].to_numpy(), 5)[80:90])
@@ -0,0 +1,53 @@
+import gc
+import weakref
+import numpy as np
+import xgboost as xgb
+from tensorflow import keras
+import BatchForecasting as batch_forecasting
+from BatchForecasting import BatchForecaster
+
+LOOKBACK = 4
+HORIZON = 3
+
+
+def _lstm(seed=0):
+    keras.utils.set_random_seed(seed)
+    inputs = keras.Input(shape=(LOOKBACK, 1))
+    x = keras.layers.LSTM(8)(inputs)
+    x = keras.layers.Dropout(0.2)(x)
+    return keras.Model(inputs, keras.layers.Dense(1)(x))
+
+
+def _xgb(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((100, LOOKBACK), dtype=np.float32)
+    return xgb.XGBRegressor(n_estimators=10, max_depth=2).fit(X, X[:, -1])
+
+
+def test_forecasters_over_one_model_share_a_single_trace():
+    lstm, trees = _lstm(), _xgb()
+    windows = np.random.default_rng(1).random((8, LOOKBACK), dtype=np.float32)
+
+    first = BatchForecaster(lstm, trees, LOOKBACK, HORIZON)
+    expected = first.forecast(windows)['lstm']
+    second = BatchForecaster(lstm, trees, LOOKBACK, HORIZON)
+    assert second._lstm_step is first._lstm_step
+    np.testing.assert_allclose(second.forecast(windows[:3])['lstm'], expected[:3], rtol=1e-5)
+    assert first._lstm_step.experimental_get_tracing_count() == 1
+
+    # The dropout-active pass and another model get graphs of their own
+    second._prepare_sampling()
+    assert second._lstm_sample_step is not second._lstm_step
+    assert BatchForecaster(_lstm(1), trees, LOOKBACK, HORIZON)._lstm_step is not first._lstm_step
+
+
+def test_compiled_steps_go_with_their_model():
+    lstm = _lstm()
+    BatchForecaster(lstm, _xgb(), LOOKBACK, HORIZON).predict_lstm(np.zeros((2, LOOKBACK), dtype=np.float32))
+    assert lstm in batch_forecasting._COMPILED_STEPS
+
+    lstm_ref = weakref.ref(lstm)
+    del lstm
+    gc.collect()
+    # The cached step must not keep its model alive
+    assert lstm_ref() is None
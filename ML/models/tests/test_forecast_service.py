@@ -0,0 +1,107 @@
+import time
+import threading
+import pytest
+from urllib.error import HTTPError
+from ForecastService import ForecastService, HTTPClient, PipelineCache, start_http_server
+
+
+class _FakePipeline:
+    """Records the artifact path it was loaded from instead of loading models."""
+
+    loaded = []
+    release = None
+    fail = False
+
+    def load_models(self, path):
+        if _FakePipeline.release is not None:
+            _FakePipeline.release.wait(5)
+        _FakePipeline.loaded.append(path)
+        if _FakePipeline.fail:
+            raise OSError(f"No artifacts in {path}")
+        self.path = path
+
+
+@pytest.fixture(autouse=True)
+def _reset_fake():
+    _FakePipeline.loaded = []
+    _FakePipeline.release = None
+    _FakePipeline.fail = False
+
+
+@pytest.mark.parametrize('series_key', ['../outside', '..', '.', '/etc', 'a/b', '', 7])
+def test_series_keys_outside_the_model_root_are_rejected(tmp_path, series_key):
+    cache = PipelineCache(str(tmp_path), _FakePipeline)
+    with pytest.raises(ValueError):
+        cache.get(series_key)
+    assert _FakePipeline.loaded == []
+
+
+def test_symlinked_series_escaping_the_root_is_rejected(tmp_path):
+    (tmp_path / 'models').mkdir()
+    (tmp_path / 'models' / 'escape').symlink_to(tmp_path)
+    with pytest.raises(ValueError):
+        PipelineCache(str(tmp_path / 'models'), _FakePipeline).get('escape')
+
+
+def test_valid_series_loads_once_and_leaves_nothing_in_flight(tmp_path):
+    cache = PipelineCache(str(tmp_path), _FakePipeline, maxsize=2)
+    _FakePipeline.release = threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('store-1.v2'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    _FakePipeline.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(pipeline) for pipeline in results}) == 1
+    assert _FakePipeline.loaded == [str(tmp_path / 'store-1.v2')]
+    for key in ('a', 'b', 'c'):
+        cache.get(key)
+    assert cache._loading == {}
+    assert cache.stats()['evictions'] == 2
+
+
+def test_waiters_share_a_failed_load_instead_of_retrying_it(tmp_path):
+    cache = PipelineCache(str(tmp_path), _FakePipeline)
+    _FakePipeline.release = threading.Event()
+    _FakePipeline.fail = True
+    errors = []
+
+    def request():
+        try:
+            cache.get('store-1')
+        except OSError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # Every other request joins the load in flight before it fails
+    deadline = time.monotonic() + 5
+    while cache.hits < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _FakePipeline.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4 and len({id(error) for error in errors}) == 1
+    assert len(_FakePipeline.loaded) == 1
+    # The failure is not cached: the next request tries again
+    _FakePipeline.fail = False
+    assert cache.get('store-1').path == str(tmp_path / 'store-1')
+    assert len(_FakePipeline.loaded) == 2 and cache._loading == {}
+
+
+def test_http_rejects_path_traversal_with_400(tmp_path):
+    service = ForecastService(str(tmp_path), _FakePipeline)
+    server = start_http_server(service, port=0)
+    try:
+        client = HTTPClient(f"http://127.0.0.1:{server.server_address[1]}")
+        with pytest.raises(HTTPError) as error:
+            client.forecast('../../x')
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
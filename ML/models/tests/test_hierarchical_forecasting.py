@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from HierarchicalForecasting import HierarchicalForecaster, HierarchicalReconciler, Hierarchy, hierarchy_levels
+from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+
+
+def _hierarchy(grouped=False):
+    leaves = pd.DataFrame({'category': ['Bakery', 'Bakery', 'Dairy', 'Dairy', 'Dairy', 'Produce'],
+                           'customer_type': ['gold', 'basic', 'gold', 'basic', 'premium', 'gold']})
+    return Hierarchy(leaves, hierarchy_levels(['category', 'customer_type'], grouped))
+
+
+def _dense_mint(hierarchy, base, inverse_weights):
+    S = hierarchy.S.toarray()
+    Winv = np.diag(inverse_weights)
+    return S @ np.linalg.solve(S.T @ Winv @ S, S.T @ Winv @ base)
+
+
+def test_summing_matrix_structure():
+    hierarchy = _hierarchy()
+    assert (hierarchy.n_nodes, hierarchy.n_leaves) == (1 + 3 + 6, 6)
+    assert hierarchy.S.nnz == 6 * 3
+    assert hierarchy.nodes.loc[hierarchy.total_row, 'level'] == 'total'
+    np.testing.assert_array_equal(hierarchy.aggregate(np.ones(6))[:4], [6, 2, 3, 1])
+
+    grouped = _hierarchy(grouped=True)
+    assert grouped.n_nodes == 1 + 3 + 3 + 6
+    assert grouped.coherence_error(grouped.aggregate(np.arange(6.0))) == 0
+
+
+@pytest.mark.parametrize('grouped', [False, True])
+@pytest.mark.parametrize('weights', ['ols', 'structural', 'variance'])
+def test_mint_matches_the_dense_closed_form(grouped, weights):
+    hierarchy = _hierarchy(grouped)
+    rng = np.random.default_rng(0)
+    base = rng.normal(50, 10, size=(hierarchy.n_nodes, 7))
+    reconciler = HierarchicalReconciler(hierarchy, 'mint', weights)
+    reconciler.fit(residuals=rng.normal(0, rng.uniform(1, 5, size=(hierarchy.n_nodes, 1)), size=(hierarchy.n_nodes, 30)))
+
+    reconciled = reconciler.reconcile(base)
+    np.testing.assert_allclose(reconciled, _dense_mint(hierarchy, base, reconciler._inverse_weights()), atol=1e-6)
+    assert hierarchy.coherence_error(reconciled) < 1e-9
+
+
+def test_mint_leaves_coherent_forecasts_unchanged():
+    hierarchy = _hierarchy()
+    coherent = hierarchy.aggregate(np.random.default_rng(1).uniform(1, 10, size=(6, 4)))
+    reconciled = HierarchicalReconciler(hierarchy, 'mint', 'structural').reconcile(coherent)
+    np.testing.assert_allclose(reconciled, coherent, atol=1e-8)
+
+
+def test_bottom_up_and_top_down_are_coherent():
+    hierarchy = _hierarchy()
+    rng = np.random.default_rng(2)
+    base = rng.normal(50, 10, size=(hierarchy.n_nodes, 5))
+    history = hierarchy.aggregate(rng.uniform(1, 10, size=(6, 40)))
+
+    bottom_up = HierarchicalReconciler(hierarchy, 'bottom_up').reconcile(base)
+    np.testing.assert_allclose(bottom_up[hierarchy.leaf_rows], base[hierarchy.leaf_rows])
+
+    top_down = HierarchicalReconciler(hierarchy, 'top_down').fit(history=history).reconcile(base)
+    np.testing.assert_allclose(top_down[hierarchy.total_row], base[hierarchy.total_row])
+    for reconciled in (bottom_up, top_down):
+        assert hierarchy.coherence_error(reconciled) < 1e-9
+
+
+def test_reconciler_errors():
+    hierarchy = _hierarchy()
+    with pytest.raises(ValueError):
+        HierarchicalReconciler(hierarchy, 'middle_out')
+    with pytest.raises(ValueError):
+        HierarchicalReconciler(hierarchy, 'mint', 'variance').reconcile(np.zeros((hierarchy.n_nodes, 2)))
+    with pytest.raises(ValueError):
+        HierarchicalReconciler(hierarchy, 'bottom_up').reconcile(np.zeros((3, 2)))
+
+
+@pytest.mark.parametrize('verbose', [False, True])
+def test_forecaster_honours_the_verbose_switch(verbose, capsys):
+    rng = np.random.default_rng(0)
+    n_rows = 3000
+    df = pd.DataFrame({'datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90 * 24, n_rows),
+                                                                                 unit='h'),
+                       'total': rng.uniform(1, 100, n_rows),
+                       'category': rng.choice(['Bakery', 'Dairy'], n_rows),
+                       'customer_type': rng.choice(['gold', 'basic'], n_rows)})
+    forecaster = HierarchicalForecaster(SimpleSalesForecastSystem, verbose=verbose,
+                                        system_kwargs={'forecast_horizon': 3, 'lstm_params': {'epochs': 1},
+                                                       'xgb_params': {'n_estimators': 5}})
+    frame = forecaster.fit_forecast(df)
+    assert len(frame) == forecaster.hierarchy.n_nodes * 3
+    assert ('Fitting one model pair' in capsys.readouterr().out) == verbose
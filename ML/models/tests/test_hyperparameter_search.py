@@ -0,0 +1,71 @@
+import time
+import numpy as np
+from HyperparameterSearch import (HyperparameterSearch, MedianPruner, candidate_configs, expand_config,
+                                  walk_forward_folds)
+
+
+class _ConstantModel:
+    def __init__(self, value):
+        self.value = value
+
+    def predict(self, X, verbose=0):
+        return np.full(len(X), self.value)
+
+
+class FakeSystem:
+    """Forecasting system whose validation loss is set by its config: xgb.bias squared.
+
+    Fits with a bias above 1 take 3 seconds, so those trials reach every fold after the good ones.
+    """
+
+    target_horizon = 1
+
+    def __init__(self, verbose=True):
+        self.lookback = 2
+        self.lstm_params = {}
+        self.xgb_params = {'bias': 0.0}
+        self.models = {}
+        self.fit_stats = {}
+
+    def create_sequences(self, data):
+        return np.zeros((len(data), self.lookback)), np.zeros(len(data))
+
+    def split_data(self, X, y):
+        return (X[:-4], y[:-4]), (X[-4:-2], y[-4:-2]), (X[-2:], y[-2:])
+
+    def _lstm_inputs(self, X):
+        return X
+
+    def fit_models(self, X_train, y_train, X_val, y_val):
+        time.sleep(3.0 if self.xgb_params['bias'] > 1 else 0.0)
+        model = _ConstantModel(self.xgb_params['bias'])
+        self.models = {'lstm': model, 'xgb': model}
+
+
+def test_candidate_configs_expand_dotted_names():
+    configs = candidate_configs({'lookback': [2, 7], 'lstm.units': [20]})
+    assert configs == [{'lookback': 2, 'lstm': {'units': 20}}, {'lookback': 7, 'lstm': {'units': 20}}]
+    assert expand_config({'xgb.max_depth': 3}) == {'xgb': {'max_depth': 3}}
+
+
+def test_walk_forward_folds_expand_and_respect_gap():
+    folds = walk_forward_folds(40, n_folds=3, gap=2)
+    assert [(train.stop, val.start, val.stop) for train, val in folds] == [(8, 10, 20), (18, 20, 30), (28, 30, 40)]
+
+
+def test_median_pruner_waits_for_enough_trials():
+    pruner = MedianPruner(min_trials=2)
+    assert not pruner.should_prune(0, 5.0, {0: [1.0]})
+    assert pruner.should_prune(0, 5.0, {0: [1.0, 2.0]})
+    assert not pruner.should_prune(0, 1.5, {0: [1.0, 2.0]})
+
+
+def test_trials_running_concurrently_prune_each_other():
+    # Every trial is submitted at once; the slow bad ones only reach fold 0 after the good ones reported it
+    search = HyperparameterSearch(FakeSystem, search_space={'xgb.bias': [0.1, 0.2, 5.0, 6.0]}, n_folds=3,
+                                  max_workers=4, pruner=MedianPruner(min_trials=2), verbose=False)
+    best = search.search(np.zeros((80, 1)))
+
+    assert best['config']['xgb']['bias'] == 0.1
+    pruned = {trial['config']['xgb']['bias'] for trial in search.trials if trial['pruned']}
+    assert pruned == {5.0, 6.0}
@@ -0,0 +1,7 @@
+import pytest
+from ImportTimeBenchmark import ENTRY_POINTS, time_entry_point
+
+
+@pytest.mark.parametrize('entry_point', ['bot_import', 'forecasting_import', 'artifact_store_import'])
+def test_module_imports_leave_the_ml_backends_unloaded(entry_point):
+    assert time_entry_point(ENTRY_POINTS[entry_point], repeats=1)['heavy_modules'] == []
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from IncrementalTraining import new_daily_sales, update_windows, warm_start_models
+
+
+class _FrozenLSTM:
+    """Stands in for the LSTM so only the XGBoost continuation is exercised."""
+
+    def fit(self, *args, **kwargs):
+        pass
+
+
+def _early_stopped_regressor(rng):
+    X = rng.random((300, 3))
+    y = X.sum(axis=1) + rng.normal(0, 0.3, 300)
+    model = xgb.XGBRegressor(n_estimators=100, learning_rate=0.3, early_stopping_rounds=5)
+    model.fit(X[:200], y[:200], eval_set=[(X[200:], y[200:])], verbose=False)
+    return model, X, y
+
+
+def test_warm_start_uses_appended_trees_after_early_stopping():
+    model, X, y = _early_stopped_regressor(np.random.default_rng(0))
+    best_rounds = model.best_iteration + 1
+    before = model.predict(X)
+
+    warm_start_models({'lstm': _FrozenLSTM(), 'xgb': model}, X + 1, y + 5, xgb_rounds=10)
+
+    booster = model.get_booster()
+    assert booster.num_boosted_rounds() == best_rounds + 10
+    assert booster.attr('best_iteration') is None
+    assert np.abs(model.predict(X) - before).max() > 0.1
+
+
+def test_warm_start_restores_training_params():
+    model, X, y = _early_stopped_regressor(np.random.default_rng(1))
+    warm_start_models({'lstm': _FrozenLSTM(), 'xgb': model}, X, y, xgb_rounds=3)
+    assert model.get_params()['n_estimators'] == 100
+    assert model.get_params()['early_stopping_rounds'] == 5
+
+
+def test_update_windows_replays_history_tail():
+    history = np.arange(10, dtype=np.float64).reshape(-1, 1)
+    new = np.array([[10.0], [11.0]])
+    X, y = update_windows(history, new, lookback=3, replay=2)
+    np.testing.assert_array_equal(y.ravel(), [8, 9, 10, 11])
+    np.testing.assert_array_equal(X[-1], [8, 9, 10])
+
+
+def test_new_daily_sales_keeps_only_days_after_history():
+    history = pd.DataFrame({'date': pd.to_datetime(['2024-01-01', '2024-01-02']), 'sales': [1.0, 2.0]})
+    new = pd.DataFrame({'date': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-03']),
+                        'total': [5.0, 1.0, 2.0]})
+    daily = new_daily_sales(history, new, 'sales')
+    assert daily['date'].tolist() == [pd.Timestamp('2024-01-03')]
+    assert daily['sales'].tolist() == [3.0]
+
+
+def test_new_hours_leave_out_the_hour_still_in_progress():
+    history = pd.DataFrame({'date': pd.to_datetime(['2024-01-01 09:00']), 'total': [10.0]})
+    new_df = pd.DataFrame({'datetime': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 10:30',
+                                                       '2024-01-01 11:59', '2024-01-01 12:15']),
+                           'total': [1.0, 2.0, 3.0, 4.0]})
+    new_hours = new_daily_sales(history, new_df, 'total', fill_gaps=True, freq='H')
+    assert new_hours['date'].tolist() == list(pd.to_datetime(['2024-01-01 10:00', '2024-01-01 11:00']))
+    assert new_hours['total'].tolist() == [3.0, 3.0]
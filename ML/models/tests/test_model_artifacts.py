@@ -0,0 +1,65 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow import keras
+from ModelArtifacts import ARTIFACT_FORMAT_VERSION, MANIFEST_FILE, ModelArtifactStore, data_fingerprint, \
+    scaler_from_dict, scaler_to_dict
+
+
+def _models():
+    keras.utils.set_random_seed(0)
+    lstm = keras.Sequential([keras.Input((3, 1)), keras.layers.LSTM(4), keras.layers.Dense(1)])
+    lstm.compile(optimizer='adam', loss='mse')
+    rng = np.random.default_rng(0)
+    X = rng.random((50, 3))
+    trees = xgb.XGBRegressor(n_estimators=5).fit(X, X.sum(axis=1))
+    return {'lstm': lstm, 'xgb': trees}
+
+
+def test_scaler_round_trip_is_exact():
+    scaler = MinMaxScaler().fit(np.random.default_rng(0).normal(size=(30, 2)))
+    restored = scaler_from_dict(json.loads(json.dumps(scaler_to_dict(scaler))))
+    for attribute in ('data_min_', 'data_max_', 'scale_', 'min_'):
+        np.testing.assert_array_equal(getattr(restored, attribute), getattr(scaler, attribute))
+    assert restored.n_samples_seen_ == 30
+
+
+def test_save_and_lazy_load_round_trip(tmp_path):
+    models = _models()
+    scaler = MinMaxScaler().fit(np.arange(10.0).reshape(-1, 1))
+    daily = pd.DataFrame({'date': pd.date_range('2024-01-01', periods=10), 'total': np.arange(10.0)})
+    store = ModelArtifactStore(str(tmp_path))
+    assert store.save(models, scaler, lookback=3, forecast_horizon=7, metrics={'xgb': {'mse': np.float32(0.5)}},
+                      daily_sales=daily, extra={'freq': 'D'}) == 'v0001'
+    assert store.save(models, scaler, lookback=3, forecast_horizon=7) == 'v0002'
+    assert store.versions() == ['v0001', 'v0002'] and store.latest_version() == 'v0002'
+
+    artifacts = store.load('v0001')
+    manifest = artifacts['manifest']
+    assert (manifest['lookback'], manifest['freq'], manifest['metrics']) == (3, 'D', {'xgb': {'mse': 0.5}})
+    assert manifest['data_fingerprint'] == data_fingerprint(daily['total'].values)
+    pd.testing.assert_frame_equal(artifacts['daily_sales'], daily, check_freq=False)
+
+    loaded = artifacts['models']
+    assert not loaded.is_loaded('lstm') and not loaded.is_loaded('xgb')
+    X = np.random.default_rng(1).random((4, 3))
+    np.testing.assert_array_equal(loaded['xgb'].predict(X), models['xgb'].predict(X))
+    np.testing.assert_allclose(loaded['lstm'].predict(X[..., np.newaxis], verbose=0),
+                               models['lstm'].predict(X[..., np.newaxis], verbose=0))
+    assert loaded.is_loaded('lstm')
+
+
+def test_newer_artifact_formats_are_rejected(tmp_path):
+    store = ModelArtifactStore(str(tmp_path))
+    version = store.save(_models(), MinMaxScaler().fit([[0.0], [1.0]]), lookback=3, forecast_horizon=7)
+    path = tmp_path / version / MANIFEST_FILE
+    manifest = json.loads(path.read_text())
+    manifest['format_version'] = ARTIFACT_FORMAT_VERSION + 1
+    path.write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        store.load()
+    with pytest.raises(FileNotFoundError):
+        ModelArtifactStore(str(tmp_path / 'empty')).load()
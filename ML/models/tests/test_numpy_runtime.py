@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from tensorflow import keras
+from BatchForecasting import BatchForecaster
+from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+from NumpyRuntime import NumpyForecaster, NumpyRuntime, NumpyTrees, check_parity, export_lstm, export_runtime
+
+LOOKBACK = 4
+HORIZON = 5
+
+
+def _pipeline_lstm(outputs=1, seed=0):
+    """The SalesInsightPipeline architecture: stacked LSTMs with dropout, untrained but seeded."""
+    keras.utils.set_random_seed(seed)
+    inputs = keras.Input(shape=(LOOKBACK, 1))
+    x = keras.layers.LSTM(8, activation='relu', return_sequences=True)(inputs)
+    x = keras.layers.Dropout(0.2)(x)
+    x = keras.layers.LSTM(8, activation='relu')(x)
+    x = keras.layers.Dropout(0.2)(x)
+    return keras.Model(inputs, keras.layers.Dense(outputs)(x))
+
+
+def _xgb(outputs=1, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((200, LOOKBACK), dtype=np.float32)
+    y = X[:, -1:] + 0.1 * np.arange(outputs) + rng.normal(0, 0.05, (200, outputs))
+    return xgb.XGBRegressor(n_estimators=30, max_depth=3).fit(X, y[:, 0] if outputs == 1 else y)
+
+
+def _forecasters(outputs=1):
+    lstm, trees = _pipeline_lstm(outputs), _xgb(outputs)
+    reference = BatchForecaster(lstm, trees, LOOKBACK, HORIZON)
+    runtime = NumpyForecaster(export_lstm(lstm), NumpyTrees.from_xgboost(trees), LOOKBACK, HORIZON, seed=0)
+    return reference, runtime
+
+
+def _windows(n=32, seed=1):
+    return np.random.default_rng(seed).random((n, LOOKBACK), dtype=np.float32)
+
+
+@pytest.mark.parametrize('feedback', ['separate', 'ensemble'])
+def test_recursive_forecasts_match_keras_and_xgboost(feedback):
+    reference, runtime = _forecasters()
+    expected = reference.forecast(_windows(), feedback=feedback)
+    actual = runtime.forecast(_windows(), feedback=feedback)
+    for name in expected:
+        np.testing.assert_allclose(actual[name], expected[name], rtol=1e-4, atol=1e-5)
+
+
+def test_direct_forecasts_match_keras_and_xgboost():
+    reference, runtime = _forecasters(outputs=HORIZON)
+    expected = reference.forecast_direct(_windows())
+    actual = runtime.forecast_direct(_windows())
+    for name in expected:
+        np.testing.assert_allclose(actual[name], expected[name], rtol=1e-4, atol=1e-5)
+
+
+def test_dropout_sampling_matches_keras_distribution():
+    reference, runtime = _forecasters()
+    windows = _windows(n=2)
+    expected = reference.sample_paths(windows, 4000, feedback='ensemble')['lstm']
+    actual = runtime.sample_paths(windows, 4000, feedback='ensemble')['lstm']
+    assert actual.shape == expected.shape == (2, 4000, HORIZON)
+    scale = expected.std(axis=1).max()
+    assert scale > 0
+    np.testing.assert_allclose(actual.mean(axis=1), expected.mean(axis=1), atol=0.1 * scale)
+    np.testing.assert_allclose(actual.std(axis=1), expected.std(axis=1), rtol=0.1)
+
+
+def test_sampling_without_dropout_is_rejected():
+    forecaster = NumpyForecaster(export_lstm(keras.Sequential([keras.Input((LOOKBACK, 1)), keras.layers.LSTM(4),
+                                                               keras.layers.Dense(1)])),
+                                 NumpyTrees.from_xgboost(_xgb()), LOOKBACK, HORIZON)
+    with pytest.raises(ValueError, match='Dropout'):
+        forecaster.sample_paths(_windows(n=2), 10)
+
+
+def test_exported_system_matches_and_survives_save(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2024-01-01', periods=80, freq='D')
+    daily = pd.DataFrame({'date': dates, 'total': 100 + 10 * np.sin(np.arange(80) / 3) + rng.normal(0, 2, 80)})
+    system = SimpleSalesForecastSystem(forecast_horizon=HORIZON, lookback=LOOKBACK, verbose=False,
+                                       lstm_params={'epochs': 2, 'batch_size': 16})
+    _, scaled = system.prepare_data(daily)
+    system.train_models(*system.create_sequences(scaled))
+
+    runtime = export_runtime(system)
+    report = check_parity(system, runtime)
+    assert report['ensemble_max_rel'] < 1e-4
+
+    runtime.save(tmp_path / 'runtime.npz')
+    loaded = NumpyRuntime.load(tmp_path / 'runtime.npz')
+    recent = daily['total'].values[-LOOKBACK:]
+    np.testing.assert_array_equal(loaded.forecast(recent), runtime.forecast(recent))
@@ -0,0 +1,24 @@
+from PipelineBenchmark import compare_to_baseline
+
+CONFIG = {'rows': 1000}
+
+
+def _results(seconds=1.0, peak_rss_mb=500.0, **extra):
+    return {'config': CONFIG, 'pipelines': {'simple': {'train': {'seconds': seconds, 'peak_rss_mb': peak_rss_mb,
+                                                                 **extra}}}}
+
+
+def test_memory_growth_is_a_regression_even_when_time_is_flat():
+    baseline = _results()
+    assert compare_to_baseline(_results(peak_rss_mb=560.0), baseline) == []
+    regressions = compare_to_baseline(_results(peak_rss_mb=800.0), baseline)
+    assert len(regressions) == 1 and 'peak_rss_mb' in regressions[0]
+    assert compare_to_baseline(_results(seconds=1.5), baseline)[0].startswith('simple.train: 1.500s')
+
+
+def test_traced_memory_is_compared_only_when_both_runs_recorded_it():
+    baseline = _results(peak_traced_mb=100.0)
+    assert compare_to_baseline(_results(), baseline) == []
+    assert 'peak_traced_mb' in compare_to_baseline(_results(peak_traced_mb=200.0), baseline)[0]
+    # RSS unavailable in the baseline run is not treated as a regression
+    assert compare_to_baseline(_results(), _results(peak_rss_mb=0.0)) == []
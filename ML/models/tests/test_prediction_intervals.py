@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+from PredictionIntervals import (ConformalIntervals, calibrate_conformal, check_interval_method, interval_quantiles,
+                                 path_quantiles)
+
+
+def test_conformal_intervals_reach_their_coverage():
+    rng = np.random.default_rng(0)
+    residuals = rng.normal(0, [1.0, 2.0, 4.0], size=(1000, 3))
+    intervals = ConformalIntervals(coverage=0.9).fit(residuals)
+    assert np.all(np.diff(intervals.upper - intervals.lower) > 0)
+
+    forecasts = rng.normal(100, 10, size=(20000, 3))
+    actuals = forecasts + rng.normal(0, [1.0, 2.0, 4.0], size=(20000, 3))
+    lower, upper = intervals.interval(forecasts)
+    coverage = ((actuals >= lower) & (actuals <= upper)).mean(axis=0)
+    assert np.all(np.abs(coverage - 0.9) < 0.03)
+
+
+def test_conformal_half_widths_are_finite_sample_quantiles():
+    residuals = np.arange(-9.0, 10.0).reshape(-1, 1)
+    intervals = ConformalIntervals(coverage=0.8).fit(residuals)
+    n = len(residuals)
+    level = np.ceil((n + 1) * 0.8) / n
+    assert intervals.upper[0] == pytest.approx(np.quantile(np.abs(residuals), level))
+    assert intervals.lower[0] == -intervals.upper[0]
+
+
+def test_biased_residuals_still_give_bands_centred_on_the_forecast():
+    # A model that always under-forecasts: every residual is positive
+    residuals = np.random.default_rng(2).uniform(5, 10, size=(50, 4))
+    forecasts = np.full(4, 100.0)
+    lower, upper = ConformalIntervals(0.9).fit(residuals).interval(forecasts)
+    assert np.all(lower < forecasts) and np.all(upper > forecasts)
+    np.testing.assert_allclose(forecasts - lower, upper - forecasts)
+
+
+def test_conformal_round_trip_and_errors():
+    intervals = ConformalIntervals(0.9).fit(np.random.default_rng(1).normal(size=(10, 4)))
+    restored = ConformalIntervals.from_dict(intervals.to_dict())
+    np.testing.assert_array_equal(restored.interval(np.zeros(4)), intervals.interval(np.zeros(4)))
+    with pytest.raises(ValueError):
+        intervals.interval(np.zeros(5))
+    with pytest.raises(ValueError):
+        ConformalIntervals(0.9).interval(np.zeros(4))
+    with pytest.raises(ValueError):
+        ConformalIntervals(0.9).fit(np.zeros((1, 4)))
+
+
+def test_path_quantiles_and_validation():
+    paths = np.tile(np.arange(101, dtype=np.float64)[np.newaxis, :, np.newaxis], (2, 1, 3))
+    lower, upper = path_quantiles(paths, 0.9)
+    assert lower.shape == upper.shape == (2, 3)
+    np.testing.assert_allclose(lower, 5.0)
+    np.testing.assert_allclose(upper, 95.0)
+    assert interval_quantiles(0.8) == pytest.approx((0.1, 0.9))
+    with pytest.raises(ValueError):
+        check_interval_method('bootstrap')
+
+
+def _trained_system(n_days, freq='D', horizon=30):
+    rng = np.random.default_rng(0)
+    days = np.arange(n_days)
+    daily = pd.DataFrame({'date': pd.date_range('2023-01-02', periods=n_days, freq='D'),
+                          'total': 100 + 10 * np.sin(days / 7) + rng.normal(0, 3, n_days)})
+    system = SimpleSalesForecastSystem(forecast_horizon=horizon, freq=freq, verbose=False,
+                                       lstm_params={'epochs': 1, 'units': 4},
+                                       xgb_params={'n_estimators': 20})
+    _, scaled = system.prepare_data(daily)
+    system.train_models(*system.create_sequences(scaled))
+    return system, scaled
+
+
+def test_short_series_calibrate_on_the_latest_cutoffs():
+    # 200 days and a 30-day horizon leave no cutoff after an 85% training split
+    system, scaled = _trained_system(200)
+    messages = []
+    intervals = calibrate_conformal(system, scaled, first_unseen=175, log=messages.append)
+    assert intervals.n_calibration == 20 and len(intervals.lower) == 30
+    assert messages and 'in-sample' in messages[0]
+
+    with pytest.raises(ValueError, match='mc_dropout'):
+        calibrate_conformal(system, scaled[:32], first_unseen=20)
+
+
+def test_weekly_bands_contain_the_forecast():
+    system, scaled = _trained_system(7 * 120, freq='W', horizon=8)
+    intervals = calibrate_conformal(system, scaled, first_unseen=90)
+    forecasts = system.generate_forecasts(scaled[-system.lookback:, 0])
+    lower, upper = intervals.interval(forecasts['ensemble_forecast'].to_numpy())
+    assert np.all(lower <= forecasts['ensemble_forecast']) and np.all(forecasts['ensemble_forecast'] <= upper)
@@ -0,0 +1,58 @@
+import json
+from ResponseCache import ResponseCache, normalize_question
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _saved_keys(path):
+    with open(path) as f:
+        return [key for key, _, _ in json.load(f)]
+
+
+def test_keys_ignore_case_whitespace_and_punctuation():
+    summary = {'total_sales': 10}
+    assert ResponseCache.make_key('  What were  TOTAL sales?', summary) == ResponseCache.make_key('what were total sales', summary)
+    assert ResponseCache.make_key('total sales', summary) != ResponseCache.make_key('total sales', {'total_sales': 11})
+    assert normalize_question('Hi there!!') == 'hi there'
+
+
+def test_lru_eviction_and_expiry():
+    clock = _Clock()
+    cache = ResponseCache(maxsize=2, ttl=10, clock=clock)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    cache.get('a')
+    cache.set('c', '3')
+    assert cache.get('b') is None and cache.get('a') == '1'
+    clock.now += 11
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['expirations'] == 1
+
+
+def test_persistence_writes_in_batches(tmp_path):
+    path = str(tmp_path / 'answers.json')
+    clock = _Clock()
+    cache = ResponseCache(path=path, clock=clock, flush_every=3, flush_interval=60)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    assert cache.flushes == 0 and not (tmp_path / 'answers.json').exists()
+
+    cache.set('c', '3')
+    assert cache.flushes == 1 and _saved_keys(path) == ['a', 'b', 'c']
+
+    cache.set('d', '4')
+    clock.now += 61
+    cache.set('e', '5')
+    assert cache.flushes == 2
+
+    cache.set('f', '6')
+    cache.flush()
+    cache.flush()
+    assert cache.flushes == 3
+    assert ResponseCache(path=path, clock=clock).get('f') == '6'
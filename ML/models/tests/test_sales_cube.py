@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import SalesCube as sales_cube
+from SalesIngestion import DATASET_ATTR, append_transactions
+from SalesCube import QueryRouter, SalesCube, frame_fingerprint
+
+
+def _transactions(n_rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 30 * 24, n_rows), unit='h'),
+        'total': rng.integers(1, 100, n_rows).astype(float),
+        'category': rng.choice(['Bakery', 'Dairy', 'Produce'], n_rows),
+        'customer_type': rng.choice(['Member', 'Normal'], n_rows),
+        'payment_type': rng.choice(['Cash', 'Card'], n_rows)
+    })
+    df.attrs[DATASET_ATTR] = f"test-{seed}"
+    return df
+
+
+def _pandas_rollup(df, by):
+    return df.groupby(by)['total'].agg(['sum', 'count'])
+
+
+def test_rollup_matches_pandas():
+    df = _transactions()
+    rollup = SalesCube.from_transactions(df).rollup('category').sort_index()
+    expected = _pandas_rollup(df, 'category')
+    np.testing.assert_allclose(rollup['revenue'], expected['sum'])
+    np.testing.assert_array_equal(rollup['transactions'], expected['count'])
+
+
+def test_fingerprint_sees_every_row_and_column():
+    df = _transactions()
+    fingerprint = frame_fingerprint(df)
+    assert frame_fingerprint(df.copy()) == fingerprint
+
+    edited = df.copy()
+    edited.loc[123, 'payment_type'] = 'Cash' if df.loc[123, 'payment_type'] == 'Card' else 'Card'
+    assert frame_fingerprint(edited) != fingerprint
+
+    # Moving value between rows keeps the sum of `total` unchanged
+    edited = df.copy()
+    edited.loc[[10, 11], 'total'] = [df.loc[10, 'total'] + 1, df.loc[11, 'total'] - 1]
+    assert frame_fingerprint(edited) != fingerprint
+
+    swapped = df.iloc[[1, 0] + list(range(2, len(df)))].reset_index(drop=True)
+    assert frame_fingerprint(swapped) != fingerprint
+
+
+def test_update_extends_appended_rows_without_hashing(monkeypatch):
+    monkeypatch.setattr(sales_cube, 'frame_fingerprint', None)
+    df = _transactions(400)
+    cube = SalesCube.from_transactions(df)
+    appended = append_transactions(df, _transactions(200, seed=1))
+    cube.update(appended)
+    cube.update(appended)
+    assert (cube.rebuilds, cube.extensions) == (1, 1)
+    assert cube.totals()['revenue'] == appended['total'].sum()
+
+
+def test_update_rebuilds_for_a_different_frame():
+    df = _transactions()
+    cube = SalesCube.from_transactions(df)
+
+    # Moving a row to another category keeps every total, only the category column changes
+    edited = df.copy()
+    edited.loc[250, 'category'] = 'Produce' if df.loc[250, 'category'] == 'Bakery' else 'Bakery'
+    edited = pd.concat([edited, _transactions(10, seed=1)], ignore_index=True)
+    cube.update(edited)
+
+    assert cube.rebuilds == 2
+    rollup = cube.rollup('category').sort_index()
+    np.testing.assert_allclose(rollup['revenue'], _pandas_rollup(edited, 'category')['sum'])
+
+
+def test_refresh_rebuilds_only_when_rows_changed():
+    df = _transactions()
+    cube = SalesCube.from_transactions(df)
+    cube.refresh(df)
+    cube.refresh(df)
+    assert cube.rebuilds == 2
+
+    # A transaction moved to another day in place is invisible to update, but not to refresh
+    df.loc[100, 'datetime'] += pd.Timedelta(days=3)
+    cube.update(df)
+    assert cube.rebuilds == 2
+    cube.refresh(df)
+    assert cube.rebuilds == 3
+    expected = df.groupby(df['datetime'].dt.normalize())['total'].sum()
+    np.testing.assert_allclose(cube.rollup('date')['revenue'], expected.values)
+
+
+def test_router_answers_top_category_locally():
+    df = _transactions()
+    cube = SalesCube.from_transactions(df)
+    router = QueryRouter()
+    answer = router.answer(lambda: cube, 'Which category has the highest sales?')
+    assert answer is not None and _pandas_rollup(df, 'category')['sum'].idxmax() in answer
+    assert router.answer(lambda: cube, 'Why did sales drop last winter?') is None
+
+
+def test_router_leaves_speculative_and_month_questions_to_the_llm():
+    cube = SalesCube.from_transactions(_transactions())
+    router = QueryRouter()
+    assert router.answer(lambda: cube, 'Which payment method may be the most popular?') is None
+    assert router.answer(lambda: cube, 'What was the best day in May?') is None
+    assert router.answer(lambda: cube, 'What is the most common payment method, may I ask?') is not None
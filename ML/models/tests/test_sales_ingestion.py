@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+from SalesIngestion import (DailySalesAggregator, aggregate_daily_sales, check_freq, complete_period_totals,
+                            fill_missing_periods, parse_timestamps, partial_edge_periods, period_start,
+                            read_transactions)
+from SyntheticSales import write_transactions_csv
+
+
+@pytest.fixture(scope='module')
+def transactions_csv(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('ingestion') / 'groc_sales.csv')
+    write_transactions_csv(path, 5000, n_days=20, n_categories=3, seed=0)
+    return path
+
+
+@pytest.mark.parametrize('freq', ['H', 'D', 'W'])
+def test_streamed_totals_match_pandas(transactions_csv, freq):
+    daily = aggregate_daily_sales(transactions_csv, chunksize=700, freq=freq, verbose=False)
+    df = read_transactions(transactions_csv)
+    expected = df['total'].astype('float64').groupby(period_start(df['datetime'], freq).values).sum()
+    expected = expected.drop(partial_edge_periods(df['datetime'].min(), df['datetime'].max(), freq))
+    observed = daily.set_index('date')['total']
+    pd.testing.assert_series_equal(observed.loc[expected.index], expected, check_names=False, check_freq=False, check_index_type=False, rtol=1e-6)
+    assert daily['total'].sum() == pytest.approx(expected.sum())
+
+
+def test_hourly_totals_have_every_hour(transactions_csv):
+    hourly = aggregate_daily_sales(transactions_csv, freq='H', verbose=False)
+    assert (hourly['date'].diff().dropna() == pd.Timedelta(hours=1)).all()
+
+
+def test_grouped_totals_keep_group_columns(transactions_csv):
+    daily = aggregate_daily_sales(transactions_csv, group_key='category', verbose=False)
+    assert list(daily.columns) == ['date', 'category', 'total', 'transactions']
+    assert daily['transactions'].sum() == 5000
+
+
+def test_verbose_switch_controls_progress_output(transactions_csv, capsys):
+    aggregate_daily_sales(transactions_csv, verbose=False)
+    assert capsys.readouterr().out == ''
+    aggregate_daily_sales(transactions_csv)
+    assert 'Aggregated 5000 transactions' in capsys.readouterr().out
+
+
+def test_partial_edge_periods():
+    monday, sunday = pd.Timestamp('2024-01-01 09:00'), pd.Timestamp('2024-01-14 20:00')
+    assert partial_edge_periods(monday, sunday, 'W') == []
+    assert partial_edge_periods(monday + pd.Timedelta(days=2), sunday - pd.Timedelta(days=1), 'W') == [
+        pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-08')]
+    assert partial_edge_periods('2024-01-01 10:00', '2024-01-01 13:59:30', 'H') == []
+    assert partial_edge_periods('2024-01-01 10:05', '2024-01-01 13:40', 'H') == [
+        pd.Timestamp('2024-01-01 10:00'), pd.Timestamp('2024-01-01 13:00')]
+    assert partial_edge_periods('2024-01-03 10:05', '2024-01-05 13:40', 'D') == []
+
+
+def test_partial_weeks_are_left_out_until_they_fill_up():
+    # Wednesday 3 January to Wednesday 17 January: only the week of the 8th is complete
+    days = pd.date_range('2024-01-03 12:00', '2024-01-17 12:00', freq='D')
+    chunk = pd.DataFrame({'datetime': days, 'total': 1.0})
+    aggregator = DailySalesAggregator(freq='W')
+    aggregator.add_chunk(chunk)
+    assert aggregator.result()[['date', 'total']].values.tolist() == [[pd.Timestamp('2024-01-08'), 7.0]]
+
+    rest = pd.DataFrame({'datetime': pd.date_range('2024-01-18 12:00', '2024-01-21 12:00', freq='D'), 'total': 1.0})
+    aggregator.add_chunk(rest)
+    assert aggregator.result()['total'].tolist() == [7.0, 7.0]
+
+    totals = complete_period_totals(chunk['total'], chunk['datetime'], 'W')
+    assert totals.to_dict() == {pd.Timestamp('2024-01-08'): 7.0}
+    # Totals already labelled by week start are complete weeks
+    weekly = pd.Series([5.0, 6.0], index=[0, 1])
+    assert complete_period_totals(weekly, pd.Series(pd.to_datetime(['2024-01-01', '2024-01-08'])), 'W').tolist() == [
+        5.0, 6.0]
+
+
+def test_fill_missing_periods_interpolates_days():
+    series = pd.Series([1.0, 3.0], index=pd.to_datetime(['2024-01-01', '2024-01-03']))
+    assert fill_missing_periods(series, 'D').tolist() == [1.0, 2.0, 3.0]
+
+
+def test_unknown_frequency_is_rejected():
+    with pytest.raises(ValueError):
+        check_freq('M')
+
+
+def test_timestamps_in_other_layouts_still_parse(tmp_path):
+    assert parse_timestamps(pd.Series(['03-02-2024 10:30'])).tolist() == [pd.Timestamp('2024-02-03 10:30')]
+    assert parse_timestamps(pd.Series(['2024-02-03 10:30:00'])).tolist() == [pd.Timestamp('2024-02-03 10:30')]
+
+    path = tmp_path / 'iso.csv'
+    pd.DataFrame({'timestamp': ['2024-02-03 10:30:00', '2024-02-04 11:00:00'], 'total': [1.0, 2.0],
+                  'category': ['Dairy', 'Bakery']}).to_csv(path, index=False)
+    assert read_transactions(str(path))['datetime'].dt.day.tolist() == [3, 4]
+
+
+def test_simple_system_processes_iso_timestamps():
+    from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+
+    df = pd.DataFrame({'timestamp': ['2024-02-03T10:30:00', '2024-02-04T11:00:00'], 'total': [1.0, 2.0]})
+    processed = SimpleSalesForecastSystem(verbose=False).process_data(df)
+    assert processed['datetime'].tolist() == [pd.Timestamp('2024-02-03 10:30'), pd.Timestamp('2024-02-04 11:00')]
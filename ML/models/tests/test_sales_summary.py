@@ -0,0 +1,86 @@
+import threading
+import numpy as np
+import pandas as pd
+import SalesSummary
+from SalesIngestion import DATASET_ATTR, append_transactions, frame_version
+from SalesSummary import SummaryCache, SummaryState
+
+
+def _transactions(n_rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=n_rows, freq='h'),
+        'total': rng.integers(1, 100, n_rows).astype(float),
+        'category': pd.Categorical(rng.choice(['Bakery', 'Dairy', 'Produce'], n_rows)),
+        'customer_type': rng.choice(['Member', 'Normal'], n_rows),
+        'payment_type': rng.choice(['Cash', 'Card'], n_rows)
+    })
+    df.attrs[DATASET_ATTR] = f"test-{seed}"
+    return df
+
+
+def test_appended_frames_keep_the_dataset_and_bump_the_counter():
+    df = _transactions(400)
+    appended = append_transactions(df, _transactions(100, seed=1))
+    assert frame_version(df) == ('test-0', 0, 400)
+    assert frame_version(appended) == ('test-0', 1, 500)
+    assert frame_version(pd.DataFrame({'total': [1.0]})) == (None, 0, 1)
+
+
+def test_summary_cache_extends_appended_rows_without_rescanning(monkeypatch):
+    df = _transactions(400)
+    cache = SummaryCache()
+    cache.get(df)
+    appended = append_transactions(df, _transactions(100, seed=1))
+
+    scanned = []
+    monkeypatch.setattr(SalesSummary, 'SummaryState',
+                        lambda rows: scanned.append(len(rows)) or SummaryState(rows))
+    assert cache.get(appended) == SummaryState(appended).summary()
+    assert cache.get(appended) == SummaryState(appended).summary()
+    assert scanned == [100]
+    assert (cache.misses, cache.extensions, cache.hits) == (1, 1, 1)
+
+
+def test_summary_cache_recomputes_edited_frames():
+    df = _transactions()
+    cache = SummaryCache()
+    cache.get(df)
+
+    # An edited copy is a different frame, so it is summarised from scratch
+    edited = df.copy()
+    edited.loc[200, 'category'] = 'Produce' if df.loc[200, 'category'] == 'Bakery' else 'Bakery'
+    assert cache.get(edited) == SummaryState(edited).summary()
+    assert cache.misses == 2
+
+    # Edits made in place are only seen after a refresh
+    df.loc[10, 'total'] += 1000
+    assert cache.refresh(df) == SummaryState(df).summary()
+
+
+def test_concurrent_requests_share_one_computation(monkeypatch):
+    df = _transactions()
+    cache = SummaryCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_state(rows):
+        if len(rows) == len(df):
+            started.set()
+            release.wait(5)
+        return SummaryState(rows)
+
+    monkeypatch.setattr(SalesSummary, 'SummaryState', slow_state)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(df))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # The cache lock is free while the summary is computed
+    cache.get(_transactions(10, seed=2))
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [SummaryState(df).summary()] * 4
+    assert (cache.misses, cache.hits) == (2, 3)
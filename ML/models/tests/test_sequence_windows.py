@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from SequenceWindows import flatten_windows, lstm_dataset, make_windows, window_batches
+
+
+def _loop_windows(data, lookback, horizon, stride=1):
+    X, y = [], []
+    for start in range(0, len(data) - lookback - horizon + 1, stride):
+        X.append(data[start:start + lookback])
+        y.append(data[start + lookback:start + lookback + horizon, 0])
+    return np.array(X), np.array(y)
+
+
+@pytest.mark.parametrize('horizon,stride', [(1, 1), (3, 1), (2, 3)])
+def test_windows_match_a_python_loop(horizon, stride):
+    data = np.arange(60, dtype=np.float32).reshape(30, 2)
+    X, y = make_windows(data, lookback=4, horizon=horizon, stride=stride)
+    expected_X, expected_y = _loop_windows(data, 4, horizon, stride)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y[:, 0] if horizon == 1 else expected_y)
+
+
+def test_windows_are_read_only_views():
+    data = np.arange(20, dtype=np.float32)
+    X, y = make_windows(data, lookback=3)
+    assert np.shares_memory(X, data) and np.shares_memory(y, data)
+    assert not X.flags.writeable
+    flat = flatten_windows(X)
+    assert np.shares_memory(flat, data)
+    np.testing.assert_array_equal(flat, X.reshape(len(X), -1))
+
+
+def test_too_short_series_gives_no_windows():
+    X, y = make_windows(np.arange(3.0), lookback=3)
+    assert X.shape == (0, 3, 1) and y.shape == (0,)
+
+
+def test_non_positive_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        make_windows(np.arange(10.0), lookback=0)
+
+
+def test_window_batches_cover_every_window_once():
+    X, y = make_windows(np.arange(50, dtype=np.float32), lookback=3)
+    batches = list(window_batches(flatten_windows(X), y, batch_size=8, shuffle=True, seed=0))
+    assert all(X_batch.dtype == np.float32 for X_batch, _ in batches)
+    assert sorted(np.concatenate([y_batch for _, y_batch in batches]).tolist()) == sorted(y.tolist())
+    assert max(len(X_batch) for X_batch, _ in batches) == 8
+
+
+def test_lstm_dataset_yields_lstm_shaped_batches():
+    data = np.arange(40, dtype=np.float32).reshape(20, 2)
+    X, y = make_windows(data, lookback=3)
+    # An extra column after the window (such as a calendar feature) is dropped
+    rows = np.hstack([flatten_windows(X), np.zeros((len(X), 1), dtype=np.float32)])
+    X_batch, y_batch = next(iter(lstm_dataset(rows, y, batch_size=5, lookback=3, n_features=2)))
+    assert X_batch.shape == (5, 3, 2) and y_batch.shape == (5,)
+    np.testing.assert_array_equal(X_batch.numpy(), X[:5])
@@ -0,0 +1,87 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow import keras
+from MultiModalTimeSeriesForcasting import SimpleSalesForecastSystem
+from TrainingCache import TrainingCache, training_key
+
+SETTINGS = {'lookback': 3, 'lstm_params': {'units': 4}, 'xgb_params': {'max_depth': 3}}
+
+
+def _data(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((20, 3), dtype=np.float32), rng.random(20, dtype=np.float32)
+
+
+def _models():
+    lstm = keras.Sequential([keras.Input((3, 1)), keras.layers.LSTM(2), keras.layers.Dense(1)])
+    X, y = _data()
+    return {'lstm': lstm, 'xgb': xgb.XGBRegressor(n_estimators=3).fit(X, y)}
+
+
+def test_training_key_is_stable_and_content_addressed():
+    X, y = _data()
+    key = training_key(X, y, SETTINGS)
+    assert key == training_key(X.copy(), y.copy(), dict(reversed(list(SETTINGS.items()))))
+    # Windows are hashed by content, so a strided view equals its contiguous copy
+    assert training_key(np.asfortranarray(X), y, SETTINGS) == key
+
+    X_changed = X.copy()
+    X_changed[5, 1] += 1e-3
+    assert training_key(X_changed, y, SETTINGS) != key
+    assert training_key(X.astype(np.float64), y, SETTINGS) != key
+    assert training_key(X.reshape(10, 6), y, SETTINGS) != key
+    assert training_key(X, y, {**SETTINGS, 'xgb_params': {'max_depth': 4}}) != key
+
+
+def _put(cache, key, metrics=None):
+    cache.put(key, _models(), MinMaxScaler().fit([[0.0], [1.0]]), lookback=3, forecast_horizon=7,
+              state={'metrics': metrics or {}, 'fit_stats': {'lstm_epochs': 1}})
+
+
+def test_get_returns_stored_models_and_state(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+    assert cache.get('missing') is None
+    _put(cache, 'k1', metrics={'xgb': {'mse': np.float64(0.25)}})
+    models, state = cache.get('k1')
+    assert state == {'metrics': {'xgb': {'mse': 0.25}}, 'fit_stats': {'lstm_epochs': 1}}
+    X, _ = _data()
+    np.testing.assert_array_equal(models['xgb'].predict(X), _models()['xgb'].predict(X))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+    now = time.time()
+    for age, key in ((300, 'a'), (200, 'b'), (100, 'c')):
+        _put(cache, key)
+        os.utime(tmp_path / key, (now - age, now - age))
+    entry_bytes = cache.stats()['bytes'] // 3
+    assert cache.entries() == ['a', 'b', 'c']
+    cache.get('a')
+
+    cache.max_bytes = 2 * entry_bytes + entry_bytes // 2
+    assert cache.evict() == 1
+    assert cache.entries() == ['c', 'a']
+    assert not os.path.exists(tmp_path / 'b')
+
+
+def test_simple_system_reuses_cached_training(tmp_path):
+    rng = np.random.default_rng(0)
+    daily = pd.DataFrame({'date': pd.date_range('2024-01-01', periods=60, freq='D'),
+                          'total': 100 + rng.normal(0, 5, 60)})
+    cache = TrainingCache(str(tmp_path))
+    results = []
+    for _ in range(2):
+        system = SimpleSalesForecastSystem(forecast_horizon=5, verbose=False, training_cache=cache,
+                                           lstm_params={'epochs': 2, 'batch_size': 16})
+        _, scaled = system.prepare_data(daily)
+        X_test, _ = system.train_models(*system.create_sequences(scaled))
+        results.append((system.metrics, system.generate_forecasts(X_test[-1])))
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert results[0][0] == results[1][0]
+    pd.testing.assert_frame_equal(results[0][1], results[1][1])